@@ -0,0 +1,8 @@
+"""
+性能基准测试
+
+用法：
+    python -m benchmarks.run                       # 运行全部基准并输出 JSON
+    python -m benchmarks.run -o current.json       # 保存结果
+    python -m benchmarks.run --compare baseline.json
+"""
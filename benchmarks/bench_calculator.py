@@ -0,0 +1,106 @@
+"""
+InvestmentCalculator 微基准
+"""
+
+import random
+
+import numpy as np
+
+from benchmarks.registry import benchmark, parametrize
+from src.calculator import InvestmentCalculator
+from src.cents import apportion_many
+from src.config import InvestmentConfig
+from src.holdings import HoldingsArray
+
+HOLDING_SIZES = [1, 10, 100, 1000, 10000]
+
+FUND_NAMES = ["中短债基金", "红利低波/沪深300", "标普/纳指", "黄金ETF联接C"]
+
+
+def make_calculator() -> InvestmentCalculator:
+    return InvestmentCalculator(InvestmentConfig())
+
+
+def make_holdings(count: int, seed: int = 42):
+    """生成固定随机种子的持仓列表，约三分之一触发加仓或止盈"""
+    rng = random.Random(seed)
+    return [
+        {
+            "fund_name": rng.choice(FUND_NAMES),
+            "holding_cost": 1.0,
+            "current_nav": round(rng.uniform(0.75, 1.45), 4),
+            "holding_amount": round(rng.uniform(1000, 100000), 2),
+        }
+        for _ in range(count)
+    ]
+
+
+PORTFOLIO_HOLDINGS = {
+    "bond_fund": 10000.0,
+    "dividend_fund": 8000.0,
+    "us_index_fund": 5000.0,
+    "gold_etf": 3000.0,
+    "bank_fixed_income": 50000.0,
+    "physical_gold": 5000.0,
+    "reserve_fund": 5000.0,
+}
+
+
+@benchmark("calculator.allocate_framework", "micro")
+def bench_allocate_framework():
+    calculator = make_calculator()
+    return lambda: calculator._allocate_framework(13000.0)
+
+
+@benchmark("calculator.allocate_fund_portfolio", "micro")
+def bench_allocate_fund_portfolio():
+    calculator = make_calculator()
+    return lambda: calculator._allocate_fund_portfolio(3900.0)
+
+
+@parametrize(HOLDING_SIZES, "calculator.calculate_suggestions[{}]", "micro")
+def bench_calculate_suggestions(count):
+    calculator = make_calculator()
+    holdings = make_holdings(count)
+    return lambda: calculator._calculate_suggestions(holdings)
+
+
+@parametrize(HOLDING_SIZES, "calculator.calculate_suggestions_columns[{}]", "micro")
+def bench_calculate_suggestions_columns(count):
+    calculator = make_calculator()
+    holdings = HoldingsArray.from_records(make_holdings(count))
+    return lambda: calculator._calculate_suggestions(holdings)
+
+
+@benchmark("calculator.calculate", "micro")
+def bench_calculate():
+    calculator = make_calculator()
+    return lambda: calculator.calculate(15000.0, 10000.0, 2000.0, 20000.0)
+
+
+@parametrize([100, 10000], "calculator.calculate_many[{}]", "micro")
+def bench_calculate_many(count):
+    calculator = make_calculator()
+    rng = random.Random(7)
+    columns = [[rng.uniform(0, 40000) for _ in range(count)] for _ in range(4)]
+    return lambda: calculator.calculate_many(*columns)
+
+
+@parametrize([10000, 1000000], "cents.apportion_many[{}]", "micro")
+def bench_apportion_many(count):
+    calculator = make_calculator()
+    totals = np.random.default_rng(7).integers(0, 4000000, count, dtype=np.int64)
+    return lambda: apportion_many(totals, calculator.categories.framework.weights)
+
+
+@benchmark("calculator.analyze_portfolio", "micro")
+def bench_analyze_portfolio():
+    calculator = make_calculator()
+    return lambda: calculator.analyze_portfolio(PORTFOLIO_HOLDINGS)
+
+
+@parametrize([10000, 1000000], "calculator.analysis_columns[{}]", "micro")
+def bench_analysis_columns(count):
+    calculator = make_calculator()
+    holdings = np.random.default_rng(7).uniform(0, 100000, (count, len(calculator.categories.holding_keys)))
+    return lambda: calculator._analysis_columns(holdings)
@@ -0,0 +1,96 @@
+"""
+Flask 路由端到端基准
+
+通过 Flask 测试客户端发送请求，覆盖 JSON 解析、校验、计算和序列化。
+结果缓存被关闭，配置使用进程内后端，保证测量的是完整的计算路径。
+"""
+
+import json
+import os
+
+os.environ.setdefault('CACHE_MAXSIZE', '0')
+os.environ.setdefault('CONFIG_BACKEND', 'memory')
+
+from benchmarks.bench_calculator import PORTFOLIO_HOLDINGS, make_holdings  # noqa: E402
+from benchmarks.registry import benchmark, parametrize  # noqa: E402
+from src.app import app  # noqa: E402
+
+CALCULATE_BODY = {
+    "target_living_expense": 15000,
+    "current_living_expense": 10000,
+    "debt": 2000,
+    "new_income": 20000,
+}
+
+
+def post(path: str, body, content_type: str = 'application/json'):
+    client = app.test_client()
+    payload = body if isinstance(body, (bytes, str)) else json.dumps(body)
+
+    def run():
+        response = client.post(path, data=payload, content_type=content_type)
+        assert response.status_code == 200, response.get_data(as_text=True)
+        return response.get_data()
+
+    return run
+
+
+@benchmark("route.index", "route")
+def bench_index():
+    client = app.test_client()
+    return lambda: client.get('/').close()
+
+
+@benchmark("route.get_config", "route")
+def bench_get_config():
+    client = app.test_client()
+    return lambda: client.get('/api/config').get_data()
+
+
+@benchmark("route.get_config_not_modified", "route")
+def bench_get_config_not_modified():
+    client = app.test_client()
+    etag = client.get('/api/config').headers['ETag']
+    return lambda: client.get('/api/config', headers={'If-None-Match': etag}).get_data()
+
+
+@benchmark("route.calculate", "route")
+def bench_calculate():
+    return post('/api/calculate', CALCULATE_BODY)
+
+
+@parametrize([100, 10000], "route.calculate_with_holdings[{}]", "route")
+def bench_calculate_with_holdings(count):
+    return post('/api/calculate', dict(CALCULATE_BODY, holdings=make_holdings(count)))
+
+
+@parametrize([100, 10000], "route.calculate_with_holding_columns[{}]", "route")
+def bench_calculate_with_holding_columns(count):
+    lots = make_holdings(count)
+    columns = {field: [lot[field] for lot in lots] for field in lots[0]}
+    return post('/api/calculate', dict(CALCULATE_BODY, holdings=columns))
+
+
+@parametrize([1000], "route.calculate_batch[{}]", "route")
+def bench_calculate_batch(count):
+    body = {field: [value] * count for field, value in CALCULATE_BODY.items()}
+    return post('/api/calculate/batch', body)
+
+
+@benchmark("route.analyze_portfolio", "route")
+def bench_analyze_portfolio():
+    return post('/api/analyze-portfolio', {"holdings": PORTFOLIO_HOLDINGS})
+
+
+@parametrize([1000], "route.analyze_portfolio_stream[{}]", "route")
+def bench_analyze_portfolio_stream(count):
+    line = json.dumps({"holdings": PORTFOLIO_HOLDINGS})
+    return post('/api/analyze-portfolio/stream', '\n'.join([line] * count), 'application/x-ndjson')
+
+
+@benchmark("route.update_config", "route")
+def bench_update_config():
+    client = app.test_client()
+    body = {"framework": {"fund_portfolio": 0.30, "bank_fixed_income": 0.60,
+                          "physical_gold": 0.05, "reserve_fund": 0.05}}
+    return lambda: client.put('/api/config', json=body).get_data()
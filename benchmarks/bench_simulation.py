@@ -0,0 +1,31 @@
+"""
+蒙特卡洛模拟微基准
+"""
+
+import numpy as np
+
+from benchmarks.registry import benchmark
+from src.config import InvestmentConfig
+from src.rules import RuleTable
+from src.simulation import MarketAssumptions, eligible_mask, generate_nav_paths, replay_strategy
+
+WEEKS = 520
+PATHS = 4096
+WEEKLY_CONTRIBUTIONS = np.array([3000.0, 2250.0, 1125.0, 1125.0])
+
+
+@benchmark("simulation.generate_nav_paths[4096x520]", "micro")
+def bench_generate_nav_paths():
+    market = MarketAssumptions()
+    rng = np.random.default_rng(42)
+    return lambda: generate_nav_paths(WEEKS, PATHS, market, rng)
+
+
+@benchmark("simulation.replay_strategy[4096x520]", "micro")
+def bench_replay_strategy():
+    config = InvestmentConfig()
+    rules = RuleTable.from_config(config)
+    eligible = eligible_mask(rules, config.categories)
+    nav = generate_nav_paths(WEEKS, PATHS, MarketAssumptions(), np.random.default_rng(42))
+    contributions = np.broadcast_to(WEEKLY_CONTRIBUTIONS, (WEEKS, len(WEEKLY_CONTRIBUTIONS)))
+    return lambda: replay_strategy(nav, contributions, rules, eligible)
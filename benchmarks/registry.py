@@ -0,0 +1,47 @@
+"""
+基准注册模块
+
+基准函数通过 benchmark 装饰器注册。被装饰的函数负责准备数据，
+并返回一个无参的可调用对象作为被测代码；准备工作不计入耗时。
+"""
+
+from typing import Callable, Dict, List, NamedTuple
+
+
+class Benchmark(NamedTuple):
+    """已注册的基准"""
+
+    name: str
+    group: str
+    setup: Callable[[], Callable[[], object]]
+
+
+BENCHMARKS: List[Benchmark] = []
+
+
+def benchmark(name: str, group: str) -> Callable:
+    """注册基准
+
+    Args:
+        name: 基准名称，在结果文件中作为唯一键
+        group: 分组（micro / route）
+    """
+    def decorator(setup: Callable[[], Callable[[], object]]):
+        BENCHMARKS.append(Benchmark(name, group, setup))
+        return setup
+    return decorator
+
+
+def parametrize(values: List, name_format: str, group: str) -> Callable:
+    """以不同参数注册同一个基准，setup 函数接收参数值"""
+    def decorator(setup: Callable[[object], Callable[[], object]]):
+        for value in values:
+            BENCHMARKS.append(Benchmark(
+                name_format.format(value), group, lambda value=value: setup(value)
+            ))
+        return setup
+    return decorator
+
+
+def by_name() -> Dict[str, Benchmark]:
+    return {b.name: b for b in BENCHMARKS}
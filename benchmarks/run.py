@@ -0,0 +1,154 @@
+"""
+基准运行器
+
+运行已注册的基准，输出可跨提交比较的 JSON 结果：
+
+    {
+        "meta": {"commit": "...", "python": "...", ...},
+        "benchmarks": {
+            "calculator.calculate": {"median": 1.2e-05, "min": ..., "ops_per_sec": ...},
+            ...
+        }
+    }
+
+时间单位均为秒/次。--compare 会按中位数与基线结果比较，
+任一基准变慢超过阈值时以非零状态码退出，可用于 CI 拦截性能回退。
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+from benchmarks import bench_calculator, bench_routes, bench_simulation  # noqa: F401  注册基准
+from benchmarks.registry import BENCHMARKS, Benchmark
+
+
+def measure(fn: Callable[[], object], repeat: int, min_time: float) -> Dict[str, float]:
+    """测量单个基准
+
+    先确定每个样本的循环次数，使单个样本耗时不少于 min_time，
+    再采集 repeat 个样本，统计每次调用的耗时。
+    """
+    fn()  # 预热
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        loops *= 10 if elapsed < min_time / 10 else 2
+
+    samples: List[float] = [elapsed / loops]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        samples.append((time.perf_counter() - start) / loops)
+
+    median = statistics.median(samples)
+    return {
+        'min': min(samples),
+        'median': median,
+        'mean': statistics.fmean(samples),
+        'stdev': statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        'ops_per_sec': 1.0 / median if median > 0 else float('inf'),
+        'loops': loops,
+        'repeat': repeat,
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def select(names: Optional[str], group: Optional[str]) -> List[Benchmark]:
+    selected = BENCHMARKS
+    if group:
+        selected = [b for b in selected if b.group == group]
+    if names:
+        selected = [b for b in selected if names in b.name]
+    return selected
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """与基线比较，返回变慢超过阈值的基准名称"""
+    regressions = []
+    print(f"\n{'基准':<48}{'基线':>12}{'当前':>12}{'比值':>8}")
+    for name, result in current['benchmarks'].items():
+        base = baseline.get('benchmarks', {}).get(name)
+        if base is None:
+            print(f"{name:<48}{'-':>12}{result['median'] * 1e6:>10.1f}us{'新增':>8}")
+            continue
+        ratio = result['median'] / base['median'] if base['median'] else float('inf')
+        flag = '  <-- 回退' if ratio > threshold else ''
+        print(f"{name:<48}{base['median'] * 1e6:>10.1f}us{result['median'] * 1e6:>10.1f}us{ratio:>8.2f}{flag}")
+        if ratio > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='运行性能基准')
+    parser.add_argument('-k', '--filter', help='只运行名称包含该字符串的基准')
+    parser.add_argument('--group', choices=['micro', 'route'], help='只运行指定分组')
+    parser.add_argument('--repeat', type=int, default=7, help='每个基准的样本数')
+    parser.add_argument('--min-time', type=float, default=0.05, help='单个样本的最短耗时（秒）')
+    parser.add_argument('-o', '--output', help='结果 JSON 文件路径（默认输出到标准输出）')
+    parser.add_argument('--compare', help='基线结果 JSON 文件')
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help='中位数超过基线的倍数视为回退（默认 1.2）')
+    args = parser.parse_args(argv)
+
+    results = {}
+    for bench in select(args.filter, args.group):
+        fn = bench.setup()
+        results[bench.name] = measure(fn, args.repeat, args.min_time)
+        result = results[bench.name]
+        print(f"{bench.name:<48}{result['median'] * 1e6:>12.1f} us  ({result['ops_per_sec']:.0f} ops/s)",
+              file=sys.stderr)
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'benchmarks': results,
+    }
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    elif not args.compare:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} 个基准出现性能回退: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
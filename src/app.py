@@ -5,31 +5,193 @@
 """
 
 import os
-from flask import Flask, request, jsonify, send_from_directory
+import time
+from typing import Callable
+from flask import Flask, Request, Response, g, request, send_from_directory, stream_with_context
 from flask_cors import CORS
-from src.calculator import InvestmentCalculator
-from src.config import InvestmentConfig
+from src.handlers import RequestContext, Result, create_api_from_env
+from src.metrics import metrics
+from src.profiling import PROFILE_HEADER, PROFILE_TOKEN_HEADER, collapsed_text, create_profiler_from_env
+from src.rebalance import rebalance
+from src.serialization import compact_analysis, compact_requested, json_response, requested_encoder
+from src.static_assets import IMMUTABLE_MAX_AGE, StaticAssets
+from src.storage import parse_timestamp
+from src.stream import analyze_portfolio_stream
+from src.validation import category_schemas, error_payload
 
 # 获取项目根目录
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 STATIC_DIR = os.path.join(BASE_DIR, 'static')
 
+
+class TimedRequest(Request):
+    """请求体的 JSON 解析计入 parse 阶段的耗时"""
+
+    def get_json(self, *args, **kwargs):
+        with metrics.stage('parse'):
+            return super().get_json(*args, **kwargs)
+
+    def on_json_loading_failed(self, e):
+        # 请求体不是合法 JSON 时与共享的处理函数一样返回 400，而不是由异常处理返回 500
+        return None
+
+
 # 创建 Flask 应用
 app = Flask(__name__, static_folder=STATIC_DIR)
+app.request_class = TimedRequest
 CORS(app)  # 启用 CORS 支持
 
-# 初始化配置和计算器
-config = InvestmentConfig()
-if not config.validate():
-    raise ValueError("配置验证失败：投资比例总和必须为 100%")
+# 共享的处理函数及其依赖（配置快照存储、结果缓存、组合状态、持仓快照历史），
+# 与 ASGI 应用使用同一套实现和环境变量
+api = create_api_from_env(BASE_DIR)
+config_store = api.config_store
+result_cache = api.result_cache
+portfolio_store = api.portfolio_store
+snapshot_store = api.snapshot_store
+history_recorder = api.history_recorder
+
+# 前端静态资源的内容哈希地址
+static_assets = StaticAssets(STATIC_DIR)
+
+# 请求采样分析（X-Profile 请求头或 PROFILE_THRESHOLD_MS 延迟阈值触发）
+profiler = create_profiler_from_env(os.path.join(BASE_DIR, 'data', 'profiles'))
+
+
+def api_response(handler: Callable[[RequestContext], Result]) -> Response:
+    """把当前请求交给共享的处理函数，并转换为 Flask 响应"""
+    ctx = RequestContext(
+        request.args.to_dict(flat=False),
+        request.get_data(),
+        {name.lower(): value for name, value in request.headers.items()}
+    )
+    status, body = handler(ctx)
+    return Response(body, status=status, mimetype='application/json', headers=ctx.response_headers)
+
+
+@app.before_request
+def start_request_metrics():
+    """记录请求开始时间，并决定本次请求是否采样阶段耗时"""
+    g.request_started = time.perf_counter()
+    metrics.start_request()
+
+
+@app.before_request
+def start_request_profile():
+    """请求头要求采样，或设置了延迟阈值时，开始观察本次请求"""
+    forced = profiler.requested(request.headers.get(PROFILE_HEADER))
+    if forced or profiler.threshold > 0:
+        g.profiled = True
+        profiler.begin({
+            'route': request.url_rule.rule if request.url_rule is not None else 'unmatched',
+            'method': request.method,
+            'path': request.path
+        }, forced)
+
 
-calculator = InvestmentCalculator(config)
+@app.after_request
+def record_request_metrics(response):
+    """按路由模板记录请求数、错误数和延迟（流式响应只计到响应开始）"""
+    started = g.get('request_started')
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        metrics.observe_request(route, request.method, response.status_code, time.perf_counter() - started)
+    return response
+
+
+@app.after_request
+def finish_request_profile(response):
+    """保存被采样请求的调用栈，并在响应头中返回采样结果标识"""
+    if g.get('profiled'):
+        g.profiled = False
+        profile_id = profiler.finish(response.status_code)
+        if profile_id is not None:
+            response.headers['X-Profile-Id'] = profile_id
+    return response
+
+
+@app.teardown_request
+def end_request_metrics(exc):
+    metrics.end_request()
+    if g.get('profiled'):
+        profiler.discard()
+
+
+def _profile_access_error():
+    # 未设置 PROFILE_TOKEN 时采样结果接口不存在；设置后需要在 X-Profile-Token 请求头中提供令牌
+    if not profiler.token:
+        return json_response({'success': False, 'error': '接口不存在'}), 404
+    if not profiler.authorized(request.headers.get(PROFILE_TOKEN_HEADER)):
+        return json_response({'success': False, 'error': '无权访问采样结果'}), 403
+    return None
+
+
+@app.route('/admin/profiles', methods=['GET'])
+def list_profiles():
+    """采样结果列表 API（不含调用栈，最新的在前）"""
+    denied = _profile_access_error()
+    if denied is not None:
+        return denied
+    return json_response({
+        'success': True,
+        'data': profiler.store.list()
+    })
+
+
+@app.route('/admin/profiles/<profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    """读取一份采样结果
+
+    默认返回折叠调用栈文本（flamegraph.pl / speedscope 可直接读取），
+    format=json 时返回包含请求信息的完整结果。
+    """
+    denied = _profile_access_error()
+    if denied is not None:
+        return denied
+    profile = profiler.store.load(profile_id)
+    if profile is None:
+        return json_response({'success': False, 'error': f'采样结果不存在: {profile_id}'}), 404
+    if request.args.get('format') == 'json':
+        return json_response({'success': True, 'data': profile})
+    return Response(collapsed_text(profile), mimetype='text/plain; charset=utf-8')
+
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus 文本格式的请求指标
+
+    包括每个路由的请求数、错误数和延迟直方图，以及采样的阶段耗时直方图
+    （METRICS_SAMPLE_RATE 设置采样率，默认 0 即不记录阶段耗时）。
+    """
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
 
 
 @app.route('/')
 def index():
-    """提供静态 HTML 页面"""
-    return send_from_directory(STATIC_DIR, 'index.html')
+    """提供静态 HTML 页面
+    
+    页面中的 CSS / JS 引用改写为带内容哈希的 /assets/ 地址；页面本身带 ETag，
+    客户端每次协商，未变化时返回 304。
+    """
+    body, etag = static_assets.index_page()
+    response = Response(body, mimetype='text/html')
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+@app.route('/assets/<path:filename>')
+def hashed_asset(filename):
+    """带内容哈希的静态资源，内容不变时地址不变，可以长期缓存
+    
+    哈希与文件当前内容不一致（部署前的旧地址）时返回 404。
+    """
+    path = static_assets.resolve(filename)
+    if path is None:
+        return json_response({'success': False, 'error': f'静态资源不存在: {filename}'}), 404
+    response = send_from_directory(STATIC_DIR, path, max_age=IMMUTABLE_MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
 
 
 @app.route('/api/calculate', methods=['POST'])
@@ -52,6 +214,14 @@ def calculate():
         ]
     }
     
+    持仓较多时 holdings 也可以按列提交（各列等长），按列计算建议：
+        "holdings": {
+            "fund_name": ["红利低波/沪深300", "标普/纳指"],
+            "holding_cost": [1.0, 2.0],
+            "current_nav": [0.92, 2.5],
+            "holding_amount": [10000, 8000]
+        }
+    
     响应示例：
     {
         "success": true,
@@ -62,92 +232,93 @@ def calculate():
         }
     }
     """
-    try:
-        # 1. 解析 JSON 请求体
-        data = request.get_json()
-        if not data:
-            return jsonify({
-                'success': False,
-                'error': '请求体不能为空'
-            }), 400
-        
-        # 2. 验证必填字段
-        required_fields = ['target_living_expense', 'current_living_expense', 'debt', 'new_income']
-        missing_fields = [field for field in required_fields if field not in data]
-        if missing_fields:
-            return jsonify({
-                'success': False,
-                'error': f'缺少必填字段: {", ".join(missing_fields)}'
-            }), 400
-        
-        # 3. 验证数值类型和非负性
-        for field in required_fields:
-            value = data[field]
-            if not isinstance(value, (int, float)):
-                return jsonify({
-                    'success': False,
-                    'error': f'字段 {field} 必须是数值类型'
-                }), 400
-            if value < 0:
-                return jsonify({
-                    'success': False,
-                    'error': f'字段 {field} 不能为负数'
-                }), 400
-        
-        # 4. 提取参数
-        target_living_expense = float(data['target_living_expense'])
-        current_living_expense = float(data['current_living_expense'])
-        debt = float(data['debt'])
-        new_income = float(data['new_income'])
-        holdings = data.get('holdings', None)
-        
-        # 5. 调用计算器执行计算
-        result = calculator.calculate(
-            target_living_expense=target_living_expense,
-            current_living_expense=current_living_expense,
-            debt=debt,
-            new_income=new_income,
-            holdings=holdings
-        )
-        
-        # 6. 返回成功响应
-        return jsonify({
-            'success': True,
-            'data': result
-        }), 200
+    return api_response(api.calculate)
+
+
+@app.route('/api/calculate/batch', methods=['POST'])
+def calculate_batch():
+    """批量投资计算 API
     
-    except Exception as e:
-        # 7. 处理异常并返回 500 错误
-        return jsonify({
-            'success': False,
-            'error': f'服务器内部错误: {str(e)}'
-        }), 500
+    四个输入字段均为等长数组，第 i 个元素组成第 i 个账户的输入。
+    
+    请求体示例：
+    {
+        "target_living_expense": [15000, 12000],
+        "current_living_expense": [10000, 12000],
+        "debt": [2000, 0],
+        "new_income": [20000, 8000]
+    }
+    
+    响应示例：
+    {
+        "success": true,
+        "data": {
+            "count": 2,
+            "results": [{...}, {...}]  // 每项结构与 /api/calculate 的 data 相同
+        }
+    }
+    """
+    return api_response(api.calculate_batch)
+
+
+@app.route('/api/calculate/scenarios', methods=['POST'])
+def calculate_scenarios():
+    """情景网格计算 API（敏感性分析）
+    
+    base 为四个输入字段的基准值，vary 中的字段按网格取值（数值数组，或
+    {"start", "stop", "step"} 等差序列，包含 stop），一次返回整个网格的结果。
+    网格的维度按 target_living_expense、current_living_expense、debt、new_income
+    的顺序排列（只包含 vary 中的字段），格子数不超过 10000。
+    
+    请求体示例：
+    {
+        "base": {
+            "target_living_expense": 15000,
+            "current_living_expense": 10000,
+            "debt": 2000
+        },
+        "vary": {
+            "new_income": {"start": 10000, "stop": 30000, "step": 5000},
+            "debt": [0, 2000, 5000]
+        }
+    }
+    
+    响应示例：
+    {
+        "success": true,
+        "data": {
+            "axes": [{"field": "debt", "values": [0, 2000, 5000]}, {"field": "new_income", "values": [10000, ...]}],
+            "shape": [3, 5],
+            "count": 15,
+            "investable_amount": [[5000.0, 10000.0, ...], ...],  // [debt 下标][new_income 下标]
+            "framework_allocation": {"基金组合": [[...], ...], ...},
+            "regular_investment_plan": {"days": [{"day": "周二", "amount": [[...], ...]}, ...], "weekly_total": [[...], ...]},
+            ...
+        }
+    }
+    """
+    return api_response(api.calculate_scenarios)
 
 
 @app.route('/api/config', methods=['GET'])
 def get_config():
-    """获取当前配置 API"""
-    return jsonify({
+    """获取当前配置 API
+    
+    响应体按配置版本预先序列化，带有 ETag 和 Last-Modified；
+    客户端携带的 If-None-Match / If-Modified-Since 与当前版本一致时返回 304。
+    """
+    return api_response(api.get_config)
+
+
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    """结果缓存统计 API
+    
+    返回命中、未命中、淘汰、过期次数等计数，用于评估缓存容量。
+    """
+    return json_response({
         'success': True,
-        'data': {
-            'framework': {
-                'fund_portfolio': config.fund_portfolio_ratio,
-                'bank_fixed_income': config.bank_fixed_income_ratio,
-                'physical_gold': config.physical_gold_ratio,
-                'reserve_fund': config.reserve_fund_ratio
-            },
-            'fund_portfolio': {
-                'bond_fund': config.bond_fund_ratio,
-                'dividend_fund': config.dividend_fund_ratio,
-                'us_index_fund': config.us_index_fund_ratio,
-                'gold_etf': config.gold_etf_ratio
-            },
-            'add_position_rules': config.add_position_rules,
-            'take_profit': {
-                'threshold': config.take_profit_threshold,
-                'ratio': config.take_profit_ratio
-            }
-        }
+        'data': result_cache.stats()
     })
 
 
@@ -165,7 +336,9 @@ def analyze_portfolio():
             "bank_fixed_income": 50000,
             "physical_gold": 5000,
             "reserve_fund": 5000
-        }
+        },
+        "portfolio_id": "p1"  // 可选：保存为组合的当前持仓（之后可用 PATCH 只提交变动），
+                              // 启用历史记录时异步记录持仓快照和分析结果
     }
 
     响应示例：
@@ -178,75 +351,239 @@ def analyze_portfolio():
         }
     }
     """
+    return api_response(api.analyze_portfolio)
+
+
+@app.route('/api/analyze-portfolio/stream', methods=['POST'])
+def analyze_portfolio_ndjson():
+    """流式持仓占比分析 API
+    
+    请求体为 NDJSON（每行一个 JSON 对象），逐行读取、逐行分析并立即写出，
+    不会把整个请求体读入内存。整个流使用同一个计算器实例，
+    中途更新配置不会影响正在进行的流。
+    
+    请求体示例（Content-Type: application/x-ndjson）：
+    {"id": "p1", "holdings": {"bond_fund": 10000, "bank_fixed_income": 50000}}
+    {"id": "p2", "holdings": {"dividend_fund": 8000, "reserve_fund": 5000}}
+    
+    响应示例（每行一个结果）：
+    {"line":1,"id":"p1","success":true,"data":{...}}
+    {"line":2,"id":"p2","success":true,"data":{...}}
+    """
+    stream_calculator = config_store.current.calculator
+    return Response(
+        stream_with_context(analyze_portfolio_stream(
+            stream_calculator, request.stream,
+            encoder=requested_encoder(), compact=compact_requested()
+        )),
+        mimetype='application/x-ndjson'
+    )
+
+
+@app.route('/api/rebalance', methods=['POST'])
+def rebalance_portfolio():
+    """再平衡交易 API
+
+    计算一组买卖划转，使投资大框架和基金组合内部同时回到容忍带内。
+
+    请求体示例：
+    {
+        "holdings": {
+            "bond_fund": 30000,
+            "dividend_fund": 2000,
+            "bank_fixed_income": 20000,
+            "reserve_fund": 15000
+        },
+        "min_trade": {  // 可选，各类别的最小交易金额
+            "bond_fund": 100
+        }
+    }
+
+    响应示例：
+    {
+        "success": true,
+        "data": {
+            "trades": {"bond_fund": -19447.58, "bank_fixed_income": 16850.1, ...},
+            "transfers": [{"from": "bond_fund", "to": "bank_fixed_income", "amount": 16850.1, ...}],
+            "turnover": 27747.63,
+            "holdings_after": {...},
+            "within_band": true
+        }
+    }
+    """
     try:
         # 1. 解析 JSON 请求体
         data = request.get_json()
         if not data:
-            return jsonify({
+            return json_response({
                 'success': False,
                 'error': '请求体不能为空'
             }), 400
 
-        # 2. 验证必填字段
-        if 'holdings' not in data:
-            return jsonify({
-                'success': False,
-                'error': '缺少必填字段: holdings'
-            }), 400
+        # 2. 按当前配置的类别验证持仓金额和最小交易金额
+        current_config = config_store.current.config
+        cleaned, errors = category_schemas(current_config.categories).rebalance.validate(data)
+        if errors:
+            return json_response(error_payload(errors)), 400
+
+        # 3. 按当前配置的比例和容忍带求解
+        result = rebalance(cleaned['holdings'], current_config, cleaned.get('min_trade'))
+
+        # 4. 返回成功响应
+        return json_response({
+            'success': True,
+            'data': result
+        }), 200
+
+    except Exception as e:
+        # 5. 处理异常并返回 500 错误
+        return json_response({
+            'success': False,
+            'error': f'服务器内部错误: {str(e)}'
+        }), 500
+
+
+@app.route('/api/portfolios/<portfolio_id>', methods=['PATCH'])
+def patch_portfolio(portfolio_id):
+    """增量更新持仓 API
+
+    对组合应用持仓金额变动（组合不存在时以全 0 持仓创建），
+    只返回分析结果发生变化的类别。
+
+    请求体示例：
+    {
+        "deltas": {
+            "us_index_fund": 1500,
+            "reserve_fund": -1500
+        }
+    }
 
-        holdings = data['holdings']
-        if not isinstance(holdings, dict):
-            return jsonify({
+    响应示例：
+    {
+        "success": true,
+        "data": {
+            "portfolio_id": "p1",
+            "version": 3,
+            "total_amount": 86000.00,
+            "framework_analysis": {"reserve_fund": {...}},
+            "fund_portfolio_analysis": {...},
+            "cleared": {"framework_analysis": false, "fund_portfolio_analysis": false}
+        }
+    }
+    """
+    try:
+        # 1. 解析 JSON 请求体
+        data = request.get_json()
+        if not data:
+            return json_response({
                 'success': False,
-                'error': 'holdings 必须是对象类型'
+                'error': '请求体不能为空'
             }), 400
 
-        # 3. 验证持仓金额字段
-        valid_fields = [
-            'bond_fund', 'dividend_fund', 'us_index_fund', 'gold_etf',
-            'bank_fixed_income', 'physical_gold', 'reserve_fund'
-        ]
+        # 2. 按当前配置的类别验证变动字段和金额
+        current_calculator = config_store.current.calculator
+        cleaned, errors = category_schemas(current_calculator.categories).portfolio_deltas.validate(data)
+        if errors:
+            return json_response(error_payload(errors)), 400
 
-        validated_holdings = {}
-        total_amount = 0.0
-
-        for field in valid_fields:
-            if field in holdings:
-                value = holdings[field]
-                if not isinstance(value, (int, float)):
-                    return jsonify({
-                        'success': False,
-                        'error': f'持仓金额 {field} 必须是数值类型'
-                    }), 400
-                if value < 0:
-                    return jsonify({
-                        'success': False,
-                        'error': f'持仓金额 {field} 不能为负数'
-                    }), 400
-                validated_holdings[field] = float(value)
-                total_amount += float(value)
-            else:
-                validated_holdings[field] = 0.0
-
-        # 4. 验证总持仓金额大于0
-        if total_amount == 0:
-            return jsonify({
+        # 3. 应用变动，只重新计算受影响的类别
+        try:
+            result = portfolio_store.apply_deltas(portfolio_id, cleaned['deltas'], current_calculator)
+        except ValueError as e:
+            return json_response({
                 'success': False,
-                'error': '总持仓金额不能为0，请至少输入一项持仓金额'
+                'error': str(e)
             }), 400
+        if compact_requested():
+            result = compact_analysis(result)
 
-        # 5. 调用计算器执行分析
-        result = calculator.analyze_portfolio(validated_holdings)
-
-        # 6. 返回成功响应
-        return jsonify({
+        # 4. 返回成功响应
+        return json_response({
             'success': True,
             'data': result
         }), 200
 
     except Exception as e:
-        # 7. 处理异常并返回 500 错误
-        return jsonify({
+        # 5. 处理异常并返回 500 错误
+        return json_response({
+            'success': False,
+            'error': f'服务器内部错误: {str(e)}'
+        }), 500
+
+
+@app.route('/api/portfolios/<portfolio_id>', methods=['GET'])
+def get_portfolio(portfolio_id):
+    """查询组合状态 API
+
+    返回组合的持仓金额和完整分析结果（格式与 /api/analyze-portfolio 相同）。
+    """
+    state = portfolio_store.get(portfolio_id, config_store.current.calculator)
+    if state is None:
+        return json_response({
+            'success': False,
+            'error': f'组合不存在: {portfolio_id}'
+        }), 404
+    result = state.snapshot()
+    if compact_requested():
+        result = compact_analysis(result)
+    return json_response({
+        'success': True,
+        'data': result
+    }), 200
+
+
+@app.route('/api/portfolios/<portfolio_id>/history', methods=['GET'])
+def portfolio_history(portfolio_id):
+    """组合偏差历史 API
+
+    查询参数：
+        start / end: 时间区间（Unix 时间戳或 ISO 8601 日期/时间），默认不限
+        level: 只返回某一层级（framework / fund_portfolio）
+        category: 只返回某一类别（如 us_index_fund）
+
+    响应示例：
+    {
+        "success": true,
+        "data": {
+            "portfolio_id": "p1",
+            "count": 2,
+            "timestamps": [1767225600.0, 1767312000.0],
+            "total_amount": [86000.0, 87500.0],
+            "series": {
+                "framework.fund_portfolio": {
+                    "name": "基金组合",
+                    "deviation": [0.23, -1.2],
+                    ...
+                }
+            }
+        }
+    }
+    """
+    if snapshot_store is None:
+        return json_response({
+            'success': False,
+            'error': '未启用持仓历史记录'
+        }), 404
+    try:
+        start = parse_timestamp(request.args.get('start'))
+        end = parse_timestamp(request.args.get('end'))
+    except ValueError:
+        return json_response({
+            'success': False,
+            'error': 'start 和 end 必须是 Unix 时间戳或 ISO 8601 日期'
+        }), 400
+    try:
+        history = snapshot_store.deviation_history(
+            portfolio_id, start, end,
+            level=request.args.get('level') or None,
+            category=request.args.get('category') or None
+        )
+        return json_response({
+            'success': True,
+            'data': history
+        })
+    except Exception as e:
+        return json_response({
             'success': False,
             'error': f'服务器内部错误: {str(e)}'
         }), 500
@@ -269,7 +606,8 @@ def update_config():
             "dividend_fund": 0.30,
             "us_index_fund": 0.15,
             "gold_etf": 0.15
-        }
+        },
+        "rebalance_tolerance": 0.05
     }
     
     响应示例：
@@ -280,75 +618,9 @@ def update_config():
         }
     }
     """
-    try:
-        # 1. 解析 JSON 请求体
-        data = request.get_json()
-        if not data:
-            return jsonify({
-                'success': False,
-                'error': '请求体不能为空'
-            }), 400
-            
-        # 2. 验证比例总和
-        if 'framework' in data:
-            framework_sum = sum(data['framework'].values())
-            if abs(framework_sum - 1.0) > 0.0001:
-                return jsonify({
-                    'success': False,
-                    'error': '投资大框架比例总和必须为 100%'
-                }), 400
-                
-        if 'fund_portfolio' in data:
-            portfolio_sum = sum(data['fund_portfolio'].values())
-            if abs(portfolio_sum - 1.0) > 0.0001:
-                return jsonify({
-                    'success': False,
-                    'error': '基金组合比例总和必须为 100%'
-                }), 400
-        
-        # 3. 更新配置
-        global config, calculator
-        
-        # 更新投资大框架比例
-        if 'framework' in data:
-            if 'fund_portfolio' in data['framework']:
-                config.fund_portfolio_ratio = data['framework']['fund_portfolio']
-            if 'bank_fixed_income' in data['framework']:
-                config.bank_fixed_income_ratio = data['framework']['bank_fixed_income']
-            if 'physical_gold' in data['framework']:
-                config.physical_gold_ratio = data['framework']['physical_gold']
-            if 'reserve_fund' in data['framework']:
-                config.reserve_fund_ratio = data['framework']['reserve_fund']
-        
-        # 更新基金组合比例
-        if 'fund_portfolio' in data:
-            if 'bond_fund' in data['fund_portfolio']:
-                config.bond_fund_ratio = data['fund_portfolio']['bond_fund']
-            if 'dividend_fund' in data['fund_portfolio']:
-                config.dividend_fund_ratio = data['fund_portfolio']['dividend_fund']
-            if 'us_index_fund' in data['fund_portfolio']:
-                config.us_index_fund_ratio = data['fund_portfolio']['us_index_fund']
-            if 'gold_etf' in data['fund_portfolio']:
-                config.gold_etf_ratio = data['fund_portfolio']['gold_etf']
-        
-        # 重新创建计算器实例
-        calculator = InvestmentCalculator(config)
-        
-        # 4. 返回成功响应
-        return jsonify({
-            'success': True,
-            'data': {
-                'message': '配置更新成功'
-            }
-        }), 200
-        
-    except Exception as e:
-        # 5. 处理异常并返回 500 错误
-        return jsonify({
-            'success': False,
-            'error': f'服务器内部错误: {str(e)}'
-        }), 500
+    return api_response(api.update_config)
 
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    from src.server import main
+    main()
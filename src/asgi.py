@@ -0,0 +1,209 @@
+"""
+ASGI 应用模块
+
+该模块基于 asyncio 提供与 Flask 应用相同契约的 ASGI 接口，面向大量并发连接的客户端
+（处理函数与 Flask 应用共用 src/handlers.py，本模块只负责路由、请求体读取和线程池调度）：
+
+- POST /api/calculate（含按列提交的持仓）
+- POST /api/calculate/batch
+- POST /api/calculate/scenarios
+- POST /api/analyze-portfolio
+- GET / PUT /api/config
+- GET /metrics（路由级别的请求数、错误数和延迟）
+
+请求体在事件循环上异步读取，慢速上传的客户端不占用线程。请求体较大
+（ASGI_OFFLOAD_BYTES 以上）的计算、批量计算、配置更新以及会写入组合状态的
+持仓分析在线程池中执行，其余小请求直接在事件循环上完成，省去线程切换。配置快照存储和组合状态与 Flask
+应用使用同一个后端（默认 SQLite 文件），两种部署可以共享配置和组合。
+
+不依赖任何 Web 框架；运行需要一个 ASGI 服务器，例如：
+    pip install uvicorn
+    python -m src.asgi --port 8000
+    gunicorn -k uvicorn.workers.UvicornWorker -w 4 src.asgi:app
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from src.handlers import CalculatorApi, RequestContext, Result, create_api_from_env
+from src.metrics import metrics
+from src.serialization import dumps
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 请求体上限，超过时返回 413
+MAX_BODY_BYTES = int(os.environ.get('ASGI_MAX_BODY_BYTES', 64 * 1024 * 1024))
+
+# 请求体达到该大小时，解析、校验和计算放到线程池中执行
+OFFLOAD_BYTES = int(os.environ.get('ASGI_OFFLOAD_BYTES', 64 * 1024))
+
+
+class ClientDisconnected(Exception):
+    """客户端在请求体传输完成前断开连接"""
+
+
+class AsgiApp:
+    """ASGI 3 应用：路由、请求体读取和线程池调度"""
+
+    # 路由：(方法, 路径) -> (处理函数名, 是否总是在线程池中执行)
+    # 处理函数可能访问 SQLite 或等待写入队列的路由总是在线程池中执行，
+    # 一次锁等待不会阻塞事件循环上的所有连接
+    ROUTES = {
+        ('POST', '/api/calculate'): ('calculate', False),
+        ('POST', '/api/calculate/batch'): ('calculate_batch', True),
+        ('POST', '/api/calculate/scenarios'): ('calculate_scenarios', True),
+        ('POST', '/api/analyze-portfolio'): ('analyze_portfolio', True),
+        ('GET', '/api/config'): ('get_config', False),
+        ('PUT', '/api/config'): ('update_config', True),
+    }
+
+    def __init__(self, api: CalculatorApi, executor_workers: Optional[int] = None):
+        """
+        Args:
+            api: 同步处理函数
+            executor_workers: 线程池大小，默认由 ThreadPoolExecutor 决定
+        """
+        self.api = api
+        self.executor_workers = executor_workers
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.paths = {path for _, path in self.ROUTES}
+
+    def _executor(self) -> ThreadPoolExecutor:
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.executor_workers, thread_name_prefix='asgi-worker')
+        return self.executor
+
+    async def __call__(self, scope: Dict, receive: Callable[[], Awaitable[Dict]], send: Callable) -> None:
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive, send) -> None:
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                self._executor()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self.executor is not None:
+                    self.executor.shutdown(wait=True)
+                    self.executor = None
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _http(self, scope: Dict, receive, send) -> None:
+        started = time.perf_counter()
+        method, path = scope['method'], scope['path']
+        extra_headers: List[Tuple[bytes, bytes]] = []
+        route = path if path in self.paths or path == '/metrics' else 'unmatched'
+
+        if method == 'OPTIONS':
+            # CORS 预检请求（与 Flask 应用的 flask-cors 默认行为一致：允许任意来源）
+            status, body, content_type = 204, b'', 'text/plain'
+        elif path == '/metrics' and method == 'GET':
+            status, body, content_type = 200, metrics.render().encode('utf-8'), 'text/plain; version=0.0.4; charset=utf-8'
+        else:
+            query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+            headers = {
+                name.decode('latin-1').lower(): value.decode('latin-1')
+                for name, value in scope.get('headers', [])
+            }
+            ctx = RequestContext(query, b'', headers)
+            try:
+                status, body = await self._dispatch(method, path, ctx, receive)
+            except ClientDisconnected:
+                return
+            content_type = 'application/json'
+            extra_headers = [
+                (name.lower().encode('latin-1'), value.encode('latin-1'))
+                for name, value in ctx.response_headers
+            ]
+
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [
+                (b'content-type', content_type.encode('latin-1')),
+                (b'content-length', str(len(body)).encode('latin-1')),
+                (b'access-control-allow-origin', b'*'),
+                (b'access-control-allow-methods', b'GET, POST, PUT, OPTIONS'),
+                (b'access-control-allow-headers', b'Content-Type'),
+            ] + extra_headers,
+        })
+        await send({'type': 'http.response.body', 'body': body})
+        metrics.observe_request(route, method, status, time.perf_counter() - started)
+
+    async def _dispatch(self, method: str, path: str, ctx: RequestContext, receive) -> Result:
+        entry = self.ROUTES.get((method, path))
+        if entry is None:
+            if path in self.paths:
+                return 405, dumps({'success': False, 'error': f'不支持的请求方法: {method}'}, ctx.encoder)
+            return 404, dumps({'success': False, 'error': f'接口不存在: {path}'}, ctx.encoder)
+
+        body = await self._read_body(receive)
+        if body is None:
+            return 413, dumps({'success': False, 'error': '请求体过大'}, ctx.encoder)
+        ctx.body = body
+
+        name, always_offload = entry
+        handler = getattr(self.api, name)
+        if always_offload or len(body) >= OFFLOAD_BYTES:
+            return await asyncio.get_running_loop().run_in_executor(self._executor(), handler, ctx)
+        return handler(ctx)
+
+    @staticmethod
+    async def _read_body(receive) -> Optional[bytes]:
+        """异步读取完整请求体，超过 MAX_BODY_BYTES 时返回 None
+
+        Raises:
+            ClientDisconnected: 请求体传输完成前客户端断开连接
+        """
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                raise ClientDisconnected()
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if size > MAX_BODY_BYTES:
+                return None
+            chunks.append(chunk)
+            if not message.get('more_body', False):
+                break
+        return b''.join(chunks)
+
+
+def create_app() -> AsgiApp:
+    """按环境变量创建 ASGI 应用（处理函数及配置后端、缓存、组合状态等设置与 Flask 应用相同）"""
+    workers = os.environ.get('ASGI_EXECUTOR_WORKERS')
+    return AsgiApp(create_api_from_env(BASE_DIR), int(workers) if workers else None)
+
+
+app = create_app()
+
+
+def main(argv=None) -> int:
+    """使用 uvicorn 运行 ASGI 应用"""
+    parser = argparse.ArgumentParser(description='闲钱永不眠管理计算器 ASGI 服务')
+    parser.add_argument('--host', default=os.environ.get('HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 8000)))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('WEB_WORKERS', 1)), help='工作进程数')
+    args = parser.parse_args(argv)
+
+    try:
+        import uvicorn
+    except ImportError:
+        parser.error('运行 ASGI 服务需要安装 uvicorn：pip install uvicorn')
+    uvicorn.run('src.asgi:app', host=args.host, port=args.port, workers=args.workers, lifespan='on')
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
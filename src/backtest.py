@@ -0,0 +1,316 @@
+"""
+历史净值回测模块
+
+该模块在真实的历史净值上逐日回放每周定投计划和加仓/止盈规则。
+
+净值存储为列式目录，每个基金类别一个 .npy 文件（文件名为类别键），外加一个日期索引：
+
+    nav_store/
+        dates.npy            # datetime64[D]，升序
+        bond_fund.npy        # float64，与 dates 等长
+        dividend_fund.npy
+        us_index_fund.npy
+        gold_etf.npy
+
+回测使用配置中的基金类别，存储中需要包含每个类别的净值文件。
+
+文件以内存映射方式打开，按日期区间取数时只做切片，不复制数据，
+也不会把整段历史读入 Python 列表。规则回放复用 simulation.replay_strategy，
+把单条历史净值视为一条路径。
+
+命令行用法：
+    python -m src.backtest import nav.csv nav_store/
+    python -m src.backtest run nav_store/ --weekly 7500 --start 2010-01-01
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass
+from typing import Dict, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.calculator import InvestmentCalculator
+from src.categories import CategoryRegistry, WEEKDAYS as WEEKDAY_NAMES
+from src.config import InvestmentConfig
+from src.rules import RuleTable
+from src.simulation import eligible_mask, replay_strategy
+
+DATES_FILE = 'dates.npy'
+
+WEEKDAYS = {day: index for index, day in enumerate(WEEKDAY_NAMES)}
+
+
+class NavStore:
+    """内存映射的列式净值存储"""
+
+    def __init__(self, directory: str):
+        """
+        Args:
+            directory: 存储目录（由 import_csv 或 write 生成），其中每个 .npy 文件
+                       （日期索引除外）是一个基金类别的净值
+
+        Raises:
+            FileNotFoundError: 目录中缺少日期索引
+        """
+        self.directory = directory
+        self.dates = np.load(os.path.join(directory, DATES_FILE), mmap_mode='r')
+        self.columns: Dict[str, np.ndarray] = {
+            name[:-len('.npy')]: np.load(os.path.join(directory, name), mmap_mode='r')
+            for name in sorted(os.listdir(directory))
+            if name.endswith('.npy') and name != DATES_FILE
+        }
+        for key, column in self.columns.items():
+            if column.shape != self.dates.shape:
+                raise ValueError(f'净值文件 {key}.npy 的长度与日期索引不一致')
+
+    def __len__(self) -> int:
+        return self.dates.shape[0]
+
+    def window(self, start: Optional[str] = None, end: Optional[str] = None) -> slice:
+        """返回日期区间 [start, end] 对应的下标切片（日期为 YYYY-MM-DD）"""
+        lo = 0 if start is None else int(np.searchsorted(self.dates, np.datetime64(start, 'D'), side='left'))
+        hi = len(self) if end is None else int(np.searchsorted(self.dates, np.datetime64(end, 'D'), side='right'))
+        return slice(lo, hi)
+
+    def column(self, key: str, start: Optional[str] = None, end: Optional[str] = None) -> np.ndarray:
+        """某个基金类别在日期区间内的净值（内存映射上的视图，不复制）"""
+        return self.columns[key][self.window(start, end)]
+
+    def require(self, keys: Sequence[str]) -> None:
+        """检查存储中包含这些基金类别的净值
+
+        Raises:
+            ValueError: 缺少某个基金类别的净值文件
+        """
+        missing = [key for key in keys if key not in self.columns]
+        if missing:
+            raise ValueError(f'净值存储缺少基金类别: {", ".join(missing)}')
+
+    @staticmethod
+    def write(directory: str, dates: np.ndarray, columns: Mapping[str, np.ndarray]) -> 'NavStore':
+        """将日期索引和各类别净值（{类别键: 净值}）写入存储目录"""
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, DATES_FILE), np.asarray(dates, dtype='datetime64[D]'))
+        for key, column in columns.items():
+            np.save(os.path.join(directory, f'{key}.npy'), np.asarray(column, dtype=np.float64))
+        return NavStore(directory)
+
+    @staticmethod
+    def import_csv(csv_path: str, directory: str, categories: Optional[CategoryRegistry] = None) -> 'NavStore':
+        """从 CSV 导入净值
+
+        CSV 第一列为日期（YYYY-MM-DD），其余列名为基金类别的键（如 bond_fund）
+        或名称（如 中短债基金）。空值沿用前一个交易日的净值；
+        在所有类别都有净值之前的行会被丢弃。
+
+        Args:
+            csv_path: 净值 CSV 文件
+            directory: 存储目录
+            categories: 类别注册表，导入其中的基金类别，默认为默认配置的类别
+
+        Raises:
+            ValueError: 缺少某个基金类别的列，或没有完整的数据行
+        """
+        funds = (categories or InvestmentConfig().categories).funds
+        fund_keys = funds.keys
+        aliases = {}
+        for key, name in zip(funds.keys, funds.names):
+            aliases[key] = key
+            aliases[name] = key
+
+        with open(csv_path, 'r', encoding='utf-8-sig', newline='') as f:
+            reader = csv.reader(f)
+            header = next(reader)
+            positions = {aliases[name.strip()]: i for i, name in enumerate(header) if name.strip() in aliases}
+            missing = [key for key in fund_keys if key not in positions]
+            if missing:
+                raise ValueError(f'CSV 缺少基金类别列: {", ".join(missing)}')
+            dates = []
+            values = []
+            for row in reader:
+                if not row or not row[0].strip():
+                    continue
+                dates.append(row[0].strip())
+                values.append([float(row[positions[key]]) if row[positions[key]].strip() else np.nan
+                               for key in fund_keys])
+
+        dates = np.array(dates, dtype='datetime64[D]')
+        values = np.array(values, dtype=np.float64).reshape(len(dates), len(fund_keys))
+        order = np.argsort(dates, kind='stable')
+        dates, values = dates[order], values[order]
+
+        # 前向填充：每个位置取该列最近一个非空值的下标
+        filled = np.where(np.isnan(values), 0, np.arange(len(dates))[:, None])
+        np.maximum.accumulate(filled, axis=0, out=filled)
+        values = values[filled, np.arange(len(fund_keys))]
+
+        complete = ~np.isnan(values).any(axis=1)
+        if not complete.any():
+            raise ValueError('CSV 中没有所有基金类别都有净值的数据行')
+        first = int(np.argmax(complete))
+        return NavStore.write(directory, dates[first:], {
+            key: values[first:, i] for i, key in enumerate(fund_keys)
+        })
+
+
+def weekly_schedule(plan: Mapping, categories: CategoryRegistry) -> Tuple[np.ndarray, np.ndarray]:
+    """从定投计划中取出各基金每周的定投金额和定投日（按基金类别顺序，周一为 0）
+
+    Args:
+        plan: calculate 返回的 regular_investment_plan，
+              或 {基金名称: 金额} 形式的 fund_allocation（定投日取类别注册表中的定投日）
+        categories: 类别注册表
+    """
+    if 'funds' in plan:
+        amounts = {fund['name']: fund['amount'] for fund in plan['funds']}
+        weekdays = {fund['name']: WEEKDAYS[fund['day']] for fund in plan['funds']}
+    else:
+        amounts = plan
+        weekdays = {c.name: WEEKDAYS[c.weekday] for c in categories.funds if c.weekday is not None}
+    names = categories.funds.names
+    return (
+        np.array([float(amounts.get(name, 0.0)) for name in names]),
+        np.array([weekdays.get(name, 0) for name in names])
+    )
+
+
+def contribution_schedule(dates: np.ndarray, amounts: np.ndarray, weekdays: np.ndarray) -> np.ndarray:
+    """按交易日生成每日定投金额 (days, funds)
+
+    每只基金在每周的定投日买入；定投日休市时顺延到同一周内的下一个交易日，
+    该周之后没有交易日则跳过。
+    """
+    days = dates.astype('datetime64[D]').astype(np.int64)
+    # 1970-01-01 是周四：(days + 3) % 7 为周几（周一为 0），(days + 3) // 7 为周序号
+    weekday = (days + 3) % 7
+    week = (days + 3) // 7
+    schedule = np.zeros((len(days), len(amounts)))
+    for i, target in enumerate(weekdays):
+        candidates = np.flatnonzero(weekday >= target)
+        _, first = np.unique(week[candidates], return_index=True)
+        schedule[candidates[first], i] = amounts[i]
+    return schedule
+
+
+@dataclass
+class BacktestResult:
+    """回测结果"""
+
+    start: str
+    end: str
+    days: int
+    invested: float
+    withdrawn: float
+    final_value: float
+    fund_value: Dict[str, float]
+    add_count: int
+    take_profit_count: int
+
+    def to_dict(self) -> Dict:
+        profit = self.final_value + self.withdrawn - self.invested
+        return {
+            'start': self.start,
+            'end': self.end,
+            'days': self.days,
+            'invested': round(self.invested, 2),
+            'withdrawn': round(self.withdrawn, 2),
+            'final_value': round(self.final_value, 2),
+            'profit': round(profit, 2),
+            'total_return': round(profit / self.invested * 100, 2) if self.invested > 0 else 0.0,
+            'fund_value': {name: round(value, 2) for name, value in self.fund_value.items()},
+            'add_count': self.add_count,
+            'take_profit_count': self.take_profit_count,
+        }
+
+
+def backtest_plan(
+    config: InvestmentConfig,
+    plan: Mapping,
+    store: NavStore,
+    start: Optional[str] = None,
+    end: Optional[str] = None
+) -> BacktestResult:
+    """在历史净值上逐日回放定投计划和加仓/止盈规则
+
+    每个交易日按计划买入当天的定投基金，并对所有持仓检查加仓和止盈规则。
+
+    Args:
+        config: 投资配置（提供基金类别、加仓和止盈规则）
+        plan: 定投计划，见 weekly_schedule
+        store: 净值存储
+        start: 开始日期（含），默认从头开始
+        end: 结束日期（含），默认到最后一个交易日
+
+    Returns:
+        回测结果
+
+    Raises:
+        ValueError: 净值存储缺少配置中的基金类别，或日期区间内没有交易日
+    """
+    funds = config.categories.funds
+    store.require(funds.keys)
+    window = store.window(start, end)
+    dates = store.dates[window]
+    if dates.shape[0] == 0:
+        raise ValueError('日期区间内没有交易日')
+
+    # 单条历史路径：(days, funds, 1)
+    nav = np.stack([store.columns[key][window] for key in funds.keys], axis=1)[:, :, None]
+    amounts, weekdays = weekly_schedule(plan, config.categories)
+    contributions = contribution_schedule(dates, amounts, weekdays)
+
+    rules = RuleTable.from_config(config)
+    result = replay_strategy(nav, contributions, rules, eligible_mask(rules, config.categories))
+    return BacktestResult(
+        start=str(dates[0]),
+        end=str(dates[-1]),
+        days=int(dates.shape[0]),
+        invested=float(result.invested[0]),
+        withdrawn=float(result.withdrawn[0]),
+        final_value=float(result.final_value[0]),
+        fund_value={name: float(v) for name, v in zip(funds.names, result.fund_value[0])},
+        add_count=int(result.add_count[0]),
+        take_profit_count=int(result.take_profit_count[0]),
+    )
+
+
+def main(argv=None) -> int:
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description='历史净值回测')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = commands.add_parser('import', help='从 CSV 导入净值')
+    import_parser.add_argument('csv', help='净值 CSV 文件')
+    import_parser.add_argument('store', help='存储目录')
+
+    run_parser = commands.add_parser('run', help='运行回测')
+    run_parser.add_argument('store', help='存储目录')
+    run_parser.add_argument('--weekly', type=float, required=True, help='每周定投总额')
+    run_parser.add_argument('--start', help='开始日期 YYYY-MM-DD')
+    run_parser.add_argument('--end', help='结束日期 YYYY-MM-DD')
+    args = parser.parse_args(argv)
+
+    if args.command == 'import':
+        store = NavStore.import_csv(args.csv, args.store)
+        print(f'已导入 {len(store)} 个交易日: {store.dates[0]} ~ {store.dates[-1]}')
+        return 0
+
+    config = InvestmentConfig()
+    calculator = InvestmentCalculator(config)
+    plan = calculator._generate_regular_investment_plan(calculator._allocate_fund_portfolio(args.weekly))
+
+    started = time.perf_counter()
+    result = backtest_plan(config, plan, NavStore(args.store), args.start, args.end).to_dict()
+    result['elapsed_seconds'] = round(time.perf_counter() - started, 3)
+    json.dump(result, sys.stdout, ensure_ascii=False, indent=2)
+    sys.stdout.write('\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
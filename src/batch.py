@@ -0,0 +1,616 @@
+"""
+离线批量计算模块
+
+该模块不经过 HTTP，直接对客户数据文件批量执行投资计算或持仓分析：
+
+- calculate：每行一位客户的 target_living_expense、current_living_expense、
+  debt、new_income，按 InvestmentCalculator._calculate_columns 按列计算
+- analyze：每行一个持仓组合，列名为类别注册表的 holding_keys（缺少的列按 0 处理），
+  按 InvestmentCalculator._analysis_columns 按列分析
+
+输入为 CSV（首行为列名）或 Parquet（需要安装 pyarrow）。输入按行划分为数据块，
+分发到进程池：CSV 在主进程中只扫描一遍换行符位置，各工作进程按字节区间
+自行读取和解析自己的数据块，Parquet 由工作进程按行区间读取所在的行组。
+
+结果为列式文件，每个数据块一个分片，写入输出目录：
+
+    output/
+        _batch.json                          # 运行参数（模式、输入、配置）
+        part-000000000000-000000100000.parquet
+        part-000000100000-000000200000.parquet
+        ...
+
+安装了 pyarrow 时分片为 Parquet，否则为 NumPy 的 .npz（每列一个数组），
+可以用 load_output 按行号顺序合并读取。分片先写入临时文件再改名，
+中断后以相同参数重新运行会跳过已完成的行（按已有分片覆盖的行区间扣除，
+不同 --offset 的运行之间也不会重复计算）；--offset 从指定行开始处理，跳过之前的行。
+
+命令行用法：
+    python -m src.batch calculate clients.csv -o output/ --workers 8
+    python -m src.batch analyze holdings.parquet -o output/ --id-column client_id --offset 2000000
+"""
+
+import argparse
+import hashlib
+import io
+import itertools
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from src.calculator import InvestmentCalculator
+from src.config import InvestmentConfig
+
+try:
+    import pyarrow
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - 取决于运行环境
+    pyarrow = None
+    pq = None
+
+# calculate 模式的输入列
+CALCULATE_FIELDS = ('target_living_expense', 'current_living_expense', 'debt', 'new_income')
+
+MODES = ('calculate', 'analyze')
+
+# 输出目录中的运行参数文件
+MANIFEST_FILE = '_batch.json'
+
+PART_PATTERN = re.compile(r'^part-(\d{12})-(\d{12})\.(parquet|npz)$')
+
+# 扫描 CSV 换行符时每次读取的字节数
+SCAN_BLOCK_SIZE = 16 * 1024 * 1024
+
+
+# ---------------------------------------------------------------------------
+# 输入
+# ---------------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class BatchInput:
+    """输入文件
+
+    Attributes:
+        path: 文件路径
+        kind: csv / parquet
+        columns: 列名
+    """
+
+    path: str
+    kind: str
+    columns: Tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class Chunk:
+    """一个数据块：数据行 [start, stop)，CSV 数据块另有字节区间 [byte_start, byte_stop)"""
+
+    start: int
+    stop: int
+    byte_start: int = 0
+    byte_stop: int = 0
+
+
+def open_input(path: str) -> BatchInput:
+    """读取输入文件的列名
+
+    Raises:
+        ValueError: 文件格式不支持，或读取 Parquet 文件时未安装 pyarrow
+    """
+    if path.endswith('.parquet'):
+        if pq is None:
+            raise ValueError('读取 Parquet 文件需要安装 pyarrow')
+        return BatchInput(path, 'parquet', tuple(pq.ParquetFile(path).schema_arrow.names))
+    if path.endswith('.csv'):
+        with open(path, 'rb') as f:
+            header = f.readline().decode('utf-8-sig')
+        return BatchInput(path, 'csv', tuple(name.strip().strip('"') for name in header.split(',')))
+    raise ValueError(f'不支持的输入文件格式: {path}（仅支持 .csv 和 .parquet）')
+
+
+def _data_end(path: str) -> Tuple[int, int]:
+    """最后一个数据行的结束位置
+
+    文件末尾的空行不计入数据行（np.loadtxt 会跳过空行），最后一个数据块读到这里为止。
+
+    Returns:
+        (结束的字节位置, 该位置之后的换行符个数)
+    """
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        f.seek(max(0, size - 4096))
+        tail = f.read()
+    end = size - len(tail) + len(tail.rstrip())
+    return end, tail[len(tail.rstrip()):].count(b'\n')
+
+
+def plan_chunks(
+    source: BatchInput,
+    chunk_size: int,
+    offset: int = 0,
+    done: Iterable[Tuple[int, int]] = ()
+) -> Tuple[int, List[Chunk]]:
+    """划分数据块
+
+    第一个数据块从第 offset 行开始，之后的边界对齐到 chunk_size 的整数倍，
+    因此不同 offset 的运行产生的分片边界一致（第一个分片除外）。
+    已完成的行区间从数据块中扣除，只剩未覆盖的部分（可能比 chunk_size 短）。
+    CSV 只在主进程中扫描一遍换行符，记录各数据块起始行的字节位置。
+
+    Args:
+        source: 输入文件
+        chunk_size: 每个数据块的行数
+        offset: 从第 offset 行开始
+        done: 已完成的行区间 [(start, stop)]（见 completed_parts）
+
+    Returns:
+        (数据行数, 待处理的数据块列表)
+    """
+    done = sorted(done)
+    if source.kind == 'parquet':
+        rows = pq.ParquetFile(source.path).metadata.num_rows
+        bounds = _subtract_done(_chunk_bounds(rows, chunk_size, offset), done)
+        return rows, [Chunk(start, stop) for start, stop in bounds]
+
+    # 已完成区间的边界可能成为数据块的边界，同样需要记录字节位置
+    edges = np.array(sorted({edge for part in done for edge in part}), dtype=np.int64)
+
+    with open(source.path, 'rb') as f:
+        position = len(f.readline())
+        header_end = position
+        positions = {0: position}   # {行号: 该行起始的字节位置}
+        newlines = 0
+        while True:
+            block = f.read(SCAN_BLOCK_SIZE)
+            if not block:
+                break
+            found = np.flatnonzero(np.frombuffer(block, dtype=np.uint8) == ord('\n'))
+            # 第 k 个换行符之后是第 newlines + k + 1 行
+            next_rows = newlines + 1 + np.arange(len(found))
+            wanted = (next_rows == offset) | (next_rows % chunk_size == 0) | np.isin(next_rows, edges)
+            positions.update(zip(next_rows[wanted].tolist(), (position + found[wanted] + 1).tolist()))
+            newlines += len(found)
+            position += len(block)
+    end, trailing_newlines = _data_end(source.path)
+    rows = newlines - trailing_newlines + 1 if end > header_end else 0
+    bounds = _subtract_done(_chunk_bounds(rows, chunk_size, offset), done)
+    return rows, [
+        Chunk(start, stop, positions[start], positions.get(stop, end)) for start, stop in bounds
+    ]
+
+
+def _chunk_bounds(rows: int, chunk_size: int, offset: int) -> List[Tuple[int, int]]:
+    starts = [offset] + list(range((offset // chunk_size + 1) * chunk_size, rows, chunk_size))
+    starts = [start for start in starts if start < rows]
+    return list(zip(starts, starts[1:] + [rows]))
+
+
+def _subtract_done(bounds: List[Tuple[int, int]], done: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """从各数据块 [start, stop) 中扣除已完成的行区间（done 按起点排序）"""
+    remaining = []
+    for start, stop in bounds:
+        cursor = start
+        for done_start, done_stop in done:
+            if done_stop <= cursor or done_start >= stop:
+                continue
+            if done_start > cursor:
+                remaining.append((cursor, done_start))
+            cursor = max(cursor, done_stop)
+            if cursor >= stop:
+                break
+        if cursor < stop:
+            remaining.append((cursor, stop))
+    return remaining
+
+
+def input_fields(mode: str, source: BatchInput, calculator: InvestmentCalculator) -> Tuple[str, ...]:
+    """读取的数值列
+
+    Raises:
+        ValueError: calculate 模式缺少输入列，或 analyze 模式没有任何持仓列
+    """
+    if mode == 'calculate':
+        missing = [name for name in CALCULATE_FIELDS if name not in source.columns]
+        if missing:
+            raise ValueError(f'输入缺少列: {", ".join(missing)}')
+        return CALCULATE_FIELDS
+    fields = tuple(key for key in calculator.categories.holding_keys if key in source.columns)
+    if not fields:
+        raise ValueError(f'输入中没有持仓列，列名应为: {", ".join(calculator.categories.holding_keys)}')
+    return fields
+
+
+def read_chunk(
+    source: BatchInput,
+    chunk: Chunk,
+    fields: Sequence[str],
+    id_column: Optional[str] = None
+) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """读取一个数据块
+
+    Returns:
+        ((行数, 列数) 的 float64 数组, 标识列或 None)
+
+    Raises:
+        ValueError: 数据无法解析、行数与划分时不一致（中间有空行），
+            或存在空值、负数
+    """
+    if source.kind == 'parquet':
+        values, ids = _read_parquet_chunk(source, chunk, fields, id_column)
+    else:
+        values, ids = _read_csv_chunk(source, chunk, fields, id_column)
+
+    if len(values) != chunk.stop - chunk.start:
+        raise ValueError(f'第 {chunk.start + 1} ~ {chunk.stop} 行的数据块行数不一致，请删除文件中的空行')
+    invalid = ~(np.isfinite(values) & (values >= 0))
+    if invalid.any():
+        row, column = np.argwhere(invalid)[0]
+        raise ValueError(f'第 {chunk.start + row + 1} 行的 {fields[column]} 必须为非负数')
+    return values, ids
+
+
+def _read_csv_chunk(
+    source: BatchInput,
+    chunk: Chunk,
+    fields: Sequence[str],
+    id_column: Optional[str]
+) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    with open(source.path, 'rb') as f:
+        f.seek(chunk.byte_start)
+        text = f.read(chunk.byte_stop - chunk.byte_start).decode('utf-8')
+    try:
+        values = np.loadtxt(
+            io.StringIO(text), delimiter=',', quotechar='"', dtype=np.float64, ndmin=2,
+            usecols=[source.columns.index(name) for name in fields]
+        )
+        ids = None
+        if id_column is not None:
+            ids = np.loadtxt(
+                io.StringIO(text), delimiter=',', quotechar='"', dtype=str, ndmin=1,
+                usecols=source.columns.index(id_column)
+            )
+    except ValueError as e:
+        raise ValueError(f'第 {chunk.start + 1} ~ {chunk.stop} 行的数据块解析失败: {e}') from e
+    return values, ids
+
+
+def _read_parquet_chunk(
+    source: BatchInput,
+    chunk: Chunk,
+    fields: Sequence[str],
+    id_column: Optional[str]
+) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    # 只读取与 [start, stop) 有交集的行组
+    parquet = pq.ParquetFile(source.path)
+    names = list(fields) + ([id_column] if id_column is not None else [])
+    tables = []
+    first = 0
+    for group in range(parquet.num_row_groups):
+        size = parquet.metadata.row_group(group).num_rows
+        if first < chunk.stop and first + size > chunk.start:
+            start = max(chunk.start, first)
+            stop = min(chunk.stop, first + size)
+            tables.append(parquet.read_row_group(group, columns=names).slice(start - first, stop - start))
+        first += size
+    table = pyarrow.concat_tables(tables)
+
+    values = np.empty((table.num_rows, len(fields)), dtype=np.float64)
+    for j, name in enumerate(fields):
+        values[:, j] = table.column(name).cast(pyarrow.float64()).to_numpy()
+    ids = None
+    if id_column is not None:
+        ids = np.asarray(table.column(id_column).cast(pyarrow.string()).to_pylist(), dtype=str)
+    return values, ids
+
+
+# ---------------------------------------------------------------------------
+# 计算与输出
+# ---------------------------------------------------------------------------
+
+def result_columns(
+    calculator: InvestmentCalculator,
+    mode: str,
+    values: np.ndarray,
+    fields: Sequence[str]
+) -> Dict[str, np.ndarray]:
+    """计算一个数据块，结果展开为扁平的列
+
+    列名为 "结果字段.类别键"（analyze 模式为 "结果字段.类别键.分析字段"），
+    定投计划为 "plan.定投日"。
+    """
+    categories = calculator.categories
+    output: Dict[str, np.ndarray] = {}
+    if mode == 'calculate':
+        columns = calculator._calculate_columns(*values.T)
+        for name in ('valid', 'living_expense_gap', 'investable_amount'):
+            output[name] = columns[name]
+        for j, key in enumerate(categories.framework.keys):
+            output[f'framework_allocation.{key}'] = columns['framework'][:, j]
+        for j, key in enumerate(categories.funds.keys):
+            output[f'fund_allocation.{key}'] = columns['funds'][:, j]
+        for j, day in enumerate(categories.plan_days):
+            output[f'plan.{day}'] = columns['days'][:, j]
+        output['weekly_total'] = columns['weekly_total']
+        return output
+
+    # analyze 模式：缺少的持仓列按 0 处理
+    holdings = np.zeros((len(values), len(categories.holding_keys)))
+    for j, name in enumerate(fields):
+        holdings[:, categories.holding_keys.index(name)] = values[:, j]
+    columns = calculator._analysis_columns(holdings)
+    for name in ('total_amount', 'framework_valid', 'fund_portfolio_valid'):
+        output[name] = columns[name]
+    for level, keys in (('framework_analysis', categories.framework.keys),
+                        ('fund_portfolio_analysis', categories.funds.keys)):
+        for j, key in enumerate(keys):
+            for field, column in columns[level].items():
+                output[f'{level}.{key}.{field}'] = column[:, j]
+    return output
+
+
+def part_name(chunk: Chunk, fmt: str) -> str:
+    return f'part-{chunk.start:012d}-{chunk.stop:012d}.{fmt}'
+
+
+def write_part(directory: str, chunk: Chunk, columns: Dict[str, np.ndarray], fmt: str) -> str:
+    """写出一个分片（先写临时文件再改名，中断时不会留下不完整的分片）"""
+    path = os.path.join(directory, part_name(chunk, fmt))
+    temp_path = path + '.tmp'
+    if fmt == 'parquet':
+        pq.write_table(pyarrow.table(columns), temp_path)
+    else:
+        with open(temp_path, 'wb') as f:
+            np.savez(f, **columns)
+    os.replace(temp_path, path)
+    return path
+
+
+def process_chunk(
+    calculator: InvestmentCalculator,
+    mode: str,
+    source: BatchInput,
+    chunk: Chunk,
+    fields: Sequence[str],
+    id_column: Optional[str],
+    directory: str,
+    fmt: str
+) -> int:
+    """读取、计算并写出一个数据块，返回行数"""
+    values, ids = read_chunk(source, chunk, fields, id_column)
+    columns = {'row': np.arange(chunk.start, chunk.stop, dtype=np.int64)}
+    if ids is not None:
+        columns[id_column] = ids
+    columns.update(result_columns(calculator, mode, values, fields))
+    write_part(directory, chunk, columns, fmt)
+    return chunk.stop - chunk.start
+
+
+# 工作进程中的计算器（由 _init_worker 按配置构建）
+_worker_calculator: Optional[InvestmentCalculator] = None
+
+
+def _init_worker(config_data: Dict[str, Any]) -> None:
+    global _worker_calculator
+    _worker_calculator = InvestmentCalculator(InvestmentConfig.from_dict(config_data))
+
+
+def _process_task(*args) -> int:
+    return process_chunk(_worker_calculator, *args)
+
+
+# ---------------------------------------------------------------------------
+# 输出目录
+# ---------------------------------------------------------------------------
+
+def completed_parts(directory: str) -> Set[Tuple[int, int]]:
+    """输出目录中已完成的分片 {(start, stop)}"""
+    if not os.path.isdir(directory):
+        return set()
+    parts = set()
+    for name in os.listdir(directory):
+        match = PART_PATTERN.match(name)
+        if match:
+            parts.add((int(match.group(1)), int(match.group(2))))
+    return parts
+
+
+def _check_manifest(directory: str, manifest: Dict[str, Any]) -> None:
+    """写入运行参数；输出目录已有运行参数时确认是同一组参数
+
+    Raises:
+        ValueError: 输出目录来自另一组参数
+    """
+    path = os.path.join(directory, MANIFEST_FILE)
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            existing = json.load(f)
+        if existing.get('fingerprint') != manifest['fingerprint']:
+            raise ValueError(f'输出目录 {directory} 来自另一组参数，请更换输出目录')
+        return
+    os.makedirs(directory, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+
+def load_output(directory: str) -> Dict[str, np.ndarray]:
+    """按行号顺序读取并合并输出目录中的全部分片
+
+    分片覆盖的行区间有重叠时（例如旧版本以不同 offset 运行留下的分片），每行只保留一次。
+    """
+    names = sorted(name for name in os.listdir(directory) if PART_PATTERN.match(name))
+    parts: List[Dict[str, np.ndarray]] = []
+    for name in names:
+        path = os.path.join(directory, name)
+        if name.endswith('.parquet'):
+            table = pq.read_table(path)
+            parts.append({column: table.column(column).to_numpy() for column in table.column_names})
+        else:
+            with np.load(path) as data:
+                parts.append({column: data[column] for column in data.files})
+    if not parts:
+        return {}
+    merged = {column: np.concatenate([part[column] for part in parts]) for column in parts[0]}
+    rows, first = np.unique(merged['row'], return_index=True)
+    if len(rows) == len(merged['row']) and np.array_equal(first, np.arange(len(rows))):
+        return merged
+    return {column: values[first] for column, values in merged.items()}
+
+
+# ---------------------------------------------------------------------------
+# 运行
+# ---------------------------------------------------------------------------
+
+def run_batch(
+    mode: str,
+    input_path: str,
+    output_dir: str,
+    config: Optional[InvestmentConfig] = None,
+    workers: int = 0,
+    chunk_size: int = 100_000,
+    offset: int = 0,
+    id_column: Optional[str] = None,
+    fmt: Optional[str] = None,
+    progress: Optional[Callable[[int, int], None]] = None
+) -> Dict[str, Any]:
+    """运行批量计算
+
+    Args:
+        mode: calculate / analyze
+        input_path: CSV 或 Parquet 输入文件
+        output_dir: 输出目录；已有分片覆盖的行不再计算
+        config: 投资配置，默认使用 InvestmentConfig()
+        workers: 进程数，0 表示在当前进程中运行
+        chunk_size: 每个数据块的行数
+        offset: 从第 offset 行（从 0 开始）开始处理
+        id_column: 原样复制到输出的标识列
+        fmt: 分片格式 parquet / npz，默认有 pyarrow 时为 parquet
+        progress: 可选的回调 progress(已完成行数, 需处理的总行数)
+
+    Returns:
+        运行摘要：rows（输入行数）、processed（本次处理的行数）、
+        skipped（已完成而跳过的行数）、parts（本次写出的分片数）
+
+    Raises:
+        ValueError: 参数无效、输入缺少列、输出目录来自另一组参数，或数据无法解析
+    """
+    if mode not in MODES:
+        raise ValueError(f'不支持的模式: {mode}')
+    if chunk_size <= 0 or offset < 0:
+        raise ValueError('chunk_size 必须大于 0，offset 不能为负数')
+    fmt = fmt or ('parquet' if pyarrow is not None else 'npz')
+    if fmt == 'parquet' and pyarrow is None:
+        raise ValueError('输出 Parquet 文件需要安装 pyarrow')
+    if fmt not in ('parquet', 'npz'):
+        raise ValueError(f'不支持的输出格式: {fmt}')
+
+    config = config or InvestmentConfig()
+    calculator = InvestmentCalculator(config)
+    source = open_input(input_path)
+    fields = input_fields(mode, source, calculator)
+    if id_column is not None and id_column not in source.columns:
+        raise ValueError(f'输入缺少标识列: {id_column}')
+
+    config_data = config.to_dict()
+    fingerprint = hashlib.sha1(json.dumps({
+        'mode': mode,
+        'input': os.path.abspath(input_path),
+        'input_size': os.path.getsize(input_path),
+        'chunk_size': chunk_size,
+        'id_column': id_column,
+        'format': fmt,
+        'config': config_data,
+    }, sort_keys=True).encode('utf-8')).hexdigest()
+    _check_manifest(output_dir, {
+        'fingerprint': fingerprint,
+        'mode': mode,
+        'input': os.path.abspath(input_path),
+        'chunk_size': chunk_size,
+        'format': fmt,
+        'config_version': config.version,
+    })
+
+    rows, tasks = plan_chunks(source, chunk_size, offset, completed_parts(output_dir))
+    total = max(rows - offset, 0)
+    completed = total - sum(chunk.stop - chunk.start for chunk in tasks)
+    summary = {'rows': rows, 'processed': 0, 'skipped': completed, 'parts': 0}
+
+    def record(count: int) -> None:
+        nonlocal completed
+        completed += count
+        summary['processed'] += count
+        summary['parts'] += 1
+        if progress is not None:
+            progress(completed, total)
+
+    if progress is not None:
+        progress(completed, total)
+    args = (mode, source)
+    if workers <= 0 or len(tasks) <= 1:
+        for chunk in tasks:
+            record(process_chunk(calculator, *args, chunk, fields, id_column, output_dir, fmt))
+        return summary
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(config_data,)) as pool:
+        # 在途任务数保持为进程数的两倍，结果由工作进程直接写出，不经过主进程
+        pending = set()
+        queue = iter(tasks)
+        for chunk in itertools.islice(queue, workers * 2):
+            pending.add(pool.submit(_process_task, *args, chunk, fields, id_column, output_dir, fmt))
+        while pending:
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                record(future.result())
+                for chunk in itertools.islice(queue, 1):
+                    pending.add(pool.submit(_process_task, *args, chunk, fields, id_column, output_dir, fmt))
+    return summary
+
+
+def main(argv=None) -> int:
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description='离线批量投资计算 / 持仓分析')
+    parser.add_argument('mode', choices=MODES, help='calculate：投资计算；analyze：持仓分析')
+    parser.add_argument('input', help='输入文件（.csv 或 .parquet）')
+    parser.add_argument('-o', '--output', required=True, help='输出目录（已有分片时续跑）')
+    parser.add_argument('--config', help='配置 JSON 文件（InvestmentConfig.to_dict 的格式），默认使用默认配置')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='进程数（默认为 CPU 核数），0 表示不使用进程池')
+    parser.add_argument('--chunk-size', type=int, default=100_000, help='每个数据块的行数')
+    parser.add_argument('--offset', type=int, default=0, help='从第几行（从 0 开始）开始处理')
+    parser.add_argument('--id-column', help='原样复制到输出的标识列')
+    parser.add_argument('--format', choices=('parquet', 'npz'), help='分片格式，默认有 pyarrow 时为 parquet')
+    args = parser.parse_args(argv)
+
+    config = None
+    if args.config:
+        with open(args.config, 'r', encoding='utf-8') as f:
+            config = InvestmentConfig.from_dict(json.load(f))
+
+    started = time.perf_counter()
+
+    def report(completed: int, total: int) -> None:
+        elapsed = time.perf_counter() - started
+        rate = completed / elapsed if elapsed > 0 else 0.0
+        print(f'\r已完成 {completed}/{total} 行（{rate:,.0f} 行/秒）', end='', file=sys.stderr, flush=True)
+
+    summary = run_batch(
+        args.mode, args.input, args.output, config=config, workers=args.workers,
+        chunk_size=args.chunk_size, offset=args.offset, id_column=args.id_column,
+        fmt=args.format, progress=report
+    )
+    print(f'\n耗时 {time.perf_counter() - started:.2f} 秒', file=sys.stderr)
+    json.dump(summary, sys.stdout, ensure_ascii=False, indent=2)
+    sys.stdout.write('\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,160 @@
+"""
+计算结果缓存模块
+
+该模块为 InvestmentCalculator.calculate 和 analyze_portfolio 提供有界的
+LRU + TTL 结果缓存。缓存键由规范化后的输入和配置版本号组成，
+配置更新时整体失效。
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Union
+
+from src.holdings import HoldingsArray
+
+
+class ResultCache:
+    """线程安全的 LRU + TTL 结果缓存
+
+    - 超过 maxsize 时淘汰最久未使用的条目
+    - 条目超过 ttl 秒后视为过期
+    - maxsize 为 0 时缓存关闭，所有请求直接计算
+
+    缓存返回的是同一个结果对象，调用方必须把它当作只读数据使用。
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0):
+        """初始化缓存
+
+        Args:
+            maxsize: 最大条目数，0 表示关闭缓存
+            ttl: 条目有效期（秒）
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """查询缓存，未命中或已过期返回 None"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """写入缓存，必要时淘汰最久未使用的条目"""
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key: Optional[Hashable], compute: Callable[[], Any]) -> Any:
+        """命中则返回缓存结果，否则计算并写入缓存
+
+        计算在锁外进行；并发的相同请求可能各自计算一次，结果相同。
+
+        Args:
+            key: 缓存键，为 None 时跳过缓存
+            compute: 未命中时调用的计算函数
+
+        Returns:
+            计算结果
+        """
+        if key is None or self.maxsize <= 0:
+            return compute()
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def invalidate(self) -> None:
+        """清空全部条目（配置更新时调用）"""
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """返回缓存统计信息"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+def calculate_key(
+    config_version: int,
+    target_living_expense: float,
+    current_living_expense: float,
+    debt: float,
+    new_income: float,
+    holdings: Optional[Union[List[Dict], HoldingsArray]] = None
+) -> Optional[Hashable]:
+    """生成 calculate 的缓存键
+
+    数值统一转换为 float，使 15000 与 15000.0 命中同一条目；
+    持仓保持原顺序，因为建议列表的顺序依赖于它。
+    HoldingsArray 使用各列内容的摘要，不展开为逐条元组。
+
+    Returns:
+        缓存键；持仓中包含不可哈希的值时返回 None（跳过缓存）
+    """
+    try:
+        holdings_key = None
+        if isinstance(holdings, HoldingsArray):
+            holdings_key = holdings.cache_key() if len(holdings) else None
+        elif holdings:
+            holdings_key = tuple(tuple(sorted(holding.items())) for holding in holdings)
+        key = (
+            'calculate',
+            config_version,
+            float(target_living_expense),
+            float(current_living_expense),
+            float(debt),
+            float(new_income),
+            holdings_key
+        )
+        hash(key)
+        return key
+    except (AttributeError, TypeError):
+        return None
+
+
+def analyze_key(config_version: int, holdings: Dict[str, float]) -> Hashable:
+    """生成 analyze_portfolio 的缓存键
+
+    Args:
+        config_version: 配置版本号
+        holdings: 已验证的持仓字典（值均为 float）
+    """
+    return ('analyze_portfolio', config_version, tuple(sorted(holdings.items())))
@@ -6,10 +6,27 @@
 - 投资分配计算
 - 定投计划生成
 - 加仓和止盈建议计算
+
+投资类别由配置的类别注册表（src/categories.py）提供，这里不引用具体的类别名称。
 """
 
-from typing import Dict, Optional, List, Any
+from bisect import bisect_left
+from typing import Dict, Optional, List, Any, Sequence, Tuple, Union
+
+import numpy as np
+
+from src.cents import apportion, apportion_many, round_amounts, to_cents, to_cents_array
 from src.config import InvestmentConfig
+from src.holdings import HoldingsArray, SuggestionColumns
+from src.metrics import metrics
+from src.rules import RuleTable
+
+# 投资计算的四个输入字段（calculate 的参数顺序）
+INPUT_FIELDS = ('target_living_expense', 'current_living_expense', 'debt', 'new_income')
+
+# 持仓列表达到该条数时，加仓和止盈建议转为列式计算（HoldingsArray），
+# 条数较少时逐条计算更快（转换为数组的固定开销约 100 µs）
+SUGGESTION_ARRAY_THRESHOLD = 128
 
 
 class InvestmentCalculator:
@@ -26,7 +43,18 @@ class InvestmentCalculator:
             config: 投资配置对象
         """
         self.config = config
+        # 记录构建时的配置版本，作为结果缓存键的一部分
+        self.config_version = config.version
+        # 加仓/止盈规则在构建时编译一次，所有请求共享
+        self.rules = RuleTable.from_config(config)
+        # 类别注册表在配置构建时生成，所有请求共享
+        self.categories = config.categories
+        self.tolerance = config.rebalance_tolerance
+        # 定投计划中的基金按顺序预先展开：(名称, 定投日)
+        funds = self.categories.funds.categories
+        self._plan_funds = tuple((funds[i].name, funds[i].weekday) for i in self.categories.plan_order)
     
+    @metrics.timed('calculator.living_expense_gap')
     def _calculate_living_expense_gap(
         self, target: float, current: float
     ) -> float:
@@ -44,6 +72,7 @@ class InvestmentCalculator:
         """
         return max(0, target - current)
     
+    @metrics.timed('calculator.investable_amount')
     def _calculate_investable_amount(
         self, income: float, gap: float, debt: float
     ) -> float:
@@ -62,92 +91,84 @@ class InvestmentCalculator:
         """
         return income - gap - debt
     
+    @metrics.timed('calculator.allocate_framework')
     def _allocate_framework(self, investable_amount: float) -> Dict[str, float]:
         """计算投资大框架分配
         
-        根据配置的比例将可投资金额分配到四个大类：
-        - 基金组合
-        - 银行固收 R2
-        - 实体黄金（积存金）
-        - 备用金
+        根据配置的比例将可投资金额分配到大框架各类别（默认为基金组合、
+        银行固收 R2、实体黄金、备用金）。
         
         Args:
             investable_amount: 可投资金额
         
         Returns:
-            包含各大类分配金额的字典，所有金额保留两位小数
+            {类别名称: 分配金额}，所有金额保留两位小数，
+            各类别之和恰好等于 round(investable_amount, 2)
         """
-        return {
-            "基金组合": round(investable_amount * self.config.fund_portfolio_ratio, 2),
-            "银行固收R2": round(investable_amount * self.config.bank_fixed_income_ratio, 2),
-            "实体黄金": round(investable_amount * self.config.physical_gold_ratio, 2),
-            "备用金": round(investable_amount * self.config.reserve_fund_ratio, 2)
-        }
+        framework = self.categories.framework
+        parts = apportion(to_cents(investable_amount), framework.weights)
+        return {name: part / 100 for name, part in zip(framework.names, parts)}
     
+    @metrics.timed('calculator.allocate_fund_portfolio')
     def _allocate_fund_portfolio(self, fund_portfolio_amount: float) -> Dict[str, float]:
         """计算基金组合内部分配
         
-        根据配置的比例将基金组合金额分配到四个基金类别：
-        - 中短债基金
-        - 红利低波/沪深300
-        - 标普/纳指
-        - 黄金 ETF 联接 C
+        根据配置的比例将基金组合金额分配到各基金类别（默认为中短债基金、
+        红利低波/沪深300、标普/纳指、黄金 ETF 联接 C）。
         
         Args:
             fund_portfolio_amount: 基金组合总金额
         
         Returns:
-            包含各基金类别分配金额的字典，所有金额保留两位小数
+            {基金名称: 分配金额}，所有金额保留两位小数，
+            各类别之和恰好等于 round(fund_portfolio_amount, 2)
         """
-        return {
-            "中短债基金": round(fund_portfolio_amount * self.config.bond_fund_ratio, 2),
-            "红利低波/沪深300": round(fund_portfolio_amount * self.config.dividend_fund_ratio, 2),
-            "标普/纳指": round(fund_portfolio_amount * self.config.us_index_fund_ratio, 2),
-            "黄金ETF联接C": round(fund_portfolio_amount * self.config.gold_etf_ratio, 2)
-        }
+        funds = self.categories.funds
+        parts = apportion(to_cents(fund_portfolio_amount), funds.weights)
+        return {name: part / 100 for name, part in zip(funds.names, parts)}
     
+    @metrics.timed('calculator.regular_investment_plan')
     def _generate_regular_investment_plan(self, fund_allocation: Dict[str, float]) -> Dict:
         """生成定投计划
         
-        根据基金组合分配金额生成每周定投计划：
-        - 周二：标普/纳指
-        - 周四：中短债基金 + 红利低波/沪深300 + 黄金 ETF 联接 C
+        每个基金类别在其配置的定投日定投（默认周二：标普/纳指；
+        周四：中短债基金 + 红利低波/沪深300 + 黄金 ETF 联接 C），
+        未设置定投日的类别不参与定投。
         
         Args:
-            fund_allocation: 基金组合分配字典
+            fund_allocation: 基金组合分配字典（_allocate_fund_portfolio 的结果，金额为两位小数）
         
         Returns:
             包含定投计划的字典，包括：
+            - days: 每个定投日的定投金额，每项包含 day、amount
             - tuesday_amount: 周二定投金额
             - thursday_amount: 周四定投金额
             - weekly_total: 每周总定投金额
-            - funds: 基金列表，每项包含 name、amount、day
+            - funds: 基金列表（按定投日排序），每项包含 name、amount、day
         """
-        tuesday_amount = fund_allocation["标普/纳指"]
-        thursday_amount = (
-            fund_allocation["中短债基金"] +
-            fund_allocation["红利低波/沪深300"] +
-            fund_allocation["黄金ETF联接C"]
-        )
+        # 金额已是两位小数，乘 100 后四舍五入即为精确的整数分
+        day_totals = dict.fromkeys(self.categories.plan_days, 0)
+        plan_funds = []
+        for name, day in self._plan_funds:
+            cents = round(fund_allocation[name] * 100)
+            day_totals[day] += cents
+            plan_funds.append({"name": name, "amount": cents / 100, "day": day})
         
         return {
-            "tuesday_amount": round(tuesday_amount, 2),
-            "thursday_amount": round(thursday_amount, 2),
-            "weekly_total": round(tuesday_amount + thursday_amount, 2),
-            "funds": [
-                {"name": "标普/纳指", "amount": round(fund_allocation["标普/纳指"], 2), "day": "周二"},
-                {"name": "中短债基金", "amount": round(fund_allocation["中短债基金"], 2), "day": "周四"},
-                {"name": "红利低波/沪深300", "amount": round(fund_allocation["红利低波/沪深300"], 2), "day": "周四"},
-                {"name": "黄金ETF联接C", "amount": round(fund_allocation["黄金ETF联接C"], 2), "day": "周四"}
-            ]
+            "days": [{"day": day, "amount": total / 100} for day, total in day_totals.items()],
+            "tuesday_amount": day_totals.get("周二", 0) / 100,
+            "thursday_amount": day_totals.get("周四", 0) / 100,
+            "weekly_total": sum(day_totals.values()) / 100,
+            "funds": plan_funds
         }
     
-    def _calculate_suggestions(self, holdings: Optional[List[Dict]]) -> Dict:
+    @metrics.timed('calculator.suggestions')
+    def _calculate_suggestions(self, holdings: Optional[Union[List[Dict], HoldingsArray]]) -> Dict:
         """计算加仓和止盈建议
         
         根据持仓数据和配置的规则计算加仓和止盈建议。
-        仅对以下基金应用规则：红利低波/沪深300、标普/纳指、黄金 ETF 联接 C
-        中短债基金不参与加仓和止盈。
+        仅对类别注册表中适用规则的基金应用（默认为红利低波/沪深300、标普/纳指、
+        黄金 ETF 联接 C，中短债基金不参与加仓和止盈）。
         
         Args:
             holdings: 持仓数据列表，每项包含：
@@ -155,6 +176,8 @@ class InvestmentCalculator:
                 - holding_cost: 持仓成本
                 - current_nav: 当前净值
                 - holding_amount: 持仓金额
+                也可以是 HoldingsArray，此时按列计算，结果与列表形式逐位相同；
+                列表达到 SUGGESTION_ARRAY_THRESHOLD 条时同样转为按列计算
         
         Returns:
             包含加仓和止盈建议的字典：
@@ -171,9 +194,16 @@ class InvestmentCalculator:
                 "total_profit_amount": 0.0
             }
         
-        # 可以应用加仓和止盈规则的基金
-        applicable_funds = {"红利低波/沪深300", "标普/纳指", "黄金ETF联接C"}
+        if isinstance(holdings, HoldingsArray):
+            return self.suggestion_columns(holdings).to_dict()
+        if len(holdings) >= SUGGESTION_ARRAY_THRESHOLD:
+            return self.suggestion_columns(HoldingsArray.from_records(holdings)).to_dict()
         
+        rules = self.rules
+        applicable_funds = rules.applicable_funds
+        thresholds = rules.thresholds
+        n_thresholds = len(thresholds)
+        take_profit_threshold = rules.take_profit_threshold
         add_suggestions = []
         profit_suggestions = []
         total_add = 0.0
@@ -197,30 +227,29 @@ class InvestmentCalculator:
             # 计算收益率
             return_rate = (current_nav - holding_cost) / holding_cost
             
-            # 检查加仓规则（按跌幅从大到小检查）
-            sorted_thresholds = sorted(self.config.add_position_rules.keys())
-            for threshold in sorted_thresholds:
-                if return_rate <= threshold:
-                    add_ratio = self.config.add_position_rules[threshold]
-                    add_amount = round(holding_amount * add_ratio, 2)
-                    add_suggestions.append({
-                        "fund_name": fund_name,
-                        "return_rate": round(return_rate * 100, 2),
-                        "threshold": round(threshold * 100, 2),
-                        "add_ratio": round(add_ratio * 100, 2),
-                        "add_amount": add_amount
-                    })
-                    total_add += add_amount
-                    break  # 只应用最严重的跌幅规则
+            # 检查加仓规则（二分查找命中的最严重跌幅档位）
+            index = bisect_left(thresholds, return_rate)
+            if index < n_thresholds:
+                threshold = thresholds[index]
+                add_ratio = rules.add_ratios[index]
+                add_amount = round(holding_amount * add_ratio, 2)
+                add_suggestions.append({
+                    "fund_name": fund_name,
+                    "return_rate": round(return_rate * 100, 2),
+                    "threshold": round(threshold * 100, 2),
+                    "add_ratio": round(add_ratio * 100, 2),
+                    "add_amount": add_amount
+                })
+                total_add += add_amount
             
             # 检查止盈规则
-            if return_rate >= self.config.take_profit_threshold:
-                profit_amount = round(holding_amount * self.config.take_profit_ratio, 2)
+            if return_rate >= take_profit_threshold:
+                profit_amount = round(holding_amount * rules.take_profit_ratio, 2)
                 profit_suggestions.append({
                     "fund_name": fund_name,
                     "return_rate": round(return_rate * 100, 2),
-                    "threshold": round(self.config.take_profit_threshold * 100, 2),
-                    "profit_ratio": round(self.config.take_profit_ratio * 100, 2),
+                    "threshold": round(rules.take_profit_threshold * 100, 2),
+                    "profit_ratio": round(rules.take_profit_ratio * 100, 2),
                     "profit_amount": profit_amount
                 })
                 total_profit += profit_amount
@@ -232,13 +261,64 @@ class InvestmentCalculator:
             "total_profit_amount": round(total_profit, 2)
         }
     
+    def suggestion_columns(self, holdings: HoldingsArray) -> SuggestionColumns:
+        """按列计算加仓和止盈建议
+
+        规则与 _calculate_suggestions 相同：跳过不适用的基金和持仓成本为 0 的持仓，
+        命中的持仓保持输入顺序，合计金额按顺序逐项累加后保留两位小数。
+
+        Args:
+            holdings: 列式持仓
+
+        Returns:
+            只包含命中规则持仓的列式建议
+        """
+        rules = self.rules
+
+        # 1. 筛选适用的基金且持仓成本不为 0 的持仓
+        selected = np.flatnonzero(holdings.code_mask(rules.applicable_funds) & (holdings.holding_cost != 0))
+        cost = holdings.holding_cost[selected]
+        return_rate = (holdings.current_nav[selected] - cost) / cost
+        amount = holdings.holding_amount[selected]
+        codes = holdings.codes[selected]
+
+        # 2. 批量分类收益率
+        add_index, take_profit = rules.classify(return_rate)
+        add_mask = add_index >= 0
+        percent_rate = round_amounts(return_rate * 100)
+
+        # 3. 加仓建议：阈值和比例按档位查表
+        tiers = add_index[add_mask]
+        add_amount = round_amounts(amount[add_mask] * np.asarray(rules.add_ratios, dtype=np.float64)[tiers])
+        thresholds = np.array([round(t * 100, 2) for t in rules.thresholds], dtype=np.float64)
+        ratios = np.array([round(r * 100, 2) for r in rules.add_ratios], dtype=np.float64)
+
+        # 4. 止盈建议
+        profit_amount = round_amounts(amount[take_profit] * rules.take_profit_ratio)
+
+        names = holdings.names
+        return SuggestionColumns(
+            add_names=[names[code] for code in codes[add_mask].tolist()],
+            add_return_rate=percent_rate[add_mask],
+            add_threshold=thresholds[tiers],
+            add_ratio=ratios[tiers],
+            add_amount=add_amount,
+            profit_names=[names[code] for code in codes[take_profit].tolist()],
+            profit_return_rate=percent_rate[take_profit],
+            profit_amount=profit_amount,
+            profit_threshold=round(rules.take_profit_threshold * 100, 2),
+            profit_ratio=round(rules.take_profit_ratio * 100, 2),
+            total_add_amount=round(sum(add_amount.tolist(), 0.0), 2),
+            total_profit_amount=round(sum(profit_amount.tolist(), 0.0), 2),
+        )
+    
     def calculate(
         self,
         target_living_expense: float,
         current_living_expense: float,
         debt: float,
         new_income: float,
-        holdings: Optional[List[Dict]] = None
+        holdings: Optional[Union[List[Dict], HoldingsArray]] = None
     ) -> Dict:
         """执行完整的投资计算
         
@@ -252,6 +332,7 @@ class InvestmentCalculator:
                 - holding_cost: 持仓成本
                 - current_nav: 当前净值
                 - holding_amount: 持仓金额
+                也可以是列式的 HoldingsArray
         
         Returns:
             包含所有计算结果的字典：
@@ -281,6 +362,7 @@ class InvestmentCalculator:
             result["framework_allocation"] = {}
             result["fund_allocation"] = {}
             result["regular_investment_plan"] = {
+                "days": [],
                 "tuesday_amount": 0.0,
                 "thursday_amount": 0.0,
                 "weekly_total": 0.0,
@@ -299,7 +381,7 @@ class InvestmentCalculator:
         result["framework_allocation"] = framework
         
         # 6. 计算基金组合分配
-        fund_allocation = self._allocate_fund_portfolio(framework["基金组合"])
+        fund_allocation = self._allocate_fund_portfolio(framework[self.categories.portfolio_name])
         result["fund_allocation"] = fund_allocation
         
         # 7. 生成定投计划
@@ -310,13 +392,287 @@ class InvestmentCalculator:
         
         return result
 
+    def classify_return_rates(self, return_rates: Sequence[float]) -> Dict[str, np.ndarray]:
+        """批量分类收益率
+
+        使用预编译的规则表一次性判断一组收益率命中的加仓档位和止盈条件。
+
+        Args:
+            return_rates: 收益率数组（小数形式）
+
+        Returns:
+            包含以下数组的字典：
+            - add_index: 命中的加仓规则下标，未命中为 -1
+            - add_ratio: 命中的加仓比例，未命中为 0
+            - take_profit: 是否达到止盈阈值
+        """
+        add_index, take_profit = self.rules.classify(return_rates)
+        ratios = np.append(np.asarray(self.rules.add_ratios, dtype=np.float64), 0.0)
+        return {
+            "add_index": add_index,
+            "add_ratio": ratios[add_index],
+            "take_profit": take_profit
+        }
+
+    def _calculate_columns(
+        self,
+        target_living_expense: Sequence[float],
+        current_living_expense: Sequence[float],
+        debt: Sequence[float],
+        new_income: Sequence[float]
+    ) -> Dict[str, np.ndarray]:
+        """按列批量计算投资分配
+
+        与 calculate 的计算步骤一一对应，但每一步都在 NumPy 数组上整列完成，
+        分配同样按整数分用最大余数法分摊（apportion_many），逐行结果与 calculate 相同。
+        可投资金额 ≤ 0 的行在各分配列中为 0，并由 valid 列标记。
+
+        Args:
+            target_living_expense: 生活费 1.5 月固定金额数组
+            current_living_expense: 剩余生活费金额数组
+            debt: 负债金额数组
+            new_income: 新增收入数组
+
+        Returns:
+            各计算结果列组成的字典，每列的行数与输入一致：
+            - valid、living_expense_gap、investable_amount、weekly_total: 一维数组
+            - framework / funds: 各类别分配金额，列顺序与类别注册表一致
+            - days: 各定投日的定投金额，列顺序与 plan_days 一致
+        """
+        target = np.asarray(target_living_expense, dtype=np.float64)
+        current = np.asarray(current_living_expense, dtype=np.float64)
+        debt_arr = np.asarray(debt, dtype=np.float64)
+        income = np.asarray(new_income, dtype=np.float64)
+
+        # 1. 生活费缺口与可投资金额
+        gap = np.maximum(0.0, target - current)
+        investable = income - gap - debt_arr
+        valid = investable > 0
+        base = np.where(valid, investable, 0.0)
+
+        # 2. 投资大框架分配（整数分，最大余数法）
+        categories = self.categories
+        framework = apportion_many(to_cents_array(base), categories.framework.weights)
+
+        # 3. 基金组合分配
+        funds = apportion_many(framework[:, categories.portfolio_index], categories.funds.weights)
+
+        # 4. 定投计划：各基金类别的分配金额按定投日汇总
+        days = funds @ categories.day_matrix
+
+        return {
+            "valid": valid,
+            "living_expense_gap": round_amounts(gap),
+            "investable_amount": round_amounts(investable),
+            "framework": framework / 100,
+            "funds": funds / 100,
+            "days": days / 100,
+            "weekly_total": days.sum(axis=1) / 100
+        }
+
+    def calculate_many(
+        self,
+        target_living_expense: Sequence[float],
+        current_living_expense: Sequence[float],
+        debt: Sequence[float],
+        new_income: Sequence[float]
+    ) -> List[Dict]:
+        """批量执行投资计算
+
+        四个参数为等长数组，第 i 行的结果与
+        calculate(target[i], current[i], debt[i], income[i]) 相同（不含持仓建议）。
+        计算在 NumPy 中按列完成，仅在最后一步转换为逐行字典。
+
+        Args:
+            target_living_expense: 生活费 1.5 月固定金额数组
+            current_living_expense: 剩余生活费金额数组
+            debt: 负债金额数组
+            new_income: 新增收入数组
+
+        Returns:
+            结果字典列表，结构与 calculate 的返回值一致
+        """
+        columns = self._calculate_columns(
+            target_living_expense, current_living_expense, debt, new_income
+        )
+        # 一次性转换为 Python 原生类型，避免逐元素访问 NumPy 标量
+        rows = {key: column.tolist() for key, column in columns.items()}
+        categories = self.categories
+        framework_names = categories.framework.names
+        fund_names = categories.funds.names
+        weekdays = [c.weekday for c in categories.funds]
+        plan_days = categories.plan_days
+        plan_order = categories.plan_order
+
+        results = []
+        for i, valid in enumerate(rows["valid"]):
+            result: Dict[str, Any] = {
+                "living_expense_gap": rows["living_expense_gap"][i],
+                "investable_amount": rows["investable_amount"][i]
+            }
+
+            # 可投资金额 ≤ 0 的行与 calculate 的警告分支保持一致
+            if not valid:
+                result["warning"] = "可投资金额不足，无法进行投资分配"
+                result["framework_allocation"] = {}
+                result["fund_allocation"] = {}
+                result["regular_investment_plan"] = {
+                    "days": [],
+                    "tuesday_amount": 0.0,
+                    "thursday_amount": 0.0,
+                    "weekly_total": 0.0,
+                    "funds": []
+                }
+                result["suggestions"] = self._calculate_suggestions(None)
+                results.append(result)
+                continue
+
+            fund_row = rows["funds"][i]
+            day_totals = dict(zip(plan_days, rows["days"][i]))
+            result["framework_allocation"] = dict(zip(framework_names, rows["framework"][i]))
+            result["fund_allocation"] = dict(zip(fund_names, fund_row))
+            result["regular_investment_plan"] = {
+                "days": [{"day": day, "amount": amount} for day, amount in day_totals.items()],
+                "tuesday_amount": day_totals.get("周二", 0.0),
+                "thursday_amount": day_totals.get("周四", 0.0),
+                "weekly_total": rows["weekly_total"][i],
+                "funds": [
+                    {"name": fund_names[j], "amount": fund_row[j], "day": weekdays[j]}
+                    for j in plan_order
+                ]
+            }
+            result["suggestions"] = self._calculate_suggestions(None)
+            results.append(result)
+
+        return results
+
+    def calculate_grid(
+        self,
+        base: Dict[str, float],
+        axes: Sequence[Tuple[str, Sequence[float]]]
+    ) -> Dict[str, Any]:
+        """按情景网格批量计算（敏感性分析）
+
+        输入字段中 axes 列出的字段按网格取值，其余字段取 base 中的基准值。
+        网格展开为列后一次完成 _calculate_columns，结果再按网格形状还原为嵌套数组：
+        第一个变化字段为第一维，result[i][j] 对应第一个字段的第 i 个取值和
+        第二个字段的第 j 个取值。每个格子的结果与 calculate 相同（不含持仓建议）；
+        可投资金额 ≤ 0 的格子 valid 为 false，各分配金额为 0。
+
+        Args:
+            base: 四个输入字段的基准值（axes 中的字段可以省略）
+            axes: [(字段名, 取值列表)]，字段名不重复
+
+        Returns:
+            - axes: [{"field": 字段名, "values": 取值列表}]
+            - shape、count: 网格形状和格子数
+            - valid、living_expense_gap、investable_amount: 嵌套数组
+            - framework_allocation / fund_allocation: {类别名称: 嵌套数组}
+            - regular_investment_plan: days（[{"day": 定投日, "amount": 嵌套数组}]）和 weekly_total
+        """
+        shape = tuple(len(values) for _, values in axes)
+        count = int(np.prod(shape))
+        inputs = {field: np.full(count, base.get(field, 0.0), dtype=np.float64) for field in INPUT_FIELDS}
+        grids = np.meshgrid(*[np.asarray(values, dtype=np.float64) for _, values in axes], indexing='ij')
+        for (field, _), grid in zip(axes, grids):
+            inputs[field] = grid.ravel()
+
+        columns = self._calculate_columns(*(inputs[field] for field in INPUT_FIELDS))
+
+        def nested(column: np.ndarray) -> List:
+            return column.reshape(shape).tolist()
+
+        categories = self.categories
+        return {
+            "axes": [{"field": field, "values": list(values)} for field, values in axes],
+            "shape": list(shape),
+            "count": count,
+            "valid": nested(columns["valid"]),
+            "living_expense_gap": nested(columns["living_expense_gap"]),
+            "investable_amount": nested(columns["investable_amount"]),
+            "framework_allocation": {
+                name: nested(columns["framework"][:, j]) for j, name in enumerate(categories.framework.names)
+            },
+            "fund_allocation": {
+                name: nested(columns["funds"][:, j]) for j, name in enumerate(categories.funds.names)
+            },
+            "regular_investment_plan": {
+                "days": [
+                    {"day": day, "amount": nested(columns["days"][:, j])}
+                    for j, day in enumerate(categories.plan_days)
+                ],
+                "weekly_total": nested(columns["weekly_total"])
+            }
+        }
+
+    def _analysis_entry(
+        self,
+        name: str,
+        amount: float,
+        base_amount: float,
+        expected_ratio: float
+    ) -> Dict[str, Any]:
+        """计算单个类别的持仓分析结果
+
+        大框架类别以总持仓金额为基数，基金组合内部类别以基金组合金额为基数。
+        偏差超过配置的容忍带（rebalance_tolerance，默认 ±5%）时给出增持或减持建议。
+
+        Args:
+            name: 类别名称
+            amount: 类别持仓金额
+            base_amount: 计算占比的基数（大于 0）
+            expected_ratio: 预期占比
+
+        Returns:
+            分析结果字典，包括 name、expected_ratio、actual_ratio、expected_amount、
+            actual_amount、deviation、diff_amount、status、action、adjust_amount、need_adjustment
+        """
+        actual_ratio = amount / base_amount
+        deviation = actual_ratio - expected_ratio
+
+        # 计算预期金额和调整金额
+        expected_amount = base_amount * expected_ratio
+        diff_amount = amount - expected_amount
+
+        # 判断状态
+        tolerance = self.tolerance
+        if abs(deviation) <= tolerance:
+            status = "配置合理"
+            need_adjustment = False
+            action = "无需调整"
+            adjust_amount = 0.0
+        elif deviation > tolerance:
+            status = "建议减持"
+            need_adjustment = True
+            action = "建议减持"
+            adjust_amount = round(diff_amount, 2)
+        else:
+            status = "建议增持"
+            need_adjustment = True
+            action = "建议增持"
+            adjust_amount = round(abs(diff_amount), 2)
+
+        return {
+            "name": name,
+            "expected_ratio": round(expected_ratio * 100, 2),
+            "actual_ratio": round(actual_ratio * 100, 2),
+            "expected_amount": round(expected_amount, 2),
+            "actual_amount": round(amount, 2),
+            "deviation": round(deviation * 100, 2),
+            "diff_amount": round(diff_amount, 2),
+            "status": status,
+            "action": action,
+            "adjust_amount": adjust_amount,
+            "need_adjustment": need_adjustment
+        }
+
     def analyze_portfolio(self, holdings: Dict[str, float]) -> Dict:
         """分析持仓占比
 
         根据用户当前的持仓数据，计算实际占比并与预期配置进行对比分析。
 
         Args:
-            holdings: 持仓数据字典，包含各投资类别的当前持仓金额：
+            holdings: 持仓数据字典，键为类别注册表的 holding_keys，默认包含：
                 - bond_fund: 中短债基金持仓金额
                 - dividend_fund: 红利低波持仓金额
                 - us_index_fund: 标普/纳指持仓金额
@@ -328,23 +684,20 @@ class InvestmentCalculator:
         Returns:
             包含持仓分析结果的字典：
             - total_amount: 总持仓金额
-            - framework_analysis: 投资大框架分析（基金组合、银行固收、实体黄金、备用金）
-            - fund_portfolio_analysis: 基金组合内部分析（中短债、红利低波、标普/纳指、黄金ETF）
+            - framework_analysis: 投资大框架分析（默认为基金组合、银行固收、实体黄金、备用金）
+            - fund_portfolio_analysis: 基金组合内部分析（默认为中短债、红利低波、标普/纳指、黄金ETF）
         """
-        # 提取持仓金额，默认值为0
-        bond_fund = holdings.get("bond_fund", 0)
-        dividend_fund = holdings.get("dividend_fund", 0)
-        us_index_fund = holdings.get("us_index_fund", 0)
-        gold_etf = holdings.get("gold_etf", 0)
-        bank_fixed_income = holdings.get("bank_fixed_income", 0)
-        physical_gold = holdings.get("physical_gold", 0)
-        reserve_fund = holdings.get("reserve_fund", 0)
-
-        # 计算总持仓金额
-        total_amount = (
-            bond_fund + dividend_fund + us_index_fund + gold_etf +
-            bank_fixed_income + physical_gold + reserve_fund
-        )
+        categories = self.categories
+        portfolio_key = categories.portfolio_key
+        fund_amounts = [holdings.get(key, 0) for key in categories.funds.keys]
+
+        # 计算基金组合总金额和总持仓金额（与类别注册表相同的累加顺序）
+        fund_portfolio_amount = sum(fund_amounts)
+        framework_amounts = [
+            fund_portfolio_amount if key == portfolio_key else holdings.get(key, 0)
+            for key in categories.framework.keys
+        ]
+        total_amount = sum(framework_amounts)
 
         # 如果总持仓为0，返回空结果
         if total_amount == 0:
@@ -354,140 +707,99 @@ class InvestmentCalculator:
                 "fund_portfolio_analysis": {}
             }
 
-        # 计算基金组合总金额
-        fund_portfolio_amount = bond_fund + dividend_fund + us_index_fund + gold_etf
-
         # 投资大框架分析
-        framework_categories = {
-            "fund_portfolio": {
-                "name": "基金组合",
-                "amount": fund_portfolio_amount,
-                "expected_ratio": self.config.fund_portfolio_ratio
-            },
-            "bank_fixed_income": {
-                "name": "银行固收R2",
-                "amount": bank_fixed_income,
-                "expected_ratio": self.config.bank_fixed_income_ratio
-            },
-            "physical_gold": {
-                "name": "实体黄金",
-                "amount": physical_gold,
-                "expected_ratio": self.config.physical_gold_ratio
-            },
-            "reserve_fund": {
-                "name": "备用金",
-                "amount": reserve_fund,
-                "expected_ratio": self.config.reserve_fund_ratio
-            }
+        entry = self._analysis_entry
+        framework_analysis = {
+            c.key: entry(c.name, amount, total_amount, c.ratio)
+            for c, amount in zip(categories.framework, framework_amounts)
         }
 
-        framework_analysis = {}
-        for key, category in framework_categories.items():
-            actual_ratio = category["amount"] / total_amount
-            deviation = actual_ratio - category["expected_ratio"]
-
-            # 计算预期金额和调整金额
-            expected_amount = total_amount * category["expected_ratio"]
-            diff_amount = category["amount"] - expected_amount
-
-            # 判断状态
-            if abs(deviation) <= 0.05:
-                status = "配置合理"
-                need_adjustment = False
-                action = "无需调整"
-                adjust_amount = 0.0
-            elif deviation > 0.05:
-                status = "建议减持"
-                need_adjustment = True
-                action = "建议减持"
-                adjust_amount = round(diff_amount, 2)
-            else:
-                status = "建议增持"
-                need_adjustment = True
-                action = "建议增持"
-                adjust_amount = round(abs(diff_amount), 2)
-
-            framework_analysis[key] = {
-                "name": category["name"],
-                "expected_ratio": round(category["expected_ratio"] * 100, 2),
-                "actual_ratio": round(actual_ratio * 100, 2),
-                "expected_amount": round(expected_amount, 2),
-                "actual_amount": round(category["amount"], 2),
-                "deviation": round(deviation * 100, 2),
-                "diff_amount": round(diff_amount, 2),
-                "status": status,
-                "action": action,
-                "adjust_amount": adjust_amount,
-                "need_adjustment": need_adjustment
-            }
-
         # 基金组合内部分析（仅当基金组合金额大于0时）
         fund_portfolio_analysis = {}
         if fund_portfolio_amount > 0:
-            fund_categories = {
-                "bond_fund": {
-                    "name": "中短债基金",
-                    "amount": bond_fund,
-                    "expected_ratio": self.config.bond_fund_ratio
-                },
-                "dividend_fund": {
-                    "name": "红利低波/沪深300",
-                    "amount": dividend_fund,
-                    "expected_ratio": self.config.dividend_fund_ratio
-                },
-                "us_index_fund": {
-                    "name": "标普/纳指",
-                    "amount": us_index_fund,
-                    "expected_ratio": self.config.us_index_fund_ratio
-                },
-                "gold_etf": {
-                    "name": "黄金ETF联接C",
-                    "amount": gold_etf,
-                    "expected_ratio": self.config.gold_etf_ratio
-                }
+            fund_portfolio_analysis = {
+                c.key: entry(c.name, amount, fund_portfolio_amount, c.ratio)
+                for c, amount in zip(categories.funds, fund_amounts)
             }
 
-            for key, fund in fund_categories.items():
-                actual_ratio = fund["amount"] / fund_portfolio_amount
-                deviation = actual_ratio - fund["expected_ratio"]
-
-                # 计算预期金额和调整金额
-                expected_amount = fund_portfolio_amount * fund["expected_ratio"]
-                diff_amount = fund["amount"] - expected_amount
-
-                # 判断状态
-                if abs(deviation) <= 0.05:
-                    status = "配置合理"
-                    need_adjustment = False
-                    action = "无需调整"
-                    adjust_amount = 0.0
-                elif deviation > 0.05:
-                    status = "建议减持"
-                    need_adjustment = True
-                    action = "建议减持"
-                    adjust_amount = round(diff_amount, 2)
-                else:
-                    status = "建议增持"
-                    need_adjustment = True
-                    action = "建议增持"
-                    adjust_amount = round(abs(diff_amount), 2)
-
-                fund_portfolio_analysis[key] = {
-                    "name": fund["name"],
-                    "expected_ratio": round(fund["expected_ratio"] * 100, 2),
-                    "actual_ratio": round(actual_ratio * 100, 2),
-                    "expected_amount": round(expected_amount, 2),
-                    "actual_amount": round(fund["amount"], 2),
-                    "deviation": round(deviation * 100, 2),
-                    "diff_amount": round(diff_amount, 2),
-                    "status": status,
-                    "action": action,
-                    "adjust_amount": adjust_amount,
-                    "need_adjustment": need_adjustment
-                }
-
         return {
             "total_amount": round(total_amount, 2),
             "framework_analysis": framework_analysis,
             "fund_portfolio_analysis": fund_portfolio_analysis
         }
+
+    def _analysis_level_columns(
+        self,
+        amounts: np.ndarray,
+        base_amount: np.ndarray,
+        level
+    ) -> Dict[str, np.ndarray]:
+        """按列计算一个层级的持仓分析结果，逐元素与 _analysis_entry 相同"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            actual_ratio = amounts / base_amount[:, None]
+        expected_ratio = level.ratios[None, :]
+        deviation = actual_ratio - expected_ratio
+        expected_amount = base_amount[:, None] * expected_ratio
+        diff_amount = amounts - expected_amount
+
+        tolerance = self.config.rebalance_tolerance
+        within_band = np.abs(deviation) <= tolerance
+        status = np.where(within_band, "配置合理", np.where(deviation > tolerance, "建议减持", "建议增持"))
+        return {
+            "actual_ratio": round_amounts(actual_ratio * 100),
+            "expected_amount": round_amounts(expected_amount),
+            "deviation": round_amounts(deviation * 100),
+            "diff_amount": round_amounts(diff_amount),
+            "adjust_amount": np.where(within_band, 0.0, np.abs(round_amounts(diff_amount))),
+            "status": status
+        }
+
+    def _analysis_columns(self, holdings: np.ndarray) -> Dict[str, Any]:
+        """按列批量分析持仓占比
+
+        与 analyze_portfolio 的计算步骤一一对应，金额按类别顺序逐列累加，
+        逐行结果与 analyze_portfolio 相同。总持仓为 0 的行不做大框架分析，
+        基金组合金额 ≤ 0 的行不做基金组合内部分析，分别由两个 valid 列标记，
+        对应行的分析列为 NaN。
+
+        Args:
+            holdings: (组合数, 持仓类别数) 的持仓金额数组，列顺序为类别注册表的 holding_keys
+
+        Returns:
+            - total_amount、framework_valid、fund_portfolio_valid: 一维数组
+            - framework_analysis / fund_portfolio_analysis: {字段: 二维数组}，
+              字段为 actual_ratio、expected_amount、deviation、diff_amount、
+              adjust_amount、status，列顺序与类别注册表一致
+        """
+        categories = self.categories
+        holdings = np.asarray(holdings, dtype=np.float64)
+        n_funds = len(categories.funds)
+
+        # 1. 基金组合总金额与总持仓金额（与 sum 相同的逐项累加顺序）
+        fund_amounts = holdings[:, :n_funds]
+        fund_portfolio_amount = np.zeros(len(holdings))
+        for j in range(n_funds):
+            fund_portfolio_amount = fund_portfolio_amount + fund_amounts[:, j]
+        framework_amounts = np.insert(
+            holdings[:, n_funds:], categories.portfolio_index, fund_portfolio_amount, axis=1
+        )
+        total_amount = np.zeros(len(holdings))
+        for j in range(len(categories.framework)):
+            total_amount = total_amount + framework_amounts[:, j]
+
+        # 2. 两个层级的分析
+        framework_valid = total_amount != 0
+        fund_valid = fund_portfolio_amount > 0
+        framework = self._analysis_level_columns(framework_amounts, total_amount, categories.framework)
+        funds = self._analysis_level_columns(fund_amounts, fund_portfolio_amount, categories.funds)
+        for columns, valid in ((framework, framework_valid), (funds, fund_valid)):
+            for key, column in columns.items():
+                columns[key] = np.where(valid[:, None], column, "" if key == "status" else np.nan)
+
+        return {
+            "total_amount": np.where(framework_valid, round_amounts(total_amount), 0.0),
+            "framework_valid": framework_valid,
+            "fund_portfolio_valid": fund_valid,
+            "framework_analysis": framework,
+            "fund_portfolio_analysis": funds
+        }
@@ -0,0 +1,222 @@
+"""
+投资类别注册表模块
+
+该模块把投资类别从代码中的固定字符串改为数据：每个类别有键、名称、比例，
+基金类别还有定投日和是否适用加仓/止盈规则。InvestmentConfig 构建时生成一次
+CategoryRegistry，计算器、持仓分析、再平衡和请求校验都只读取注册表：
+- 投资大框架：任意个类别，其中一个（默认 fund_portfolio）是基金组合
+- 基金组合：任意个基金类别，比例、定投日、规则适用性按数组保存
+
+未自定义类别时使用内置的四个大框架类别和四个基金类别，比例取自
+InvestmentConfig 中对应的 *_ratio 字段，结果与固定类别时完全相同。
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.cents import ratio_weights
+
+# 定投日（按一周中的顺序）
+WEEKDAYS: Tuple[str, ...] = ('周一', '周二', '周三', '周四', '周五', '周六', '周日')
+
+# 大框架中代表基金组合的类别键
+PORTFOLIO_KEY = 'fund_portfolio'
+
+# 内置大框架类别：(键, 名称, 配置中的比例字段)
+BUILTIN_FRAMEWORK: Tuple[Tuple[str, str, str], ...] = (
+    ('fund_portfolio', '基金组合', 'fund_portfolio_ratio'),
+    ('bank_fixed_income', '银行固收R2', 'bank_fixed_income_ratio'),
+    ('physical_gold', '实体黄金', 'physical_gold_ratio'),
+    ('reserve_fund', '备用金', 'reserve_fund_ratio'),
+)
+
+# 内置基金类别：(键, 名称, 配置中的比例字段, 定投日, 是否适用加仓/止盈规则)
+BUILTIN_FUNDS: Tuple[Tuple[str, str, str, str, bool], ...] = (
+    ('bond_fund', '中短债基金', 'bond_fund_ratio', '周四', False),
+    ('dividend_fund', '红利低波/沪深300', 'dividend_fund_ratio', '周四', True),
+    ('us_index_fund', '标普/纳指', 'us_index_fund_ratio', '周二', True),
+    ('gold_etf', '黄金ETF联接C', 'gold_etf_ratio', '周四', True),
+)
+
+
+@dataclass(frozen=True)
+class Category:
+    """一个投资类别
+
+    Attributes:
+        key: 类别键（持仓金额、分析结果中使用）
+        name: 显示名称（分配结果中使用）
+        ratio: 在所属层级中的预期比例
+        weekday: 定投日（仅基金类别），为 None 时不参与每周定投
+        rules: 是否适用加仓/止盈规则（仅基金类别）
+    """
+
+    key: str
+    name: str
+    ratio: float
+    weekday: Optional[str] = None
+    rules: bool = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'key': self.key,
+            'name': self.name,
+            'ratio': self.ratio,
+            'weekday': self.weekday,
+            'rules': self.rules
+        }
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> 'Category':
+        return cls(
+            key=data['key'],
+            name=data['name'],
+            ratio=float(data['ratio']),
+            weekday=data.get('weekday'),
+            rules=bool(data.get('rules', False))
+        )
+
+
+class CategoryLevel:
+    """一个层级的类别及按数组保存的属性
+
+    Attributes:
+        categories: 类别定义
+        keys: 类别键
+        names: 类别名称
+        ratios: 预期比例数组（只读）
+        weights: 按整数分分摊使用的整数权重
+        index: {类别键: 下标}
+    """
+
+    __slots__ = ('categories', 'keys', 'names', 'ratios', 'weights', 'index')
+
+    def __init__(self, categories: Sequence[Category]):
+        self.categories = tuple(categories)
+        self.keys = tuple(c.key for c in self.categories)
+        self.names = tuple(c.name for c in self.categories)
+        self.ratios = np.array([c.ratio for c in self.categories], dtype=np.float64)
+        self.ratios.flags.writeable = False
+        self.weights = ratio_weights(c.ratio for c in self.categories)
+        self.index = {key: i for i, key in enumerate(self.keys)}
+
+    def __len__(self) -> int:
+        return len(self.categories)
+
+    def __iter__(self) -> Iterator[Category]:
+        return iter(self.categories)
+
+    def ratio_sum(self) -> float:
+        """比例总和（按类别顺序逐项累加）"""
+        return sum(c.ratio for c in self.categories)
+
+
+class CategoryRegistry:
+    """投资类别注册表
+
+    在 InvestmentConfig 构建时生成一次，之后只读。
+
+    Attributes:
+        framework: 投资大框架层级
+        funds: 基金组合层级
+        portfolio_key: 大框架中代表基金组合的类别键
+        portfolio_index: 该类别在大框架中的下标
+        portfolio_name: 该类别的名称
+        leaf_keys: 大框架中除基金组合外的类别键
+        holding_keys: 持仓金额的键（基金类别在前，其余大框架类别在后）
+        applicable_funds: 适用加仓/止盈规则的基金名称
+        plan_days: 参与定投的定投日（按一周中的顺序）
+        plan_order: 定投计划中基金的顺序（按定投日，同一天内按类别顺序）
+        day_matrix: (基金类别数, 定投日数) 的 0/1 矩阵，基金分配 @ day_matrix 即每日定投金额
+        names: {类别键: 名称}，包含两个层级
+    """
+
+    def __init__(
+        self,
+        framework: Sequence[Category],
+        funds: Sequence[Category],
+        portfolio_key: str = PORTFOLIO_KEY
+    ):
+        """
+        Raises:
+            ValueError: 类别为空、键重复、缺少基金组合类别、定投日无效或比例为负数
+        """
+        if not framework or not funds:
+            raise ValueError('投资大框架和基金组合都至少需要一个类别')
+        keys = [c.key for c in framework] + [c.key for c in funds]
+        duplicates = sorted({key for key in keys if keys.count(key) > 1})
+        if duplicates:
+            raise ValueError(f'类别键重复: {", ".join(duplicates)}')
+        invalid_days = [c.key for c in funds if c.weekday is not None and c.weekday not in WEEKDAYS]
+        if invalid_days:
+            raise ValueError(f'定投日无效: {", ".join(invalid_days)}')
+
+        self.framework = CategoryLevel(framework)
+        self.funds = CategoryLevel(funds)
+        if portfolio_key not in self.framework.index:
+            raise ValueError(f'投资大框架中缺少基金组合类别: {portfolio_key}')
+        self.portfolio_key = portfolio_key
+        self.portfolio_index = self.framework.index[portfolio_key]
+        self.portfolio_name = self.framework.names[self.portfolio_index]
+        self.leaf_keys = tuple(key for key in self.framework.keys if key != portfolio_key)
+        self.holding_keys = self.funds.keys + self.leaf_keys
+        self.applicable_funds = frozenset(c.name for c in self.funds if c.rules)
+
+        self.plan_days = tuple(day for day in WEEKDAYS if any(c.weekday == day for c in self.funds))
+        self.plan_order = tuple(sorted(
+            (i for i, c in enumerate(self.funds) if c.weekday is not None),
+            key=lambda i: WEEKDAYS.index(self.funds.categories[i].weekday)
+        ))
+        self.day_matrix = np.zeros((len(self.funds), len(self.plan_days)), dtype=np.int64)
+        for i in self.plan_order:
+            self.day_matrix[i, self.plan_days.index(self.funds.categories[i].weekday)] = 1
+        self.day_matrix.flags.writeable = False
+
+        self.names = dict(
+            [(c.key, c.name) for c in self.framework] + [(c.key, c.name) for c in self.funds]
+        )
+
+    @classmethod
+    def builtin(cls, config: Any) -> 'CategoryRegistry':
+        """内置类别，比例取自配置的 *_ratio 字段"""
+        return cls(builtin_framework(config), builtin_funds(config))
+
+    # -- 持仓金额 -----------------------------------------------------------
+
+    def fund_portfolio_amount(self, amounts: Mapping[str, float]) -> float:
+        """基金组合总金额（按类别顺序逐项累加）"""
+        return sum(amounts[key] for key in self.funds.keys)
+
+    def framework_amounts(self, amounts: Mapping[str, float], fund_portfolio_amount: float) -> List[float]:
+        """大框架各类别的金额，基金组合类别为基金组合总金额"""
+        return [
+            fund_portfolio_amount if key == self.portfolio_key else amounts[key]
+            for key in self.framework.keys
+        ]
+
+    def total_amount(self, amounts: Mapping[str, float], fund_portfolio_amount: float) -> float:
+        """总持仓金额（按大框架类别顺序逐项累加）
+
+        analyze_portfolio 与增量持仓状态使用同一累加顺序，保证结果逐位相同。
+        """
+        return sum(self.framework_amounts(amounts, fund_portfolio_amount))
+
+    def holding_matrix(self, holdings_list: Iterable[Mapping[str, float]]) -> np.ndarray:
+        """持仓金额字典列表转换为 (组合数, 持仓类别数) 数组，列顺序为 holding_keys"""
+        rows = [[h.get(key, 0.0) for key in self.holding_keys] for h in holdings_list]
+        return np.array(rows, dtype=np.float64).reshape(len(rows), len(self.holding_keys))
+
+
+def builtin_framework(config: Any) -> Tuple[Category, ...]:
+    """内置的投资大框架类别"""
+    return tuple(Category(key, name, getattr(config, field)) for key, name, field in BUILTIN_FRAMEWORK)
+
+
+def builtin_funds(config: Any) -> Tuple[Category, ...]:
+    """内置的基金类别"""
+    return tuple(
+        Category(key, name, getattr(config, field), weekday, rules)
+        for key, name, field, weekday, rules in BUILTIN_FUNDS
+    )
@@ -0,0 +1,141 @@
+"""
+整数分金额模块
+
+该模块以整数"分"为单位完成金额分配：先把总金额换算为整数分，再按比例用
+最大余数法（largest remainder）分摊，各部分之和恰好等于总金额。
+
+按比例分别 round(x, 2) 的各部分可能比总金额多或少 1 分；最大余数法先给每部分
+分配向下取整的份额，再把剩下的几分依次补给余数最大的部分（余数相同时序号
+小的优先），结果是确定的，且每部分与精确份额的差距小于 1 分。
+
+比例先换算为整数权重（百万分之一精度），分摊全部在整数上完成，没有浮点误差。
+apportion_many 在 int64 数组上按列完成同样的计算，逐行结果与 apportion 相同。
+"""
+
+from typing import Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+# 比例换算为整数权重的精度（百万分之一）
+WEIGHT_SCALE = 1_000_000
+
+# apportion_many 支持的最大金额（分），保证 金额 × 权重 不超出 int64
+MAX_BATCH_CENTS = np.iinfo(np.int64).max // WEIGHT_SCALE
+
+
+def round_amounts(values: np.ndarray) -> np.ndarray:
+    """按元素将金额保留两位小数（任意维数组），结果与内置 round(x, 2) 逐元素一致
+
+    np.round 先乘 100 再取整，在恰好半分附近可能与 round 的结果相差 1 分，
+    这些极少数元素回退到内置 round 逐个处理。
+
+    Args:
+        values: 金额数组
+
+    Returns:
+        保留两位小数后的金额数组
+    """
+    rounded = np.round(values, 2)
+    scaled = values * 100
+    near_half = np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) < 1e-6
+    if near_half.any():
+        indices = np.nonzero(near_half)
+        rounded[indices] = [round(value, 2) for value in values[indices].tolist()]
+    return rounded
+
+
+def to_cents(amount: float) -> int:
+    """金额（元）换算为整数分，舍入方式与 round(amount, 2) 一致"""
+    return int(round(round(amount, 2) * 100))
+
+
+def to_cents_array(amounts: np.ndarray) -> np.ndarray:
+    """按列将金额（元）换算为 int64 分，逐元素与 to_cents 一致"""
+    return np.rint(round_amounts(np.asarray(amounts, dtype=np.float64)) * 100).astype(np.int64)
+
+
+def from_cents(cents: int) -> float:
+    """整数分换算为金额（元）
+
+    整数除法是正确舍入的，结果与两位小数的字面量（如 12345.67）逐位相同。
+    """
+    return cents / 100
+
+
+def ratio_weights(ratios: Iterable[float]) -> Tuple[int, ...]:
+    """比例换算为整数权重
+
+    Raises:
+        ValueError: 比例为负数或全部为 0
+    """
+    weights = tuple(int(round(ratio * WEIGHT_SCALE)) for ratio in ratios)
+    if any(weight < 0 for weight in weights):
+        raise ValueError('分配比例不能为负数')
+    if sum(weights) <= 0:
+        raise ValueError('分配比例之和必须大于 0')
+    return weights
+
+
+def apportion(total_cents: int, weights: Sequence[int]) -> List[int]:
+    """按整数权重用最大余数法分摊总金额
+
+    Args:
+        total_cents: 总金额（分），可以为负数（按绝对值分摊后取反）
+        weights: ratio_weights 生成的整数权重
+
+    Returns:
+        各部分金额（分），顺序与 weights 一致，之和恰好等于 total_cents
+    """
+    total = abs(total_cents)
+    weight_sum = sum(weights)
+    parts = [total * weight // weight_sum for weight in weights]
+
+    # 剩下的几分补给余数最大的部分，余数相同时序号小的优先
+    shortfall = total - sum(parts)
+    if shortfall:
+        remainders = [total * weight % weight_sum for weight in weights]
+        order = sorted(range(len(weights)), key=lambda i: (-remainders[i], i))
+        for i in order[:shortfall]:
+            parts[i] += 1
+    if total_cents < 0:
+        return [-part for part in parts]
+    return parts
+
+
+def apportion_many(total_cents: np.ndarray, weights: Sequence[int]) -> np.ndarray:
+    """按列对一组总金额做最大余数法分摊
+
+    Args:
+        total_cents: 总金额（分）的 int64 数组
+        weights: ratio_weights 生成的整数权重
+
+    Returns:
+        形状为 (len(total_cents), len(weights)) 的 int64 数组，
+        第 i 行与 apportion(total_cents[i], weights) 相同
+    """
+    totals = np.asarray(total_cents, dtype=np.int64)
+    magnitude = np.abs(totals)
+    # 超过 MAX_BATCH_CENTS 的行（约 922 亿元以上）金额 × 权重可能溢出 int64，
+    # 先按 0 计算，最后逐行用 Python 整数重新分摊
+    oversized = np.flatnonzero(magnitude > MAX_BATCH_CENTS)
+    if oversized.size:
+        magnitude = np.where(magnitude > MAX_BATCH_CENTS, 0, magnitude)
+
+    weight_array = np.asarray(weights, dtype=np.int64)
+    weight_sum = int(weight_array.sum())
+    products = magnitude[:, None] * weight_array[None, :]
+    parts = products // weight_sum
+    remainders = products % weight_sum
+
+    # 每行按余数从大到小排名（稳定排序保证余数相同时序号小的优先），
+    # 排名小于该行差额的部分各补 1 分
+    shortfall = magnitude - parts.sum(axis=1)
+    order = np.argsort(-remainders, axis=1, kind='stable')
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.arange(len(weight_array))[None, :].repeat(len(totals), axis=0), axis=1)
+    parts += ranks < shortfall[:, None]
+    parts = np.where(totals[:, None] < 0, -parts, parts)
+
+    for i in oversized.tolist():
+        parts[i] = apportion(int(totals[i]), weights)
+    return parts
@@ -4,11 +4,14 @@
 该模块定义了投资管理计算器的所有配置参数，包括投资比例和规则配置。
 """
 
-from typing import Dict
-from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Tuple
+from dataclasses import dataclass, field, fields, replace
 
+from src.categories import Category, CategoryRegistry, builtin_framework, builtin_funds
 
-@dataclass
+
+@dataclass(frozen=True)
 class InvestmentConfig:
     """投资策略配置类
     
@@ -17,6 +20,15 @@ class InvestmentConfig:
     - 基金组合内部分配比例（中短债、红利低波、标普/纳指、黄金 ETF）
     - 加仓规则配置
     - 止盈规则配置
+    - 再平衡容忍带
+    - 自定义投资类别（可选）
+    
+    配置对象是不可变的版本化快照：修改配置时通过 with_updates
+    生成新的快照，已有快照在其生命周期内始终保持一致。
+    
+    构建时生成一次类别注册表（categories 属性），所有计算都通过注册表读取类别。
+    framework_buckets / fund_buckets 为空时使用内置类别，比例取自上面的 *_ratio 字段；
+    非空时该层级改用自定义类别，对应的 *_ratio 字段不再生效。
     """
     
     # 投资大框架分配比例（总和必须为 100%）
@@ -32,7 +44,7 @@ class InvestmentConfig:
     gold_etf_ratio: float = 0.15            # 黄金 ETF 联接 C 15%
     
     # 加仓规则配置：{跌幅阈值: 加仓比例}
-    add_position_rules: Dict[float, float] = field(default_factory=lambda: {
+    add_position_rules: Mapping[float, float] = field(default_factory=lambda: {
         -0.05: 0.10,  # 跌 5% 加仓 10%
         -0.10: 0.15,  # 跌 10% 加仓 15%
         -0.15: 0.20,  # 跌 15% 加仓 20%
@@ -42,6 +54,108 @@ class InvestmentConfig:
     take_profit_threshold: float = 0.30     # 止盈阈值 30%
     take_profit_ratio: float = 0.20         # 止盈比例 20%
     
+    # 再平衡容忍带：实际占比偏离预期占比不超过该值时视为配置合理
+    rebalance_tolerance: float = 0.05       # ±5%
+    
+    # 自定义投资类别：为空时使用内置类别（见 src/categories.py）
+    framework_buckets: Tuple[Category, ...] = ()
+    fund_buckets: Tuple[Category, ...] = ()
+    
+    # 配置版本号，每次生成新快照时递增，用于结果缓存失效
+    version: int = 0
+    
+    def __post_init__(self):
+        """冻结加仓规则和自定义类别，并生成类别注册表
+
+        Raises:
+            ValueError: 自定义类别无效（键重复、缺少基金组合类别等）
+        """
+        object.__setattr__(
+            self, 'add_position_rules', MappingProxyType(dict(self.add_position_rules))
+        )
+        for name in ('framework_buckets', 'fund_buckets'):
+            buckets = tuple(
+                bucket if isinstance(bucket, Category) else Category.from_dict(bucket)
+                for bucket in getattr(self, name)
+            )
+            object.__setattr__(self, name, buckets)
+        object.__setattr__(self, 'categories', CategoryRegistry(
+            self.framework_buckets or builtin_framework(self),
+            self.fund_buckets or builtin_funds(self)
+        ))
+    
+    def with_updates(self, **changes: Any) -> "InvestmentConfig":
+        """基于当前快照生成新的配置快照
+        
+        未指定的字段沿用当前值，版本号自动加 1。
+        
+        除配置字段外，还可以用 framework_ratios / fund_ratios 按类别键修改比例
+        （{类别键: 新比例}）：内置类别修改对应的 *_ratio 字段，
+        自定义类别修改 framework_buckets / fund_buckets 中的比例。
+        
+        Args:
+            **changes: 需要修改的字段及新值
+        
+        Returns:
+            新的配置快照
+        
+        Raises:
+            ValueError: framework_ratios / fund_ratios 中有未知的类别键
+        """
+        framework_ratios = changes.pop('framework_ratios', None)
+        fund_ratios = changes.pop('fund_ratios', None)
+        if framework_ratios:
+            changes.update(self._ratio_changes(
+                'framework_buckets', self.categories.framework.categories, framework_ratios
+            ))
+        if fund_ratios:
+            changes.update(self._ratio_changes(
+                'fund_buckets', self.categories.funds.categories, fund_ratios
+            ))
+        return replace(self, version=self.version + 1, **changes)
+    
+    def _ratio_changes(
+        self,
+        buckets_field: str,
+        categories: Tuple[Category, ...],
+        ratios: Mapping[str, float]
+    ) -> Dict[str, Any]:
+        """按类别键修改比例对应的字段变更"""
+        unknown = [key for key in ratios if key not in {c.key for c in categories}]
+        if unknown:
+            raise ValueError(f'未知的类别: {", ".join(unknown)}')
+        if getattr(self, buckets_field):
+            return {buckets_field: tuple(
+                replace(c, ratio=ratios[c.key]) if c.key in ratios else c
+                for c in categories
+            )}
+        return {f'{key}_ratio': ratio for key, ratio in ratios.items()}
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可 JSON 序列化的字典（加仓规则的阈值键转为字符串）"""
+        data = {f.name: getattr(self, f.name) for f in fields(self)}
+        data['add_position_rules'] = {
+            repr(threshold): ratio for threshold, ratio in self.add_position_rules.items()
+        }
+        data['framework_buckets'] = [c.to_dict() for c in self.framework_buckets]
+        data['fund_buckets'] = [c.to_dict() for c in self.fund_buckets]
+        return data
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "InvestmentConfig":
+        """从 to_dict 生成的字典还原配置，未知字段会被忽略
+
+        自定义类别在 __post_init__ 中由字典还原为 Category。
+        """
+        known = {f.name for f in fields(cls)}
+        kwargs = {key: value for key, value in data.items() if key in known}
+        if 'add_position_rules' in kwargs:
+            kwargs['add_position_rules'] = {
+                float(threshold): ratio
+                for threshold, ratio in kwargs['add_position_rules'].items()
+            }
+        return cls(**kwargs)
+    
     def validate(self) -> bool:
         """验证配置有效性
         
@@ -52,23 +166,11 @@ class InvestmentConfig:
             bool: 如果配置有效返回 True，否则返回 False
         """
         # 验证大框架比例总和为 100%
-        framework_sum = (
-            self.fund_portfolio_ratio +
-            self.bank_fixed_income_ratio +
-            self.physical_gold_ratio +
-            self.reserve_fund_ratio
-        )
-        if abs(framework_sum - 1.0) > 0.0001:
+        if abs(self.categories.framework.ratio_sum() - 1.0) > 0.0001:
             return False
         
         # 验证基金组合比例总和为 100%
-        portfolio_sum = (
-            self.bond_fund_ratio +
-            self.dividend_fund_ratio +
-            self.us_index_fund_ratio +
-            self.gold_etf_ratio
-        )
-        if abs(portfolio_sum - 1.0) > 0.0001:
+        if abs(self.categories.funds.ratio_sum() - 1.0) > 0.0001:
             return False
         
         return True
@@ -0,0 +1,369 @@
+"""
+配置快照存储模块
+
+该模块保存当前生效的配置快照及对应的计算器实例。读取方直接取引用，
+无需加锁；更新方在写锁内生成新快照，校验通过后以一次引用赋值整体发布，
+请求在任何时刻看到的都是一份完整的配置，不会读到更新到一半的比例。
+
+配置持久化在可插拔的后端中（默认 SQLite 文件）。多个工作进程共享同一个
+后端，每个进程由后台线程以毫秒级间隔轮询后端的变更标记，发现新版本后
+读取、校验并发布一次；请求路径上不会重复读取或校验配置。
+"""
+
+import json
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, replace
+from typing import Any, Callable, List, Optional, Tuple
+
+from src.calculator import InvestmentCalculator
+from src.config import InvestmentConfig
+
+logger = logging.getLogger(__name__)
+
+# 后端保存的配置及其发布时间（Unix 时间戳，整秒）
+StoredConfig = Tuple[InvestmentConfig, float]
+
+
+def _next_published_at(previous: Optional[float]) -> float:
+    """新版本的发布时间
+
+    取当前时间的整秒，且至少比上一版本晚 1 秒：Last-Modified 只精确到秒，
+    同一秒内的多次更新也能得到严格递增的时间，If-Modified-Since 不会误判为未修改。
+    """
+    now = math.floor(time.time())
+    if previous is None:
+        return float(now)
+    return float(max(now, math.floor(previous) + 1))
+
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """配置快照及基于该快照构建的计算器
+
+    published_at 为后端随版本号保存的发布时间（Unix 时间戳，整秒），
+    各工作进程读到的值相同，用作 GET /api/config 的 Last-Modified。
+    """
+
+    config: InvestmentConfig
+    calculator: InvestmentCalculator
+    published_at: float
+
+    @property
+    def version(self) -> int:
+        """快照的配置版本号"""
+        return self.config.version
+
+
+class ConfigBackend:
+    """配置后端接口
+
+    子类需要实现：
+    - load: 读取最新配置及其发布时间，后端为空时返回 None
+    - transact: 在后端的排他事务中读取、修改并写回配置；mutate 返回原配置对象时不写入，
+      否则新版本的发布时间由 _next_published_at 生成
+    - changed: 廉价地判断自上次调用以来后端是否可能有新版本
+    """
+
+    def load(self) -> Optional[StoredConfig]:
+        raise NotImplementedError
+
+    def transact(
+        self, mutate: Callable[[Optional[InvestmentConfig]], InvestmentConfig]
+    ) -> StoredConfig:
+        raise NotImplementedError
+
+    def changed(self) -> bool:
+        raise NotImplementedError
+
+    def reset(self) -> None:
+        """进程 fork 后重置连接等进程内资源"""
+
+    def close(self) -> None:
+        """释放后端资源"""
+
+
+class MemoryConfigBackend(ConfigBackend):
+    """进程内配置后端，适用于单进程运行"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stored: Optional[StoredConfig] = None
+
+    def load(self) -> Optional[StoredConfig]:
+        return self._stored
+
+    def transact(self, mutate):
+        with self._lock:
+            existing, published_at = self._stored or (None, None)
+            config = mutate(existing)
+            if config is not existing:
+                self._stored = (config, _next_published_at(published_at))
+            return self._stored
+
+    def changed(self) -> bool:
+        # 只有本进程会写入，更新时已直接发布，无需轮询
+        return False
+
+
+class SQLiteConfigBackend(ConfigBackend):
+    """SQLite 文件配置后端
+
+    配置以 JSON 形式保存在单行表中，updated_at 列为该版本的发布时间。
+    变更检测使用 PRAGMA data_version：
+    其他连接提交事务后该值才会变化，查询它不需要读取任何表数据。
+    """
+
+    def __init__(self, path: str):
+        """初始化后端
+
+        Args:
+            path: SQLite 数据库文件路径，所在目录不存在时自动创建
+        """
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._watch_conn: Optional[sqlite3.Connection] = None
+        self._data_version: Optional[int] = None
+        self._watch_lock = threading.Lock()
+        conn = self._connect()
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS investment_config ('
+                ' id INTEGER PRIMARY KEY CHECK (id = 1),'
+                ' version INTEGER NOT NULL,'
+                ' payload TEXT NOT NULL,'
+                ' updated_at REAL NOT NULL)'
+            )
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        # 轮询连接由 _watch_lock 保护，可能在初始化线程和轮询线程之间传递
+        conn = sqlite3.connect(
+            self.path, timeout=5.0, isolation_level=None, check_same_thread=False
+        )
+        conn.execute('PRAGMA busy_timeout=5000')
+        return conn
+
+    @staticmethod
+    def _read(conn: sqlite3.Connection) -> Optional[StoredConfig]:
+        row = conn.execute(
+            'SELECT payload, updated_at FROM investment_config WHERE id = 1'
+        ).fetchone()
+        if row is None:
+            return None
+        return InvestmentConfig.from_dict(json.loads(row[0])), row[1]
+
+    def load(self) -> Optional[StoredConfig]:
+        conn = self._connect()
+        try:
+            return self._read(conn)
+        finally:
+            conn.close()
+
+    def transact(self, mutate):
+        conn = self._connect()
+        try:
+            # BEGIN IMMEDIATE 取得写锁，多个进程的更新按顺序执行，不会丢失修改
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                existing, published_at = self._read(conn) or (None, None)
+                config = mutate(existing)
+                if config is not existing:
+                    published_at = _next_published_at(published_at)
+                    conn.execute(
+                        'INSERT OR REPLACE INTO investment_config (id, version, payload, updated_at)'
+                        ' VALUES (1, ?, ?, ?)',
+                        (config.version, json.dumps(config.to_dict()), published_at)
+                    )
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            return config, published_at
+        finally:
+            conn.close()
+
+    def changed(self) -> bool:
+        with self._watch_lock:
+            if self._watch_conn is None:
+                self._watch_conn = self._connect()
+            data_version = self._watch_conn.execute('PRAGMA data_version').fetchone()[0]
+            changed = data_version != self._data_version
+            self._data_version = data_version
+            return changed
+
+    def reset(self) -> None:
+        # fork 继承的连接不能在子进程中继续使用，直接丢弃
+        self._watch_conn = None
+        self._data_version = None
+        self._watch_lock = threading.Lock()
+
+    def close(self) -> None:
+        with self._watch_lock:
+            if self._watch_conn is not None:
+                self._watch_conn.close()
+                self._watch_conn = None
+
+
+class ConfigStore:
+    """配置快照存储
+
+    - current: 无锁读取当前快照（单次属性读取）
+    - update: 串行化的写操作，写入后端并原子发布新快照
+    - subscribe: 注册快照发布后的回调（如清空结果缓存）
+    """
+
+    def __init__(
+        self,
+        config: InvestmentConfig,
+        backend: Optional[ConfigBackend] = None,
+        poll_interval: float = 0.01
+    ):
+        """初始化存储
+
+        后端为空时写入 config 作为初始配置；后端已有配置时以后端为准。
+
+        Args:
+            config: 初始配置
+            backend: 配置后端，默认为进程内后端
+            poll_interval: 后台轮询后端变更的间隔（秒）
+
+        Raises:
+            ValueError: 初始配置校验失败
+        """
+        if not config.validate():
+            raise ValueError("配置验证失败：投资比例总和必须为 100%")
+        self.backend = backend or MemoryConfigBackend()
+        self.poll_interval = poll_interval
+        self._write_lock = threading.Lock()
+        self._listeners: List[Callable[[ConfigSnapshot], None]] = []
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+        stored, published_at = self.backend.transact(lambda existing: existing or config)
+        self._snapshot = ConfigSnapshot(stored, InvestmentCalculator(stored), published_at)
+        self.backend.changed()
+
+        if not isinstance(self.backend, MemoryConfigBackend):
+            self.start_watcher()
+            # 预加载后 fork 出的工作进程需要重建连接和轮询线程
+            if hasattr(os, 'register_at_fork'):
+                os.register_at_fork(after_in_child=self._after_fork)
+
+    @property
+    def current(self) -> ConfigSnapshot:
+        """当前生效的配置快照"""
+        return self._snapshot
+
+    def subscribe(self, listener: Callable[[ConfigSnapshot], None]) -> None:
+        """注册快照发布回调（在发布线程中同步调用）"""
+        self._listeners.append(listener)
+
+    def _publish(self, config: InvestmentConfig, published_at: float) -> ConfigSnapshot:
+        snapshot = ConfigSnapshot(config, InvestmentCalculator(config), published_at)
+        self._snapshot = snapshot
+        for listener in self._listeners:
+            listener(snapshot)
+        return snapshot
+
+    def update(self, **changes: Any) -> ConfigSnapshot:
+        """生成并发布新的配置快照
+
+        以后端中的最新配置为基础应用修改，避免覆盖其他进程的更新。
+        新快照在写入后端前完成校验；校验失败时不写入也不发布。
+        修改后各字段与原配置相同（包括没有任何修改）时不生成新版本，
+        ETag 和结果缓存保持不变。
+
+        Args:
+            **changes: 需要修改的配置字段及新值
+
+        Returns:
+            发布后的新快照
+
+        Raises:
+            ValueError: 新配置校验失败
+        """
+        def mutate(existing: Optional[InvestmentConfig]) -> InvestmentConfig:
+            base = existing or self._snapshot.config
+            config = base.with_updates(**changes)
+            if replace(config, version=base.version) == base:
+                return base
+            if not config.validate():
+                raise ValueError("配置验证失败：投资比例总和必须为 100%")
+            return config
+
+        with self._write_lock:
+            config, published_at = self.backend.transact(mutate)
+            if config.version == self._snapshot.version:
+                return self._snapshot
+            return self._publish(config, published_at)
+
+    def refresh(self) -> bool:
+        """检查后端是否有新版本，有则发布
+
+        Returns:
+            是否发布了新快照
+        """
+        if not self.backend.changed():
+            return False
+        with self._write_lock:
+            stored = self.backend.load()
+            if stored is None or stored[0].version == self._snapshot.version:
+                return False
+            config, published_at = stored
+            if not config.validate():
+                logger.error("后端配置校验失败，忽略版本 %s", config.version)
+                return False
+            self._publish(config, published_at)
+            return True
+
+    def start_watcher(self) -> None:
+        """启动后台轮询线程"""
+        self._stop.clear()
+        self._watcher = threading.Thread(
+            target=self._watch, name='config-store-watcher', daemon=True
+        )
+        self._watcher.start()
+
+    def stop_watcher(self) -> None:
+        """停止后台轮询线程"""
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("轮询配置后端失败")
+
+    def _after_fork(self) -> None:
+        self._write_lock = threading.Lock()
+        self.backend.reset()
+        self.start_watcher()
+
+
+def create_backend_from_env(default_path: str) -> ConfigBackend:
+    """根据环境变量创建配置后端
+
+    - CONFIG_BACKEND: sqlite（默认）或 memory
+    - CONFIG_DB_PATH: SQLite 文件路径，默认为 default_path
+
+    Args:
+        default_path: 默认的 SQLite 文件路径
+    """
+    kind = os.environ.get('CONFIG_BACKEND', 'sqlite').lower()
+    if kind == 'memory':
+        return MemoryConfigBackend()
+    if kind == 'sqlite':
+        return SQLiteConfigBackend(os.environ.get('CONFIG_DB_PATH', default_path))
+    raise ValueError(f"不支持的配置后端: {kind}")
@@ -0,0 +1,357 @@
+"""
+共享请求处理模块
+
+Flask 应用（src/app.py）和 ASGI 应用（src/asgi.py）共同使用的处理函数：
+请求体解析、校验、结果缓存、组合状态与历史记录以及响应序列化都在这里完成，
+两个应用只负责把各自的请求转换为 RequestContext、把 (状态码, 响应体) 写回客户端，
+因此两种部署的接口契约始终一致。
+
+处理函数是同步的，可以在 Flask 的请求线程、ASGI 的事件循环或线程池中执行。
+"""
+
+import functools
+import json
+import os
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.cache import ResultCache, analyze_key, calculate_key
+from src.config import InvestmentConfig
+from src.config_store import ConfigStore, create_backend_from_env
+from src.holdings import HoldingsArray
+from src.metrics import metrics
+from src.portfolio_state import PortfolioStore, create_portfolio_backend_from_env
+from src.serialization import DEFAULT_ENCODER, ConfigResponseCache, compact_analysis, dumps
+from src.storage import SnapshotRecorder, SnapshotStore
+from src.validation import (
+    CALCULATE_BATCH_SCHEMA, CALCULATE_SCENARIOS_SCHEMA, CALCULATE_SCHEMA, category_schemas,
+    config_changes, error_payload
+)
+
+# 处理函数的返回值：(状态码, 响应体)
+Result = Tuple[int, bytes]
+
+
+class RequestContext:
+    """一次请求的查询参数、请求头和请求体，以及处理函数追加的响应头"""
+
+    __slots__ = ('query', 'headers', 'body', 'response_headers')
+
+    def __init__(self, query: Dict[str, List[str]], body: bytes, headers: Optional[Dict[str, str]] = None):
+        """
+        Args:
+            query: 查询参数（每个参数一个取值列表）
+            body: 请求体
+            headers: 请求头，名称为小写
+        """
+        self.query = query
+        self.headers = headers or {}
+        self.body = body
+        self.response_headers: List[Tuple[str, str]] = []
+
+    def arg(self, name: str, default: str = '') -> str:
+        values = self.query.get(name)
+        return values[0] if values else default
+
+    @property
+    def encoder(self) -> str:
+        """encoder 查询参数选择序列化器"""
+        return self.arg('encoder', DEFAULT_ENCODER).lower()
+
+    @property
+    def compact(self) -> bool:
+        """compact 查询参数选择紧凑模式"""
+        return self.arg('compact').lower() in ('1', 'true', 'yes')
+
+    def json(self) -> Any:
+        """解析请求体，请求体为空或不是合法 JSON 时返回 None"""
+        if not self.body:
+            return None
+        with metrics.stage('parse'):
+            try:
+                return json.loads(self.body)
+            except ValueError:
+                return None
+
+
+def _not_modified(headers: Dict[str, str], etag: str, last_modified: float) -> bool:
+    """条件请求判断：有 If-None-Match 时只比较 ETag，否则比较 If-Modified-Since（秒级精度）"""
+    if_none_match = headers.get('if-none-match')
+    if if_none_match is not None:
+        tags = {tag.strip() for tag in if_none_match.split(',')}
+        return '*' in tags or etag in tags or f'W/{etag}' in tags
+    if_modified_since = headers.get('if-modified-since')
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(last_modified) <= since
+    return False
+
+
+def _guarded(handler: Callable) -> Callable:
+    """处理函数中未预期的异常返回 500"""
+    @functools.wraps(handler)
+    def run(self, ctx: RequestContext) -> Result:
+        try:
+            return handler(self, ctx)
+        except Exception as e:
+            return self._respond(ctx, {
+                'success': False,
+                'error': f'服务器内部错误: {str(e)}'
+            }, 500)
+    return run
+
+
+class CalculatorApi:
+    """计算器接口的处理函数"""
+
+    def __init__(
+        self,
+        config_store: ConfigStore,
+        result_cache: ResultCache,
+        portfolio_store: Optional[PortfolioStore] = None,
+        snapshot_store: Optional[SnapshotStore] = None,
+        history_recorder: Optional[SnapshotRecorder] = None
+    ):
+        """
+        Args:
+            config_store: 配置快照存储
+            result_cache: 计算和分析结果缓存
+            portfolio_store: 组合状态容器，提交 portfolio_id 时保存组合的当前持仓
+            snapshot_store: 持仓快照存储（历史查询），None 表示未启用历史记录
+            history_recorder: 持仓快照记录器，None 表示不记录历史
+        """
+        self.config_store = config_store
+        self.result_cache = result_cache
+        self.portfolio_store = portfolio_store if portfolio_store is not None else PortfolioStore()
+        self.snapshot_store = snapshot_store
+        self.history_recorder = history_recorder
+        self.config_responses = ConfigResponseCache()
+
+    @staticmethod
+    def _respond(ctx: RequestContext, payload: Any, status: int = 200) -> Result:
+        with metrics.stage('serialize'):
+            return status, dumps(payload, ctx.encoder)
+
+    def _invalid_body(self, ctx: RequestContext) -> Result:
+        """请求体为空或不是合法 JSON 时的 400 响应"""
+        return self._respond(ctx, {
+            'success': False,
+            'error': '请求体不是合法的 JSON' if ctx.body.strip() else '请求体不能为空'
+        }, 400)
+
+    @_guarded
+    def calculate(self, ctx: RequestContext) -> Result:
+        """POST /api/calculate"""
+        # 1. 解析 JSON 请求体
+        data = ctx.json()
+        if not data:
+            return self._invalid_body(ctx)
+
+        # 2. 按共享的校验器验证所有字段（必填、数值类型、非负、持仓格式）
+        cleaned, errors = CALCULATE_SCHEMA.validate(data)
+        if errors:
+            return self._respond(ctx, error_payload(errors), 400)
+
+        # 3. 提取参数（按列提交的持仓构建为 HoldingsArray）
+        holdings = cleaned.get('holdings')
+        if isinstance(holdings, dict):
+            holdings = HoldingsArray.from_columns(**holdings)
+        inputs = (
+            cleaned['target_living_expense'], cleaned['current_living_expense'],
+            cleaned['debt'], cleaned['new_income']
+        )
+
+        # 4. 调用计算器执行计算（相同输入和配置版本命中缓存）
+        calculator = self.config_store.current.calculator
+        result = self.result_cache.get_or_compute(
+            calculate_key(calculator.config_version, *inputs, holdings),
+            lambda: calculator.calculate(*inputs, holdings=holdings)
+        )
+
+        # 5. 返回成功响应
+        return self._respond(ctx, {'success': True, 'data': result})
+
+    @_guarded
+    def calculate_batch(self, ctx: RequestContext) -> Result:
+        """POST /api/calculate/batch"""
+        # 1. 解析 JSON 请求体
+        data = ctx.json()
+        if not data:
+            return self._invalid_body(ctx)
+
+        # 2. 验证必填字段、数组类型、数组长度和每一项的数值
+        cleaned, errors = CALCULATE_BATCH_SCHEMA.validate(data)
+        if errors:
+            return self._respond(ctx, error_payload(errors), 400)
+
+        # 3. 调用计算器执行批量计算
+        results = self.config_store.current.calculator.calculate_many(
+            target_living_expense=cleaned['target_living_expense'],
+            current_living_expense=cleaned['current_living_expense'],
+            debt=cleaned['debt'],
+            new_income=cleaned['new_income']
+        )
+
+        # 4. 返回成功响应
+        return self._respond(ctx, {
+            'success': True,
+            'data': {'count': len(results), 'results': results}
+        })
+
+    @_guarded
+    def calculate_scenarios(self, ctx: RequestContext) -> Result:
+        """POST /api/calculate/scenarios"""
+        # 1. 解析 JSON 请求体
+        data = ctx.json()
+        if not data:
+            return self._invalid_body(ctx)
+
+        # 2. 验证基准值、变化字段的取值和网格大小
+        cleaned, errors = CALCULATE_SCENARIOS_SCHEMA.validate(data)
+        if errors:
+            return self._respond(ctx, error_payload(errors), 400)
+
+        # 3. 按列一次计算整个网格
+        result = self.config_store.current.calculator.calculate_grid(
+            cleaned['base'], list(cleaned['vary'].items())
+        )
+
+        # 4. 返回成功响应
+        return self._respond(ctx, {'success': True, 'data': result})
+
+    @_guarded
+    def analyze_portfolio(self, ctx: RequestContext) -> Result:
+        """POST /api/analyze-portfolio"""
+        # 1. 解析 JSON 请求体
+        data = ctx.json()
+        if not data:
+            return self._invalid_body(ctx)
+
+        # 2. 按当前配置的类别验证持仓对象及各持仓金额，总持仓金额必须大于 0
+        calculator = self.config_store.current.calculator
+        cleaned, errors = category_schemas(calculator.categories).analyze_portfolio.validate(data)
+        if errors:
+            return self._respond(ctx, error_payload(errors), 400)
+        holdings = cleaned['holdings']
+
+        # 3. 调用计算器执行分析（相同持仓和配置版本命中缓存）
+        result = self.result_cache.get_or_compute(
+            analyze_key(calculator.config_version, holdings),
+            lambda: calculator.analyze_portfolio(holdings)
+        )
+        if 'portfolio_id' in cleaned:
+            # 提交了组合标识时，以这次的完整持仓作为组合的当前状态，之后可以只提交变动
+            # （只记录持仓并放入写入队列，SQLite 写入和状态构建都不在请求路径上）
+            self.portfolio_store.replace(cleaned['portfolio_id'], holdings, calculator)
+            if self.history_recorder is not None:
+                self.history_recorder.record(
+                    cleaned['portfolio_id'], holdings, result, calculator.config_version
+                )
+        if ctx.compact:
+            result = compact_analysis(result)
+
+        # 4. 返回成功响应
+        return self._respond(ctx, {'success': True, 'data': result})
+
+    @_guarded
+    def get_config(self, ctx: RequestContext) -> Result:
+        """GET /api/config（带 ETag / Last-Modified，未变化时返回 304）"""
+        cached = self.config_responses.get(self.config_store.current, ctx.encoder)
+        etag = f'"{cached.etag}"'
+        ctx.response_headers += [
+            ('ETag', etag),
+            ('Last-Modified', formatdate(cached.last_modified, usegmt=True)),
+            ('Cache-Control', 'no-cache'),
+        ]
+        if _not_modified(ctx.headers, etag, cached.last_modified):
+            return 304, b''
+        return 200, cached.body
+
+    @_guarded
+    def update_config(self, ctx: RequestContext) -> Result:
+        """PUT /api/config"""
+        # 1. 解析 JSON 请求体
+        data = ctx.json()
+        if not data:
+            return self._invalid_body(ctx)
+
+        # 2. 按当前配置的类别验证比例字段的类型、取值范围和总和
+        schemas = category_schemas(self.config_store.current.config.categories)
+        cleaned, errors = schemas.config_update.validate(data)
+        if errors:
+            return self._respond(ctx, error_payload(errors), 400)
+
+        # 3. 发布新的配置快照
+        try:
+            self.config_store.update(**config_changes(cleaned))
+        except ValueError as e:
+            return self._respond(ctx, {'success': False, 'error': str(e)}, 400)
+
+        # 4. 返回成功响应
+        return self._respond(ctx, {'success': True, 'data': {'message': '配置更新成功'}})
+
+
+def create_api_from_env(base_dir: str) -> CalculatorApi:
+    """按环境变量创建处理函数及其依赖（Flask 和 ASGI 应用使用相同的设置）
+
+    - 配置快照存储：CONFIG_BACKEND / CONFIG_DB_PATH / CONFIG_POLL_INTERVAL
+    - 结果缓存：CACHE_MAXSIZE / CACHE_TTL，配置更新后清空
+    - 持仓快照历史：HISTORY_ENABLED / HISTORY_DB_PATH / HISTORY_QUEUE_SIZE / HISTORY_BATCH_SIZE
+    - 组合状态：PORTFOLIO_BACKEND / PORTFOLIO_DB_PATH / PORTFOLIO_STORE_MAXSIZE /
+      PORTFOLIO_QUEUE_SIZE / PORTFOLIO_BATCH_SIZE
+
+    Args:
+        base_dir: 项目根目录，默认的数据文件位于其下的 data 目录
+    """
+    data_dir = os.path.join(base_dir, 'data')
+
+    # 配置快照存储（请求无锁读取当前快照，更新时整体替换）
+    # 默认使用 SQLite 文件后端，多个工作进程共享同一份配置
+    config_store = ConfigStore(
+        InvestmentConfig(),
+        backend=create_backend_from_env(os.path.join(data_dir, 'config.sqlite3')),
+        poll_interval=float(os.environ.get('CONFIG_POLL_INTERVAL', 0.01))
+    )
+
+    # 计算结果缓存（按配置版本隔离，配置更新后整体清空）
+    result_cache = ResultCache(
+        maxsize=int(os.environ.get('CACHE_MAXSIZE', 1024)),
+        ttl=float(os.environ.get('CACHE_TTL', 300))
+    )
+    config_store.subscribe(lambda snapshot: result_cache.invalidate())
+
+    # 持仓快照历史（SQLite，后台线程批量写入；HISTORY_ENABLED=0 可关闭）
+    snapshot_store = None
+    history_recorder = None
+    if os.environ.get('HISTORY_ENABLED', '1').lower() not in ('0', 'false', 'no'):
+        snapshot_store = SnapshotStore(os.environ.get('HISTORY_DB_PATH', os.path.join(data_dir, 'history.sqlite3')))
+        history_recorder = SnapshotRecorder(
+            snapshot_store,
+            max_queue=int(os.environ.get('HISTORY_QUEUE_SIZE', 10000)),
+            batch_size=int(os.environ.get('HISTORY_BATCH_SIZE', 500))
+        )
+
+    def latest_holdings(portfolio_id):
+        """组合持仓后端中没有组合时，从最近一次快照恢复持仓"""
+        latest = snapshot_store.latest(portfolio_id)
+        return None if latest is None else latest['holdings']
+
+    # 增量持仓状态（本进程内存中的状态为准，最多缓存 PORTFOLIO_STORE_MAXSIZE 个组合；
+    # 变动由后台线程异步写入所有工作进程共享的 SQLite 文件；
+    # 启用历史记录时，后端中还没有的组合从最近一次快照恢复，每次变动后记录快照）
+    portfolio_store = PortfolioStore(
+        maxsize=int(os.environ.get('PORTFOLIO_STORE_MAXSIZE', 10000)),
+        loader=latest_holdings if snapshot_store is not None else None,
+        backend=create_portfolio_backend_from_env(os.path.join(data_dir, 'portfolios.sqlite3')),
+        queue_size=int(os.environ.get('PORTFOLIO_QUEUE_SIZE', 10000)),
+        batch_size=int(os.environ.get('PORTFOLIO_BATCH_SIZE', 500))
+    )
+    if history_recorder is not None:
+        portfolio_store.subscribe(lambda state: history_recorder.record(
+            state.portfolio_id, dict(state.amounts), state.analysis(), state.config_version
+        ))
+
+    return CalculatorApi(config_store, result_cache, portfolio_store, snapshot_store, history_recorder)
@@ -0,0 +1,162 @@
+"""
+列式持仓模块
+
+该模块提供紧凑的持仓容器 HoldingsArray：每个字段一列 NumPy 数组，
+基金名称驻留为小整数编码。InvestmentCalculator 可以直接接收 HoldingsArray，
+加仓和止盈建议按列计算，只有命中规则的持仓在输出时才生成字典。
+
+与 List[Dict] 相比，数万条持仓不再需要每条一个字典和四次 .get()，
+内存占用约为每条 26 字节。
+"""
+
+import hashlib
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Mapping, Sequence, Tuple
+
+import numpy as np
+
+
+def _intern(fund_names: Iterable[str]) -> Tuple[np.ndarray, Tuple[str, ...]]:
+    """将基金名称按出现顺序编码为整数，返回 (编码数组, 名称表)"""
+    table: Dict[str, int] = {}
+    codes = [table.setdefault(name, len(table)) for name in fund_names]
+    dtype = np.uint16 if len(table) <= np.iinfo(np.uint16).max else np.uint32
+    names = tuple(sorted(table, key=table.get))
+    return np.array(codes, dtype=dtype), names
+
+
+class HoldingsArray:
+    """列式持仓
+
+    Attributes:
+        codes: 基金名称编码
+        names: 编码对应的基金名称
+        holding_cost: 持仓成本
+        current_nav: 当前净值
+        holding_amount: 持仓金额
+    """
+
+    __slots__ = ('codes', 'names', 'holding_cost', 'current_nav', 'holding_amount')
+
+    def __init__(
+        self,
+        codes: np.ndarray,
+        names: Sequence[str],
+        holding_cost: np.ndarray,
+        current_nav: np.ndarray,
+        holding_amount: np.ndarray
+    ):
+        self.codes = codes
+        self.names = tuple(names)
+        self.holding_cost = np.asarray(holding_cost, dtype=np.float64)
+        self.current_nav = np.asarray(current_nav, dtype=np.float64)
+        self.holding_amount = np.asarray(holding_amount, dtype=np.float64)
+        lengths = {len(codes), len(self.holding_cost), len(self.current_nav), len(self.holding_amount)}
+        if len(lengths) != 1:
+            raise ValueError('持仓各列的长度必须一致')
+
+    @classmethod
+    def from_columns(
+        cls,
+        fund_name: Sequence[str],
+        holding_cost: Sequence[float],
+        current_nav: Sequence[float],
+        holding_amount: Sequence[float]
+    ) -> 'HoldingsArray':
+        """由各列构建"""
+        codes, names = _intern(fund_name)
+        return cls(codes, names, holding_cost, current_nav, holding_amount)
+
+    @classmethod
+    def from_records(cls, holdings: Iterable[Mapping[str, Any]]) -> 'HoldingsArray':
+        """由持仓字典列表构建，缺失字段的默认值与 _calculate_suggestions 一致"""
+        holdings = list(holdings)
+        return cls.from_columns(
+            [h.get("fund_name", "") for h in holdings],
+            [h.get("holding_cost", 0) for h in holdings],
+            [h.get("current_nav", 0) for h in holdings],
+            [h.get("holding_amount", 0) for h in holdings],
+        )
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    @property
+    def nbytes(self) -> int:
+        """各列占用的字节数"""
+        return (self.codes.nbytes + self.holding_cost.nbytes +
+                self.current_nav.nbytes + self.holding_amount.nbytes)
+
+    def fund_names(self) -> List[str]:
+        """逐条解码的基金名称"""
+        return [self.names[code] for code in self.codes.tolist()]
+
+    def code_mask(self, names: Iterable[str]) -> np.ndarray:
+        """基金名称属于 names 的持仓掩码"""
+        wanted = set(names)
+        lookup = np.array([name in wanted for name in self.names], dtype=bool)
+        return lookup[self.codes]
+
+    def cache_key(self) -> Tuple[str, str]:
+        """结果缓存使用的键：所有列内容的摘要"""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update('\x00'.join(self.names).encode('utf-8'))
+        for column in (self.codes, self.holding_cost, self.current_nav, self.holding_amount):
+            digest.update(column.tobytes())
+        return ('holdings_array', digest.hexdigest())
+
+
+@dataclass
+class SuggestionColumns:
+    """按列保存的加仓和止盈建议
+
+    数组均只包含命中规则的持仓，顺序与输入一致；to_dict 生成与
+    _calculate_suggestions 相同格式的结果。
+    """
+
+    add_names: List[str]
+    add_return_rate: np.ndarray     # 百分比，已保留两位小数
+    add_threshold: np.ndarray       # 百分比，已保留两位小数
+    add_ratio: np.ndarray           # 百分比，已保留两位小数
+    add_amount: np.ndarray
+    profit_names: List[str]
+    profit_return_rate: np.ndarray
+    profit_amount: np.ndarray
+    profit_threshold: float         # 百分比，已保留两位小数
+    profit_ratio: float             # 百分比，已保留两位小数
+    total_add_amount: float
+    total_profit_amount: float
+
+    def to_dict(self) -> Dict[str, Any]:
+        """生成建议字典（只为命中规则的持仓创建字典）"""
+        add_suggestions = [
+            {
+                "fund_name": name,
+                "return_rate": rate,
+                "threshold": threshold,
+                "add_ratio": ratio,
+                "add_amount": amount
+            }
+            for name, rate, threshold, ratio, amount in zip(
+                self.add_names, self.add_return_rate.tolist(), self.add_threshold.tolist(),
+                self.add_ratio.tolist(), self.add_amount.tolist()
+            )
+        ]
+        profit_suggestions = [
+            {
+                "fund_name": name,
+                "return_rate": rate,
+                "threshold": self.profit_threshold,
+                "profit_ratio": self.profit_ratio,
+                "profit_amount": amount
+            }
+            for name, rate, amount in zip(
+                self.profit_names, self.profit_return_rate.tolist(), self.profit_amount.tolist()
+            )
+        ]
+        return {
+            "add_position_suggestions": add_suggestions,
+            "take_profit_suggestions": profit_suggestions,
+            "total_add_amount": self.total_add_amount,
+            "total_profit_amount": self.total_profit_amount
+        }
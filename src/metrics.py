@@ -0,0 +1,386 @@
+"""
+请求指标模块
+
+该模块收集每个路由的请求数、错误数和延迟直方图，以及请求内部各阶段
+（JSON 解析、请求校验、计算器各步骤、响应序列化）的耗时直方图，
+并以 Prometheus 文本格式输出（GET /metrics）。
+
+阶段计时按请求采样：请求开始时按 METRICS_SAMPLE_RATE 决定本次请求是否采样，
+未采样时每个计时点只做一次线程局部变量的读取。采样率为 0（默认）时
+只统计路由级别的请求数和延迟，计算器各步骤的计时装饰器直接返回原函数，
+计算路径上没有任何额外开销。
+
+指标保存在当前进程的内存中。设置 METRICS_SHARED_DIR 后，每个进程由后台线程
+每秒把自己的指标写入该目录下的 metrics-<pid>.json（只在有新数据时写），
+GET /metrics 汇总目录中所有进程（包括已退出的进程）的指标，多进程部署时
+任何一个工作进程输出的都是全部进程的合计。生产启动器在多进程时默认使用
+data/metrics 目录，并在启动时清空上次运行留下的文件。
+"""
+
+import atexit
+import functools
+import glob
+import json
+import os
+import random
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# 延迟直方图的桶上界（秒）
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+
+class Histogram:
+    """固定桶的延迟直方图"""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        # 最后一个计数对应 +Inf
+        self.counts: List[int] = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[int]:
+        """各桶的累计计数（Prometheus 的 le 语义）"""
+        total = 0
+        result = []
+        for count in self.counts:
+            total += count
+            result.append(total)
+        return result
+
+
+class _NullTimer:
+    """未采样时使用的空计时器"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _StageTimer:
+    __slots__ = ('registry', 'name', 'started')
+
+    def __init__(self, registry: 'MetricsRegistry', name: str):
+        self.registry = registry
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.observe_stage(self.name, time.perf_counter() - self.started)
+        return False
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names: Sequence[str], values: Sequence[str]) -> str:
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+class MetricsRegistry:
+    """请求和阶段指标的线程安全容器"""
+
+    def __init__(
+        self,
+        sample_rate: float = 0.0,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        shared_dir: Optional[str] = None,
+        flush_interval: float = 1.0
+    ):
+        """
+        Args:
+            sample_rate: 阶段计时的请求采样率（0 ~ 1）
+            buckets: 直方图的桶上界（秒）
+            shared_dir: 多进程共享的指标目录，None 表示只输出本进程的指标
+            flush_interval: 写入共享目录的间隔（秒）
+        """
+        self.sample_rate = sample_rate
+        self.buckets = tuple(buckets)
+        self.shared_dir = shared_dir
+        self.flush_interval = flush_interval
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        # 已启动写入线程的进程号（fork 后的子进程需要重新启动）
+        self._flusher_pid: Optional[int] = None
+        if shared_dir:
+            os.makedirs(shared_dir, exist_ok=True)
+        self.reset()
+
+    def reset(self) -> None:
+        """清空所有指标（包括本进程写入共享目录的文件）"""
+        with self._lock:
+            self._requests: Dict[Tuple[str, str, str], int] = {}
+            self._errors: Dict[Tuple[str, str, str], int] = {}
+            self._request_latency: Dict[Tuple[str, str], Histogram] = {}
+            self._stage_latency: Dict[str, Histogram] = {}
+            self._dirty = False
+        if self.shared_dir:
+            try:
+                os.remove(self._shared_path())
+            except OSError:
+                pass
+
+    # -- 采样 ---------------------------------------------------------------
+
+    def start_request(self) -> bool:
+        """请求开始时调用，按采样率决定本次请求是否记录阶段耗时"""
+        rate = self.sample_rate
+        sampled = rate > 0 and (rate >= 1 or random.random() < rate)
+        self._local.sampled = sampled
+        return sampled
+
+    def end_request(self) -> None:
+        """请求结束时调用，关闭当前线程的阶段计时"""
+        self._local.sampled = False
+
+    @property
+    def sampling(self) -> bool:
+        """当前线程的请求是否被采样"""
+        return getattr(self._local, 'sampled', False)
+
+    def stage(self, name: str):
+        """阶段计时上下文：with metrics.stage('parse'): ...
+
+        未采样时返回共享的空计时器。
+        """
+        if getattr(self._local, 'sampled', False):
+            return _StageTimer(self, name)
+        return _NULL_TIMER
+
+    def timed(self, name: str) -> Callable[[Callable], Callable]:
+        """阶段计时装饰器，未采样时直接调用原函数
+
+        装饰时采样率为 0 的容器返回原函数本身（进程启动时由环境变量决定）。
+        """
+        local = self._local
+
+        def decorate(fn: Callable) -> Callable:
+            if self.sample_rate <= 0:
+                return fn
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not getattr(local, 'sampled', False):
+                    return fn(*args, **kwargs)
+                started = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.observe_stage(name, time.perf_counter() - started)
+            return wrapper
+
+        return decorate
+
+    # -- 记录 ---------------------------------------------------------------
+
+    def observe_stage(self, name: str, seconds: float) -> None:
+        """记录一次阶段耗时"""
+        with self._lock:
+            histogram = self._stage_latency.get(name)
+            if histogram is None:
+                histogram = self._stage_latency[name] = Histogram(self.buckets)
+            histogram.observe(seconds)
+            self._dirty = True
+        if self.shared_dir and self._flusher_pid != os.getpid():
+            self._start_flusher()
+
+    def observe_request(self, route: str, method: str, status: int, seconds: float) -> None:
+        """记录一次请求：请求数、错误数（状态码 >= 400）和延迟"""
+        key = (route, method, str(status))
+        with self._lock:
+            self._requests[key] = self._requests.get(key, 0) + 1
+            if status >= 400:
+                self._errors[key] = self._errors.get(key, 0) + 1
+            histogram = self._request_latency.get((route, method))
+            if histogram is None:
+                histogram = self._request_latency[(route, method)] = Histogram(self.buckets)
+            histogram.observe(seconds)
+            self._dirty = True
+        if self.shared_dir and self._flusher_pid != os.getpid():
+            self._start_flusher()
+
+    # -- 多进程共享 -----------------------------------------------------------
+
+    def _shared_path(self, pid: Optional[int] = None) -> str:
+        return os.path.join(self.shared_dir, f'metrics-{pid or os.getpid()}.json')
+
+    def _start_flusher(self) -> None:
+        """在当前进程中启动写入共享目录的后台线程"""
+        with self._flush_lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+        threading.Thread(target=self._flush_loop, name='metrics-flush', daemon=True).start()
+        atexit.register(self.flush)
+
+    def _flush_loop(self) -> None:
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except OSError:
+                pass
+
+    def flush(self) -> None:
+        """把本进程的指标写入共享目录（没有新数据时跳过）"""
+        if not self.shared_dir:
+            return
+        with self._flush_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                data = self._export()
+                self._dirty = False
+            path = self._shared_path()
+            temp = f'{path}.tmp'
+            with open(temp, 'w', encoding='utf-8') as f:
+                json.dump(data, f, separators=(',', ':'))
+            os.replace(temp, path)
+
+    def _export(self) -> dict:
+        """本进程指标的可序列化形式（调用方持有锁）"""
+        return {
+            'buckets': list(self.buckets),
+            'requests': [[*key, count] for key, count in self._requests.items()],
+            'errors': [[*key, count] for key, count in self._errors.items()],
+            'request_latency': [
+                [*key, h.counts, h.sum, h.count] for key, h in self._request_latency.items()
+            ],
+            'stage_latency': [
+                [key, h.counts, h.sum, h.count] for key, h in self._stage_latency.items()
+            ],
+        }
+
+    def _collect(self):
+        """汇总指标：未设置共享目录时为本进程的副本，否则为目录中所有进程的合计
+
+        Returns:
+            (请求数, 错误数, 请求延迟直方图, 阶段延迟直方图)
+        """
+        if not self.shared_dir:
+            with self._lock:
+                return (
+                    dict(self._requests),
+                    dict(self._errors),
+                    {key: self._copy(h) for key, h in self._request_latency.items()},
+                    {(key,): self._copy(h) for key, h in self._stage_latency.items()}
+                )
+
+        self.flush()
+        requests: Dict[Tuple[str, ...], int] = {}
+        errors: Dict[Tuple[str, ...], int] = {}
+        request_latency: Dict[Tuple[str, ...], Histogram] = {}
+        stage_latency: Dict[Tuple[str, ...], Histogram] = {}
+        for path in glob.glob(os.path.join(self.shared_dir, 'metrics-*.json')):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            # 桶配置不同的文件（旧版本进程留下的）无法合并
+            if tuple(data.get('buckets', ())) != self.buckets:
+                continue
+            for target, rows in ((requests, data['requests']), (errors, data['errors'])):
+                for *key, count in rows:
+                    key = tuple(key)
+                    target[key] = target.get(key, 0) + count
+            for target, rows in ((request_latency, data['request_latency']), (stage_latency, data['stage_latency'])):
+                for *key, counts, total, count in rows:
+                    key = tuple(key)
+                    histogram = target.get(key)
+                    if histogram is None:
+                        histogram = target[key] = Histogram(self.buckets)
+                    histogram.counts = [a + b for a, b in zip(histogram.counts, counts)]
+                    histogram.sum += total
+                    histogram.count += count
+        return requests, errors, request_latency, stage_latency
+
+    # -- 输出 ---------------------------------------------------------------
+
+    def _render_histogram(self, lines: List[str], name: str, label_names: Sequence[str],
+                          series: Dict[Tuple[str, ...], Histogram]) -> None:
+        bounds = [repr(bound) for bound in self.buckets] + ['+Inf']
+        for values, histogram in sorted(series.items()):
+            labels = _labels(label_names, values)
+            for bound, count in zip(bounds, histogram.cumulative()):
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'{name}_sum{{{labels}}} {histogram.sum!r}')
+            lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+
+    def render(self) -> str:
+        """以 Prometheus 文本格式（0.0.4）输出所有指标"""
+        requests, errors, request_latency, stage_latency = self._collect()
+
+        lines = [
+            '# HELP app_requests_total 请求数',
+            '# TYPE app_requests_total counter',
+        ]
+        request_labels = ('route', 'method', 'status')
+        for key, count in sorted(requests.items()):
+            lines.append(f'app_requests_total{{{_labels(request_labels, key)}}} {count}')
+
+        lines += [
+            '# HELP app_request_errors_total 错误请求数（状态码 >= 400）',
+            '# TYPE app_request_errors_total counter',
+        ]
+        for key, count in sorted(errors.items()):
+            lines.append(f'app_request_errors_total{{{_labels(request_labels, key)}}} {count}')
+
+        lines += [
+            '# HELP app_request_duration_seconds 请求处理耗时',
+            '# TYPE app_request_duration_seconds histogram',
+        ]
+        self._render_histogram(lines, 'app_request_duration_seconds', ('route', 'method'), request_latency)
+
+        lines += [
+            '# HELP app_stage_duration_seconds 请求内部各阶段耗时（采样）',
+            '# TYPE app_stage_duration_seconds histogram',
+        ]
+        self._render_histogram(lines, 'app_stage_duration_seconds', ('stage',), stage_latency)
+
+        lines += [
+            '# HELP app_stage_sample_rate 阶段计时的请求采样率',
+            '# TYPE app_stage_sample_rate gauge',
+            f'app_stage_sample_rate {self.sample_rate!r}',
+        ]
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _copy(histogram: Histogram) -> Histogram:
+        copy = Histogram(histogram.buckets)
+        copy.counts = list(histogram.counts)
+        copy.sum = histogram.sum
+        copy.count = histogram.count
+        return copy
+
+
+# 进程内共享的指标容器
+metrics = MetricsRegistry(
+    sample_rate=float(os.environ.get('METRICS_SAMPLE_RATE', 0)),
+    shared_dir=os.environ.get('METRICS_SHARED_DIR') or None
+)
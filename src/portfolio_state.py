@@ -0,0 +1,712 @@
+"""
+增量持仓状态模块
+
+该模块为需要逐笔推送持仓变动的客户端（如实时看板）保存每个组合的持仓状态：
+各类别金额、基金组合金额和总持仓金额，以及上一次的分析结果。
+
+应用变动时只重新计算受影响的层级：
+- 只改变非基金类别时，基金组合内部分析保持不变
+- 层级的基数（总持仓金额或基金组合金额）不变时，只重新计算金额变化的类别；
+  基数变化时该层级所有类别的占比都会变化，整层重新计算
+返回值只包含结果实际发生变化的类别，客户端按类别合并即可。
+
+状态与 analyze_portfolio 使用同一个分析函数和相同的累加顺序（均由计算器的
+类别注册表给出），任何时刻 analysis() 都与对当前持仓完整调用 analyze_portfolio
+的结果逐位相同。
+
+每个组合的持仓金额和版本号保存在可插拔的后端中（单进程使用内存后端，
+多进程部署使用 SQLite 文件后端）。进程内以内存中的 PortfolioState 为准，
+每个组合一把锁；变动由后台线程按批次异步写入后端，变动金额在后端的持仓上
+累加，多个工作进程对同一组合的变动不会互相覆盖。访问组合时比较后端的版本号，
+其他进程修改过该组合时按后端重建。
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+from src.calculator import InvestmentCalculator
+
+logger = logging.getLogger(__name__)
+
+
+class PortfolioState:
+    """单个组合的持仓状态和分析结果"""
+
+    def __init__(
+        self,
+        portfolio_id: str,
+        calculator: InvestmentCalculator,
+        holdings: Optional[Mapping[str, float]] = None
+    ):
+        """
+        Args:
+            portfolio_id: 组合标识
+            calculator: 计算器（提供预期比例和分析函数）
+            holdings: 初始持仓金额，未提供的类别为 0
+        """
+        self.portfolio_id = portfolio_id
+        self.version = 0
+        self.amounts: Dict[str, float] = {}
+        self._adopt(calculator, holdings)
+        self._rebuild(calculator)
+
+    def _adopt(self, calculator: InvestmentCalculator, holdings: Optional[Mapping[str, float]] = None) -> None:
+        """按计算器的类别注册表整理持仓金额：新增类别为 0，已删除的类别丢弃"""
+        holdings = self.amounts if holdings is None else holdings
+        self.categories = calculator.categories
+        self.fund_keys = frozenset(self.categories.funds.keys)
+        self.amounts = {key: float(holdings.get(key, 0.0)) for key in self.categories.holding_keys}
+
+    def _rebuild(self, calculator: InvestmentCalculator) -> None:
+        """按当前持仓完整计算一次（创建时及配置版本变化时）"""
+        if calculator.categories is not self.categories:
+            self._adopt(calculator)
+        self.calculator = calculator
+        self.config_version = calculator.config_version
+        self.fund_portfolio_amount = self.categories.fund_portfolio_amount(self.amounts)
+        self.total_amount = self.categories.total_amount(self.amounts, self.fund_portfolio_amount)
+        self.framework_analysis: Dict[str, Dict[str, Any]] = {}
+        self.fund_portfolio_analysis: Dict[str, Dict[str, Any]] = {}
+        self._refresh_framework(None)
+        self._refresh_fund_portfolio(None)
+
+    def _refresh_framework(self, keys: Optional[List[str]]) -> Dict[str, Dict[str, Any]]:
+        """重新计算大框架类别（keys 为 None 时整层重新计算），返回发生变化的结果"""
+        if self.total_amount == 0:
+            self.framework_analysis = {}
+            return {}
+        portfolio_key = self.categories.portfolio_key
+        changed = {}
+        for category in self.categories.framework:
+            key = category.key
+            if keys is not None and key not in keys and key in self.framework_analysis:
+                continue
+            amount = self.fund_portfolio_amount if key == portfolio_key else self.amounts[key]
+            entry = self.calculator._analysis_entry(category.name, amount, self.total_amount, category.ratio)
+            if self.framework_analysis.get(key) != entry:
+                changed[key] = entry
+        self.framework_analysis.update(changed)
+        return changed
+
+    def _refresh_fund_portfolio(self, keys: Optional[List[str]]) -> Dict[str, Dict[str, Any]]:
+        """重新计算基金组合内部类别（keys 为 None 时整层重新计算），返回发生变化的结果"""
+        if self.fund_portfolio_amount <= 0:
+            self.fund_portfolio_analysis = {}
+            return {}
+        changed = {}
+        for category in self.categories.funds:
+            key = category.key
+            if keys is not None and key not in keys and key in self.fund_portfolio_analysis:
+                continue
+            entry = self.calculator._analysis_entry(
+                category.name, self.amounts[key], self.fund_portfolio_amount, category.ratio
+            )
+            if self.fund_portfolio_analysis.get(key) != entry:
+                changed[key] = entry
+        self.fund_portfolio_analysis.update(changed)
+        return changed
+
+    def apply_deltas(
+        self,
+        deltas: Mapping[str, float],
+        calculator: Optional[InvestmentCalculator] = None
+    ) -> Dict[str, Any]:
+        """应用持仓金额变动
+
+        Args:
+            deltas: {持仓字段: 变动金额}，可以为负数
+            calculator: 当前计算器；配置版本与状态不一致时先按新配置完整重算
+
+        Returns:
+            变动结果：version、total_amount，以及 framework_analysis、
+            fund_portfolio_analysis 中结果发生变化的类别；
+            某一层级变为空（总金额为 0）时该层级的 cleared 为 True
+
+        Raises:
+            ValueError: 包含未知的持仓类别，或变动后某个类别的金额为负数（此时状态保持不变）
+        """
+        rebuilt = calculator is not None and calculator.config_version != self.config_version
+        categories = calculator.categories if rebuilt else self.categories
+        unknown = [key for key in deltas if key not in categories.holding_keys]
+        if unknown:
+            raise ValueError('；'.join(f'未知的持仓类别: {key}' for key in unknown))
+        negative = [key for key, delta in deltas.items() if self.amounts.get(key, 0.0) + delta < 0]
+        if negative:
+            raise ValueError('；'.join(f'持仓金额 {key} 变动后不能为负数' for key in negative))
+
+        if rebuilt:
+            self._adopt(calculator)
+        for key, delta in deltas.items():
+            self.amounts[key] += delta
+        self.version += 1
+
+        if rebuilt:
+            self._rebuild(calculator)
+            framework_changed = dict(self.framework_analysis)
+            fund_changed = dict(self.fund_portfolio_analysis)
+        else:
+            changed_keys = [key for key, delta in deltas.items() if delta != 0]
+            fund_keys = [key for key in changed_keys if key in self.fund_keys]
+
+            # 1. 基金组合层级：只有基金类别变动时才需要处理
+            fund_changed = {}
+            if fund_keys:
+                fund_portfolio_amount = self.categories.fund_portfolio_amount(self.amounts)
+                base_changed = fund_portfolio_amount != self.fund_portfolio_amount
+                self.fund_portfolio_amount = fund_portfolio_amount
+                fund_changed = self._refresh_fund_portfolio(None if base_changed else fund_keys)
+
+            # 2. 大框架层级：基金类别的变动体现在"基金组合"上
+            framework_keys = [key for key in changed_keys if key not in self.fund_keys]
+            if fund_keys:
+                framework_keys.append(self.categories.portfolio_key)
+            framework_changed = {}
+            if framework_keys:
+                total_amount = self.categories.total_amount(self.amounts, self.fund_portfolio_amount)
+                base_changed = total_amount != self.total_amount
+                self.total_amount = total_amount
+                framework_changed = self._refresh_framework(None if base_changed else framework_keys)
+
+        return {
+            'portfolio_id': self.portfolio_id,
+            'version': self.version,
+            'total_amount': round(self.total_amount, 2),
+            'framework_analysis': framework_changed,
+            'fund_portfolio_analysis': fund_changed,
+            'cleared': {
+                'framework_analysis': not self.framework_analysis,
+                'fund_portfolio_analysis': not self.fund_portfolio_analysis,
+            },
+        }
+
+    def analysis(self) -> Dict[str, Any]:
+        """完整的分析结果，格式与 analyze_portfolio 相同"""
+        return {
+            'total_amount': round(self.total_amount, 2),
+            'framework_analysis': dict(self.framework_analysis),
+            'fund_portfolio_analysis': dict(self.fund_portfolio_analysis),
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        """组合的完整状态：持仓金额和分析结果"""
+        return {
+            'portfolio_id': self.portfolio_id,
+            'version': self.version,
+            'holdings': {key: round(value, 2) for key, value in self.amounts.items()},
+            **self.analysis(),
+        }
+
+
+# 后端保存的组合：(版本号, 持仓金额)
+StoredPortfolio = Tuple[int, Dict[str, float]]
+
+# 一次组合变动：(portfolio_id, 变动金额（以完整持仓替换时为 None）, 变动后的持仓金额, 变动后的版本号)
+PortfolioChange = Tuple[str, Optional[Mapping[str, float]], Mapping[str, float], int]
+
+
+def apply_change(stored: Optional[StoredPortfolio], change: PortfolioChange) -> StoredPortfolio:
+    """在后端已有的组合上应用一次变动
+
+    后端中没有组合时直接保存变动后的持仓；变动金额在后端的持仓上累加，
+    多个进程对同一组合的变动都会生效，不会互相覆盖；以完整持仓替换时以最后一次为准。
+    """
+    _, deltas, holdings, version = change
+    if stored is None:
+        return version, dict(holdings)
+    if deltas is None:
+        return stored[0] + 1, dict(holdings)
+    amounts = dict(stored[1])
+    for key, delta in deltas.items():
+        amounts[key] = amounts.get(key, 0.0) + delta
+    return stored[0] + 1, amounts
+
+
+class PortfolioBackend:
+    """组合持仓的后端接口
+
+    子类需要实现：
+    - load: 读取组合，不存在时返回 None
+    - version: 只读取组合的版本号（跨进程的版本检查），不存在时返回 None
+    - write_batch: 在一个事务中按顺序应用一批变动（见 apply_change）
+    - delete: 删除组合
+
+    shared 为 True 的后端由多个进程共享：PortfolioStore 经后台线程异步写入，
+    并在访问组合时检查其他进程是否修改过。
+    """
+
+    shared = False
+
+    def load(self, portfolio_id: str) -> Optional[StoredPortfolio]:
+        raise NotImplementedError
+
+    def version(self, portfolio_id: str) -> Optional[int]:
+        raise NotImplementedError
+
+    def write_batch(self, changes: Iterable[PortfolioChange]) -> int:
+        raise NotImplementedError
+
+    def delete(self, portfolio_id: str) -> bool:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """释放后端资源"""
+
+
+class MemoryPortfolioBackend(PortfolioBackend):
+    """进程内后端，适用于单进程运行"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._portfolios: Dict[str, StoredPortfolio] = {}
+
+    def load(self, portfolio_id):
+        return self._portfolios.get(portfolio_id)
+
+    def version(self, portfolio_id):
+        stored = self._portfolios.get(portfolio_id)
+        return None if stored is None else stored[0]
+
+    def write_batch(self, changes):
+        count = 0
+        with self._lock:
+            for change in changes:
+                self._portfolios[change[0]] = apply_change(self._portfolios.get(change[0]), change)
+                count += 1
+        return count
+
+    def delete(self, portfolio_id):
+        with self._lock:
+            return self._portfolios.pop(portfolio_id, None) is not None
+
+
+class SQLitePortfolioBackend(PortfolioBackend):
+    """SQLite 文件后端，多个工作进程共享同一份组合持仓
+
+    每个组合一行（版本号、持仓金额 JSON）。每个线程使用自己的连接；
+    一批变动在一个 BEGIN IMMEDIATE 事务中应用，不同进程的写入按顺序执行。
+    """
+
+    shared = True
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: SQLite 数据库文件路径，所在目录不存在时自动创建
+        """
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._local = threading.local()
+        # 建表使用临时连接：线程局部连接不能跨 fork 继承给工作进程
+        conn = sqlite3.connect(path, timeout=5.0, isolation_level=None)
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS portfolio_holdings ('
+                ' portfolio_id TEXT PRIMARY KEY,'
+                ' version INTEGER NOT NULL,'
+                ' holdings TEXT NOT NULL,'
+                ' updated_at REAL NOT NULL'
+                ') WITHOUT ROWID'
+            )
+        finally:
+            conn.close()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        # fork 前创建的连接不能在子进程中继续使用
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA busy_timeout=5000')
+            # WAL 模式下 NORMAL 只在检查点时同步，崩溃时最多丢失最近的若干事务
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def _read(conn: sqlite3.Connection, portfolio_id: str) -> Optional[StoredPortfolio]:
+        row = conn.execute(
+            'SELECT version, holdings FROM portfolio_holdings WHERE portfolio_id = ?', (portfolio_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+
+    def load(self, portfolio_id):
+        return self._read(self._connection(), portfolio_id)
+
+    def version(self, portfolio_id):
+        row = self._connection().execute(
+            'SELECT version FROM portfolio_holdings WHERE portfolio_id = ?', (portfolio_id,)
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def write_batch(self, changes):
+        conn = self._connection()
+        count = 0
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            now = time.time()
+            for change in changes:
+                version, holdings = apply_change(self._read(conn, change[0]), change)
+                conn.execute(
+                    'INSERT OR REPLACE INTO portfolio_holdings (portfolio_id, version, holdings, updated_at)'
+                    ' VALUES (?, ?, ?, ?)',
+                    (change[0], version, json.dumps(holdings, separators=(',', ':')), now)
+                )
+                count += 1
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return count
+
+    def delete(self, portfolio_id):
+        cursor = self._connection().execute(
+            'DELETE FROM portfolio_holdings WHERE portfolio_id = ?', (portfolio_id,)
+        )
+        return cursor.rowcount > 0
+
+    def close(self) -> None:
+        """关闭当前线程的连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def create_portfolio_backend_from_env(default_path: str) -> PortfolioBackend:
+    """根据环境变量创建组合持仓后端
+
+    - PORTFOLIO_BACKEND: sqlite（默认）或 memory
+    - PORTFOLIO_DB_PATH: SQLite 文件路径，默认为 default_path
+
+    Args:
+        default_path: 默认的 SQLite 文件路径
+    """
+    kind = os.environ.get('PORTFOLIO_BACKEND', 'sqlite').lower()
+    if kind == 'memory':
+        return MemoryPortfolioBackend()
+    if kind == 'sqlite':
+        return SQLitePortfolioBackend(os.environ.get('PORTFOLIO_DB_PATH', default_path))
+    raise ValueError(f"不支持的组合持仓后端: {kind}")
+
+
+class PortfolioWriter:
+    """异步批量写入组合变动的后台写入器
+
+    submit 只把变动放入有界队列；后台线程每次取出最多 batch_size 条，
+    在一个事务中写入后端，写入（无论成功与否）后调用 on_written。
+    与快照记录不同，变动不能丢弃：队列满时 submit 等待队列腾出空间。
+    进程退出前写完队列中的变动。
+    """
+
+    def __init__(
+        self,
+        backend: PortfolioBackend,
+        on_written: Callable[[List[PortfolioChange]], None],
+        max_queue: int = 10000,
+        batch_size: int = 500
+    ):
+        """
+        Args:
+            backend: 组合持仓后端
+            on_written: 一批变动写入后的回调（在写入线程中调用）
+            max_queue: 队列容量
+            batch_size: 每个事务最多写入的变动数
+        """
+        self.backend = backend
+        self.on_written = on_written
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.written = 0
+        self.failed = 0
+        self._queue: "queue.Queue[PortfolioChange]" = queue.Queue(maxsize=max_queue)
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def submit(self, change: PortfolioChange) -> None:
+        """提交一次变动（不等待写入；队列已满时等待）"""
+        if self._pid != os.getpid():
+            self._start()
+        self._queue.put(change)
+
+    def _start(self) -> None:
+        """在当前进程中启动写入线程（fork 出的工作进程各自启动）"""
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self.max_queue)
+            self._pid = os.getpid()
+        threading.Thread(target=self._run, name='portfolio-writer', daemon=True).start()
+        atexit.register(self.flush)
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.written += self.backend.write_batch(batch)
+            except Exception:
+                self.failed += len(batch)
+                logger.exception('写入组合持仓失败（%d 条）', len(batch))
+            self.on_written(batch)
+            for _ in batch:
+                self._queue.task_done()
+
+    def flush(self) -> None:
+        """等待队列中已提交的变动全部写入"""
+        if self._pid == os.getpid():
+            self._queue.join()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'queued': self._queue.qsize(),
+            'written': self.written,
+            'failed': self.failed,
+        }
+
+
+class _Entry:
+    """容器中的一个组合
+
+    - lock: 组合锁
+    - state: 内存中的状态（尚未加载或组合不存在时为 None）
+    - replaced: replace 提交、尚未构建状态的 (版本号, 持仓金额)，下次访问时构建
+    """
+
+    __slots__ = ('lock', 'state', 'replaced')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.state: Optional[PortfolioState] = None
+        self.replaced: Optional[StoredPortfolio] = None
+
+
+class PortfolioStore:
+    """组合状态容器
+
+    内存中的 PortfolioState 是本进程内组合状态的依据，每个组合一把锁，
+    不同组合的变动互不阻塞；超过 maxsize 时淘汰最久未访问的组合。
+
+    变动先在内存中应用并返回，再交给 PortfolioWriter 异步写入共享后端，
+    请求路径上不等待 SQLite 写入。后端只在以下情况读取：
+    - 内存中没有该组合（首次访问或已淘汰），从后端加载
+    - 共享后端上本进程没有待写入的变动时，比较后端版本号，
+      其他进程修改过该组合则按后端重建
+    本进程写入失败时，下次访问按后端重建，这次变动丢失。
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 10000,
+        loader: Optional[Callable[[str], Optional[Mapping[str, float]]]] = None,
+        backend: Optional[PortfolioBackend] = None,
+        queue_size: int = 10000,
+        batch_size: int = 500
+    ):
+        """
+        Args:
+            maxsize: 内存中最多缓存的组合数
+            loader: 后端中没有组合时读取其初始持仓的函数（如持久化的快照），
+                    返回 None 表示组合不存在
+            backend: 组合持仓后端，默认为进程内后端
+            queue_size: 共享后端的写入队列容量
+            batch_size: 共享后端每个事务最多写入的变动数
+        """
+        self.maxsize = maxsize
+        self.loader = loader
+        self.backend = backend if backend is not None else MemoryPortfolioBackend()
+        self.writer: Optional[PortfolioWriter] = None
+        if self.backend.shared:
+            self.writer = PortfolioWriter(self.backend, self._written, queue_size, batch_size)
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        # 保护 _entries 和 _pending，只在字典操作期间持有
+        self._lock = threading.Lock()
+        # 组合 -> 已提交但尚未写入后端的变动数
+        self._pending: Dict[str, int] = {}
+        self._listeners: List[Callable[[PortfolioState], None]] = []
+        if self.writer is not None and hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self) -> None:
+        # fork 时其他线程可能持有组合锁或有尚未写入的变动，子进程从空的缓存开始
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._pending = {}
+        self.writer = PortfolioWriter(self.backend, self._written, self.writer.max_queue, self.writer.batch_size)
+
+    def subscribe(self, listener: Callable[[PortfolioState], None]) -> None:
+        """注册组合应用变动后的回调（在组合锁内调用，应只做入队等轻量操作）"""
+        self._listeners.append(listener)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @contextmanager
+    def _locked(self, portfolio_id: str) -> Iterator[_Entry]:
+        """取得组合锁
+
+        加锁后确认条目仍在容器中：等锁期间条目可能被淘汰并由其他线程重新创建，
+        此时改用新条目，同一组合始终只有一把有效的锁。
+        """
+        while True:
+            with self._lock:
+                entry = self._entries.get(portfolio_id)
+                if entry is None:
+                    entry = self._entries[portfolio_id] = _Entry()
+                    while len(self._entries) > self.maxsize:
+                        self._entries.popitem(last=False)
+                else:
+                    self._entries.move_to_end(portfolio_id)
+            entry.lock.acquire()
+            if self._entries.get(portfolio_id) is entry:
+                break
+            entry.lock.release()
+        try:
+            yield entry
+        finally:
+            entry.lock.release()
+
+    def _current(
+        self,
+        portfolio_id: str,
+        entry: _Entry,
+        calculator: InvestmentCalculator
+    ) -> Optional[PortfolioState]:
+        """取得组合的当前状态（调用方持有组合锁）；配置版本变化时先按新配置重算"""
+        if entry.replaced is not None:
+            version, holdings = entry.replaced
+            entry.replaced = None
+            entry.state = PortfolioState(portfolio_id, calculator, holdings)
+            entry.state.version = version
+        state = entry.state
+        if state is not None and self.writer is not None and not self._pending.get(portfolio_id):
+            # 本进程的变动都已写入，后端版本号不同说明其他进程修改过该组合
+            if self.backend.version(portfolio_id) != state.version:
+                state = None
+        if state is None:
+            if self.writer is not None and self._pending.get(portfolio_id):
+                # 条目被淘汰后重新加载：先等本进程尚未写入的变动落盘
+                self.writer.flush()
+            stored = self.backend.load(portfolio_id)
+            if stored is None and self.loader is not None:
+                holdings = self.loader(portfolio_id)
+                stored = None if holdings is None else (0, dict(holdings))
+            if stored is None:
+                entry.state = None
+                return None
+            state = PortfolioState(portfolio_id, calculator, stored[1])
+            state.version = stored[0]
+            entry.state = state
+        elif state.config_version != calculator.config_version:
+            state._rebuild(calculator)
+        return state
+
+    def _persist(
+        self,
+        portfolio_id: str,
+        deltas: Optional[Mapping[str, float]],
+        holdings: Mapping[str, float],
+        version: int
+    ) -> None:
+        """提交变动：进程内后端直接写入，共享后端放入写入队列"""
+        change = (portfolio_id, deltas, holdings, version)
+        if self.writer is None:
+            self.backend.write_batch([change])
+            return
+        with self._lock:
+            self._pending[portfolio_id] = self._pending.get(portfolio_id, 0) + 1
+        self.writer.submit(change)
+
+    def _written(self, changes: List[PortfolioChange]) -> None:
+        with self._lock:
+            for change in changes:
+                remaining = self._pending[change[0]] - 1
+                if remaining:
+                    self._pending[change[0]] = remaining
+                else:
+                    del self._pending[change[0]]
+
+    def flush(self) -> None:
+        """等待已提交的变动全部写入后端"""
+        if self.writer is not None:
+            self.writer.flush()
+
+    def get(self, portfolio_id: str, calculator: InvestmentCalculator) -> Optional[PortfolioState]:
+        """查询组合状态；配置版本变化时先按新配置重算"""
+        with self._locked(portfolio_id) as entry:
+            return self._current(portfolio_id, entry, calculator)
+
+    def apply_deltas(
+        self,
+        portfolio_id: str,
+        deltas: Mapping[str, float],
+        calculator: InvestmentCalculator
+    ) -> Dict[str, Any]:
+        """对组合应用持仓变动，组合不存在（且 loader 中也没有）时以全 0 持仓创建
+
+        Raises:
+            ValueError: 包含未知的持仓类别，或变动后某个类别的金额为负数（此时状态保持不变）
+        """
+        with self._locked(portfolio_id) as entry:
+            state = self._current(portfolio_id, entry, calculator)
+            if state is None:
+                state = PortfolioState(portfolio_id, calculator)
+                result = state.apply_deltas(deltas)
+            else:
+                result = state.apply_deltas(deltas, calculator)
+            entry.state = state
+            self._persist(portfolio_id, dict(deltas), dict(state.amounts), state.version)
+            for listener in self._listeners:
+                listener(state)
+            return result
+
+    def replace(
+        self,
+        portfolio_id: str,
+        holdings: Mapping[str, float],
+        calculator: InvestmentCalculator
+    ) -> None:
+        """以完整持仓替换组合状态（不触发回调），组合不存在时创建
+
+        不读取后端，也不立即计算分析结果（调用方通常刚完成完整分析）：
+        只记录持仓并提交写入，下次访问组合时再构建状态。
+        内存中没有该组合时版本号从 0 开始，写入后端后按后端的版本号校正。
+        """
+        amounts = {key: float(holdings.get(key, 0.0)) for key in calculator.categories.holding_keys}
+        with self._locked(portfolio_id) as entry:
+            if entry.state is not None:
+                version = entry.state.version + 1
+            elif entry.replaced is not None:
+                version = entry.replaced[0] + 1
+            else:
+                version = 0
+            entry.state = None
+            entry.replaced = (version, amounts)
+            self._persist(portfolio_id, None, amounts, version)
+
+    def remove(self, portfolio_id: str) -> bool:
+        """删除组合状态，返回组合是否存在"""
+        with self._locked(portfolio_id) as entry:
+            if self.writer is not None and self._pending.get(portfolio_id):
+                # 先写完队列中的变动，避免删除后又被写回
+                self.writer.flush()
+            entry.state = None
+            entry.replaced = None
+            with self._lock:
+                self._entries.pop(portfolio_id, None)
+            return self.backend.delete(portfolio_id)
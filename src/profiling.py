@@ -0,0 +1,269 @@
+"""
+请求采样分析模块
+
+该模块为个别慢请求采集调用栈：后台采样线程按固定间隔读取被观察线程的
+当前调用栈（sys._current_frames），按折叠格式（collapsed stacks，
+"外层;内层;... 次数"）累计，可直接用 flamegraph.pl 或 speedscope 生成火焰图。
+
+两种触发方式：
+- 请求头 X-Profile：值等于 PROFILE_TOKEN 时整个请求都被采样；未设置令牌时忽略该请求头
+- 延迟阈值（PROFILE_THRESHOLD_MS）：请求处理时间超过阈值后开始采样，
+  直到请求结束，记录慢请求剩余部分的调用栈
+
+采样结果写入磁盘上的有界环形缓冲区（每个请求一个 JSON 文件，超过
+PROFILE_RING_SIZE 时删除最旧的文件），多个工作进程可以共享同一个目录。
+
+两种触发方式都未启用时不会启动采样线程，请求只多一次请求头查找；
+启用延迟阈值时每个请求登记一次，采样线程在没有请求超过阈值时处于等待状态。
+"""
+
+import hmac
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+# 请求头：值为 PROFILE_TOKEN 设置的令牌时采样该请求
+PROFILE_HEADER = 'X-Profile'
+
+# 请求头：读取采样结果时提供的令牌
+PROFILE_TOKEN_HEADER = 'X-Profile-Token'
+
+# 折叠调用栈时，从 Flask 分发请求的这一层开始保留，省略服务器和线程池的外层栈帧
+ROOT_FUNCTION = 'dispatch_request'
+
+
+def _frame_label(code) -> str:
+    return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+
+def collapse_stack(frame) -> str:
+    """将栈帧折叠为 "外层;...;内层" 形式的字符串"""
+    codes = []
+    while frame is not None:
+        codes.append(frame.f_code)
+        frame = frame.f_back
+    codes.reverse()
+    for index, code in enumerate(codes):
+        if code.co_name == ROOT_FUNCTION and code.co_filename.endswith(os.path.join('flask', 'app.py')):
+            codes = codes[index:]
+            break
+    return ';'.join(_frame_label(code) for code in codes)
+
+
+class _Watch:
+    """一个被观察的请求"""
+
+    __slots__ = ('thread_id', 'info', 'forced', 'started', 'stacks', 'samples')
+
+    def __init__(self, thread_id: int, info: Dict[str, Any], forced: bool):
+        self.thread_id = thread_id
+        self.info = info
+        self.forced = forced
+        self.started = time.perf_counter()
+        self.stacks: Counter = Counter()
+        self.samples = 0
+
+
+class ProfileStore:
+    """磁盘上的有界采样结果缓冲区"""
+
+    def __init__(self, directory: str, capacity: int = 50):
+        """
+        Args:
+            directory: 采样结果目录
+            capacity: 最多保留的采样结果数，超过时删除最旧的
+        """
+        self.directory = directory
+        self.capacity = capacity
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def _files(self) -> List[str]:
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        # 文件名以纳秒时间戳开头，按名称排序即按时间排序
+        return sorted(name for name in names if name.endswith('.json'))
+
+    def save(self, profile: Dict[str, Any]) -> str:
+        """保存一份采样结果，返回其标识"""
+        with self._lock:
+            self._sequence += 1
+            profile_id = f'{time.time_ns():020d}-{os.getpid()}-{self._sequence}'
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, profile_id + '.json')
+            temp_path = path + '.tmp'
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(dict(profile, id=profile_id), f, ensure_ascii=False)
+            os.replace(temp_path, path)
+
+            files = self._files()
+            for name in files[:max(0, len(files) - self.capacity)]:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass  # 其他进程已经删除
+            return profile_id
+
+    def list(self) -> List[Dict[str, Any]]:
+        """所有采样结果的摘要（不含调用栈），最新的在前"""
+        summaries = []
+        for name in reversed(self._files()):
+            profile = self.load(name[:-len('.json')])
+            if profile is not None:
+                profile.pop('stacks', None)
+                summaries.append(profile)
+        return summaries
+
+    def load(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        """读取一份采样结果，不存在时返回 None"""
+        if os.path.basename(profile_id) != profile_id:
+            return None
+        try:
+            with open(os.path.join(self.directory, profile_id + '.json'), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+
+class Profiler:
+    """按请求启用的采样分析器"""
+
+    def __init__(
+        self,
+        store: ProfileStore,
+        threshold: float = 0.0,
+        interval: float = 0.002,
+        token: Optional[str] = None
+    ):
+        """
+        Args:
+            store: 采样结果存储
+            threshold: 延迟阈值（秒），超过后自动采样；0 表示不按延迟触发
+            interval: 采样间隔（秒）
+            token: 请求头 X-Profile 和 X-Profile-Token 需要提供的令牌；
+                未设置时不接受请求头触发采样，也不提供采样结果接口
+        """
+        self.store = store
+        self.threshold = threshold
+        self.interval = interval
+        self.token = token
+        self._watches: Dict[int, _Watch] = {}
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def authorized(self, header_value: Optional[str]) -> bool:
+        """请求头中的令牌是否正确（未设置令牌时总是 False）"""
+        if not self.token or not header_value:
+            return False
+        return hmac.compare_digest(header_value.encode('utf-8'), self.token.encode('utf-8'))
+
+    def requested(self, header_value: Optional[str]) -> bool:
+        """请求头 X-Profile 是否要求采样"""
+        return self.authorized(header_value)
+
+    def begin(self, info: Dict[str, Any], forced: bool) -> None:
+        """开始观察当前线程上的请求
+
+        Args:
+            info: 请求信息（路由、方法、路径），随采样结果保存
+            forced: True 表示立即开始采样；False 表示超过延迟阈值后才采样
+        """
+        watch = _Watch(threading.get_ident(), info, forced)
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+                self._thread.start()
+            self._watches[watch.thread_id] = watch
+            self._cond.notify()
+
+    def finish(self, status: int) -> Optional[str]:
+        """结束观察当前线程上的请求
+
+        请求被采样过（请求头触发，或处理时间超过阈值）时保存采样结果。
+
+        Returns:
+            采样结果标识；请求未被采样时返回 None
+        """
+        with self._cond:
+            watch = self._watches.pop(threading.get_ident(), None)
+            if watch is None:
+                return None
+            stacks = dict(watch.stacks)
+            samples = watch.samples
+        duration = time.perf_counter() - watch.started
+        if not watch.forced and duration < self.threshold:
+            return None
+        return self.store.save(dict(
+            watch.info,
+            status=status,
+            trigger='header' if watch.forced else 'threshold',
+            duration_ms=round(duration * 1000, 3),
+            interval_ms=round(self.interval * 1000, 3),
+            samples=samples,
+            created_at=time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            stacks=stacks,
+        ))
+
+    def discard(self) -> None:
+        """丢弃当前线程上未结束的观察（请求异常中止时）"""
+        with self._cond:
+            self._watches.pop(threading.get_ident(), None)
+
+    def _run(self) -> None:
+        """采样线程：有需要采样的请求时按间隔采样，否则等待"""
+        while True:
+            with self._cond:
+                # 等到至少一个请求需要采样（请求头触发，或已超过延迟阈值）
+                while True:
+                    now = time.perf_counter()
+                    if not self._watches:
+                        self._cond.wait()
+                        continue
+                    due = min(watch.started + (0.0 if watch.forced else self.threshold)
+                              for watch in self._watches.values())
+                    if due <= now:
+                        break
+                    self._cond.wait(due - now)
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            now = time.perf_counter()
+            with self._cond:
+                for watch in self._watches.values():
+                    if not watch.forced and now - watch.started < self.threshold:
+                        continue
+                    frame = frames.get(watch.thread_id)
+                    if frame is not None:
+                        watch.stacks[collapse_stack(frame)] += 1
+                        watch.samples += 1
+            del frames
+
+
+def collapsed_text(profile: Dict[str, Any]) -> str:
+    """采样结果的折叠调用栈文本（每行 "调用栈 次数"）"""
+    stacks = sorted(profile.get('stacks', {}).items(), key=lambda item: -item[1])
+    return ''.join(f'{stack} {count}\n' for stack, count in stacks)
+
+
+def create_profiler_from_env(default_directory: str) -> Profiler:
+    """按环境变量创建分析器
+
+    环境变量：
+        PROFILE_DIR: 采样结果目录（默认 default_directory）
+        PROFILE_RING_SIZE: 最多保留的采样结果数（默认 50）
+        PROFILE_THRESHOLD_MS: 自动采样的延迟阈值（毫秒，默认 0 即关闭）
+        PROFILE_INTERVAL_MS: 采样间隔（毫秒，默认 2）
+        PROFILE_TOKEN: 触发采样和读取结果所需的令牌（默认不设置，即只能按延迟阈值采样）
+    """
+    env = os.environ
+    return Profiler(
+        ProfileStore(env.get('PROFILE_DIR', default_directory), int(env.get('PROFILE_RING_SIZE', 50))),
+        threshold=float(env.get('PROFILE_THRESHOLD_MS', 0)) / 1000,
+        interval=float(env.get('PROFILE_INTERVAL_MS', 2)) / 1000,
+        token=env.get('PROFILE_TOKEN') or None
+    )
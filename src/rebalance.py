@@ -0,0 +1,361 @@
+"""
+再平衡交易求解模块
+
+该模块根据 analyze_portfolio 的偏差，为组合计算一组一致的买卖划转，
+使投资大框架和基金组合内部两个层级同时回到容忍带内（容忍带为
+InvestmentConfig.rebalance_tolerance）。
+
+求解在两个层级上依次进行，每个层级都是闭式的"裁剪到容忍带 + 按缺口分配"：
+1. 把每个类别的金额裁剪到 [预期金额 - 容忍带, 预期金额 + 容忍带]，
+   只有超出容忍带的类别才会交易，交易量恰好是回到带边界所需的最小值
+2. 裁剪后的总额与层级基数的差额，按各类别距预期金额的缺口比例分配，
+   先分配给被裁剪的类别，不足部分再分配给其余类别；
+   缺口总和不小于差额，分配后不会越过预期金额，因此仍在带内
+大框架层级先求解，其结果中的"基金组合"金额作为基金组合内部层级的基数，
+两个层级因此自然一致。所有步骤都是对 (组合数, 类别数) 数组的整体运算，
+可以一次处理整个组合簿。
+
+最小交易金额：小于类别最小交易金额的交易会被取消，差额由同方向的其余交易
+按比例吸收；此时被取消交易的类别可能仍略微超出容忍带，结果中的
+within_band 会如实标明。
+
+命令行用法（NDJSON 输入，每行 {"id": ..., "holdings": {...}}）：
+    python -m src.rebalance book.ndjson -o trades.ndjson --min-trade 100
+"""
+
+import argparse
+import json
+import sys
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional
+
+import numpy as np
+
+from src.categories import CategoryRegistry
+from src.config import InvestmentConfig
+from src.serialization import dumps
+from src.validation import category_schemas
+
+# 容忍带边界向内收的金额：默认七个类别各自舍入到分的误差合计不超过 3.5 分，
+# 且全部计入同一笔交易
+BAND_MARGIN = 0.05
+
+
+def _columns(categories: CategoryRegistry):
+    """叶子类别（实际可交易的持仓）在持仓数组中的列，列顺序为 holding_keys
+
+    Returns:
+        (基金类别的列, 大框架中除基金组合外各类别的列)
+    """
+    keys = categories.holding_keys
+    return (
+        [keys.index(key) for key in categories.funds.keys],
+        [keys.index(key) for key in categories.leaf_keys]
+    )
+
+
+def _framework_matrix(amounts: np.ndarray, fund_total: np.ndarray, categories: CategoryRegistry) -> np.ndarray:
+    """大框架各类别的金额 (n, k)，基金组合类别为基金组合总额"""
+    _, leaf_columns = _columns(categories)
+    framework = np.insert(amounts[:, leaf_columns], categories.portfolio_index, fund_total, axis=1)
+    return framework.reshape(len(amounts), len(categories.framework))
+
+
+def clip_to_band(amounts: np.ndarray, base: np.ndarray, targets: np.ndarray, tolerance: float) -> np.ndarray:
+    """将一个层级的各类别金额调整到容忍带内，且总额等于 base
+
+    Args:
+        amounts: 当前金额 (n, k)
+        base: 调整后的层级总额 (n,)
+        targets: 预期占比 (k,)，总和为 1
+        tolerance: 容忍带（占比）
+
+    Returns:
+        调整后的金额 (n, k)
+    """
+    expected = base[:, None] * targets
+    # 只裁剪超出容忍带的类别；裁剪边界向内收 BAND_MARGIN，交易金额四舍五入到分后仍在带内
+    outside = np.abs(amounts - expected) > tolerance * base[:, None]
+    half_width = np.maximum(tolerance * base[:, None] - BAND_MARGIN, 0.0)
+    clipped = np.where(
+        outside,
+        np.clip(amounts, np.maximum(expected - half_width, 0.0), expected + half_width),
+        amounts
+    )
+
+    # 裁剪后的总额与 base 的差额按各类别距预期金额的缺口比例分配：先分配给被裁剪到带边界的类别，
+    # 它们的缺口不足以吸收差额时，剩余部分再分配给其余类别（缺口总和不小于差额，分配后仍在带内）
+    residual = base - clipped.sum(axis=1)
+    below = np.maximum(expected - clipped, 0.0)
+    above = np.maximum(clipped - expected, 0.0)
+    gap = np.where((residual > 0)[:, None], below, above)
+    adjusted = clipped
+    for group in (outside, ~outside):
+        group_gap = np.where(group, gap, 0.0)
+        group_total = group_gap.sum(axis=1)
+        taken = np.sign(residual) * np.minimum(np.abs(residual), group_total)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            share = np.where(group_total[:, None] > 0, group_gap / group_total[:, None], 0.0)
+        adjusted = adjusted + share * taken[:, None]
+        residual = residual - taken
+    return adjusted
+
+
+def _absorb_small_trades(deltas: np.ndarray, min_trade: np.ndarray) -> np.ndarray:
+    """取消小于最小交易金额的交易，差额由同方向的其余交易按比例吸收
+
+    重复直到没有小于最小交易金额的交易（每轮至少取消一笔，最多执行类别数轮）。
+    """
+    small = (deltas != 0) & (np.abs(deltas) < min_trade)
+    while small.any():
+        deltas = np.where(small, 0.0, deltas)
+        # 取消交易后买卖不再相等：residual > 0 表示买入多于卖出，由其余卖出交易补足
+        residual = deltas.sum(axis=1)
+        side = np.where((residual > 0)[:, None], np.minimum(deltas, 0.0), np.maximum(deltas, 0.0))
+        side_total = side.sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            share = np.where(side_total[:, None] != 0, side / side_total[:, None], 0.0)
+        adjusted = deltas - share * residual[:, None]
+        # 同方向的交易全部被取消的组合不做交易
+        deltas = np.where((side_total == 0)[:, None], 0.0, adjusted)
+        small = (deltas != 0) & (np.abs(deltas) < min_trade)
+    return deltas
+
+
+def _round_deltas(deltas: np.ndarray) -> np.ndarray:
+    """交易金额保留两位小数，舍入误差计入每行绝对值最大的交易，保证买卖相等"""
+    rounded = np.round(deltas, 2)
+    error = np.round(rounded.sum(axis=1), 2)
+    rows = np.flatnonzero(error != 0)
+    if rows.size:
+        columns = np.abs(rounded[rows]).argmax(axis=1)
+        rounded[rows, columns] = np.round(rounded[rows, columns] - error[rows], 2)
+    return rounded
+
+
+def solve_rebalance(
+    amounts: np.ndarray,
+    config: InvestmentConfig,
+    min_trade: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """批量求解再平衡交易
+
+    Args:
+        amounts: 各组合的持仓金额 (n, 持仓类别数)，列顺序为类别注册表的 holding_keys
+        config: 投资配置（类别、预期比例和容忍带）
+        min_trade: 各类别的最小交易金额 (持仓类别数,)，可选
+
+    Returns:
+        各类别的交易金额，形状与 amounts 相同，正数为买入、负数为卖出，每行总和为 0
+    """
+    categories = config.categories
+    fund_columns, leaf_columns = _columns(categories)
+    portfolio = categories.portfolio_index
+    amounts = np.asarray(amounts, dtype=np.float64)
+    tolerance = config.rebalance_tolerance
+    funds = amounts[:, fund_columns]
+    total = amounts.sum(axis=1)
+
+    # 1. 大框架层级：基金组合 + 非基金类别，基数为总持仓金额
+    framework = _framework_matrix(amounts, funds.sum(axis=1), categories)
+    framework_after = clip_to_band(framework, total, categories.framework.ratios, tolerance)
+
+    # 2. 基金组合内部层级：基数为第 1 步得到的基金组合金额
+    funds_after = clip_to_band(funds, framework_after[:, portfolio], categories.funds.ratios, tolerance)
+
+    # 3. 汇总为叶子类别的交易
+    after = np.empty_like(amounts)
+    after[:, fund_columns] = funds_after
+    after[:, leaf_columns] = np.delete(framework_after, portfolio, axis=1)
+    deltas = after - amounts
+    if min_trade is not None:
+        deltas = _absorb_small_trades(deltas, np.asarray(min_trade, dtype=np.float64))
+    return _round_deltas(deltas)
+
+
+def within_band(amounts: np.ndarray, config: InvestmentConfig) -> np.ndarray:
+    """判断各组合的两个层级是否都在容忍带内（与 analyze_portfolio 的判断一致）"""
+    categories = config.categories
+    fund_columns, _ = _columns(categories)
+    amounts = np.asarray(amounts, dtype=np.float64)
+    tolerance = config.rebalance_tolerance
+    funds = amounts[:, fund_columns]
+    fund_total = funds.sum(axis=1)
+    total = amounts.sum(axis=1)
+    framework = _framework_matrix(amounts, fund_total, categories)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        framework_ok = (np.abs(framework / total[:, None] - categories.framework.ratios) <= tolerance).all(axis=1)
+        fund_ok = (np.abs(funds / fund_total[:, None] - categories.funds.ratios) <= tolerance).all(axis=1)
+    # 总额为 0 的组合无需调整；基金组合为 0 时不分析基金组合内部
+    return np.where(total > 0, framework_ok & np.where(fund_total > 0, fund_ok, True), True)
+
+
+def transfers_from_deltas(deltas: Mapping[str, float], names: Mapping[str, str]) -> List[Dict[str, object]]:
+    """将交易金额配对为划转：每次从剩余卖出最多的类别划转到剩余买入最多的类别
+
+    划转笔数不超过 卖出类别数 + 买入类别数 - 1。
+
+    Args:
+        deltas: {类别键: 交易金额}
+        names: {类别键: 名称}（类别注册表的 names）
+    """
+    sells = sorted(((-v, k) for k, v in deltas.items() if v < 0), reverse=True)
+    buys = sorted(((v, k) for k, v in deltas.items() if v > 0), reverse=True)
+    sells = [[amount, key] for amount, key in sells]
+    buys = [[amount, key] for amount, key in buys]
+    transfers = []
+    i = j = 0
+    while i < len(sells) and j < len(buys):
+        amount = round(min(sells[i][0], buys[j][0]), 2)
+        if amount > 0:
+            transfers.append({
+                'from': sells[i][1],
+                'from_name': names[sells[i][1]],
+                'to': buys[j][1],
+                'to_name': names[buys[j][1]],
+                'amount': amount
+            })
+        sells[i][0] = round(sells[i][0] - amount, 2)
+        buys[j][0] = round(buys[j][0] - amount, 2)
+        if sells[i][0] <= 0:
+            i += 1
+        if buys[j][0] <= 0:
+            j += 1
+    return transfers
+
+
+def min_trade_array(
+    min_trade: Optional[Mapping[str, float]],
+    categories: CategoryRegistry
+) -> Optional[np.ndarray]:
+    """{类别: 最小交易金额} 转换为按 holding_keys 排列的数组"""
+    if not min_trade:
+        return None
+    return np.array([float(min_trade.get(key, 0.0)) for key in categories.holding_keys])
+
+
+def rebalance_many(
+    holdings_list: List[Mapping[str, float]],
+    config: InvestmentConfig,
+    min_trade: Optional[Mapping[str, float]] = None
+) -> List[Dict[str, object]]:
+    """批量计算再平衡方案
+
+    Args:
+        holdings_list: 持仓金额字典列表（键同 analyze_portfolio）
+        config: 投资配置
+        min_trade: 各类别的最小交易金额，可选
+
+    Returns:
+        每个组合一个结果：trades（各类别交易金额）、transfers（划转列表）、
+        turnover（卖出总额）、holdings_after（交易后持仓）、within_band（交易后是否在带内）
+    """
+    categories = config.categories
+    keys = categories.holding_keys
+    amounts = categories.holding_matrix(holdings_list)
+    deltas = solve_rebalance(amounts, config, min_trade_array(min_trade, categories))
+    after = amounts + deltas
+    in_band = within_band(after, config)
+
+    results = []
+    for row, delta_row, ok in zip(after.tolist(), deltas.tolist(), in_band.tolist()):
+        trades = {key: value for key, value in zip(keys, delta_row) if value != 0}
+        results.append({
+            'trades': trades,
+            'transfers': transfers_from_deltas(trades, categories.names),
+            'turnover': round(sum((-v for v in trades.values() if v < 0), 0.0), 2),
+            'holdings_after': {key: round(value, 2) for key, value in zip(keys, row)},
+            'within_band': ok
+        })
+    return results
+
+
+def rebalance(
+    holdings: Mapping[str, float],
+    config: InvestmentConfig,
+    min_trade: Optional[Mapping[str, float]] = None
+) -> Dict[str, object]:
+    """计算单个组合的再平衡方案，见 rebalance_many"""
+    return rebalance_many([holdings], config, min_trade)[0]
+
+
+def rebalance_stream(
+    lines: Iterable[str],
+    config: InvestmentConfig,
+    min_trade: Optional[Mapping[str, float]] = None,
+    chunk_size: int = 10000
+) -> Iterator[bytes]:
+    """逐块处理 NDJSON 组合簿，每块一次向量化求解
+
+    输出行格式与流式持仓分析相同：{"line", "id", "success", "data" | "error"}。
+    """
+    def flush(batch):
+        valid = [item for item in batch if 'holdings' in item]
+        solved = iter(rebalance_many([item['holdings'] for item in valid], config, min_trade))
+        for item in batch:
+            output = item['output']
+            if 'holdings' in item:
+                output.update({'success': True, 'data': next(solved)})
+            yield dumps(output) + b'\n'
+
+    holdings_schema = category_schemas(config.categories).holdings
+    batch = []
+    for line_number, line in enumerate(lines, start=1):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        line = line.strip()
+        if not line:
+            continue
+        output = {'line': line_number}
+        item = {'output': output}
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+            output.update({'success': False, 'error': '无效的 JSON 行'})
+        if isinstance(record, dict) and 'id' in record:
+            output['id'] = record['id']
+        if record is not None:
+            if not isinstance(record, dict) or 'holdings' not in record:
+                output.update({'success': False, 'error': '缺少必填字段: holdings'})
+            else:
+                holdings, errors = holdings_schema.validate(record['holdings'], prefix='holdings.')
+                if errors:
+                    output.update({
+                        'success': False,
+                        'error': '；'.join(e['message'] for e in errors),
+                        'errors': errors
+                    })
+                else:
+                    item['holdings'] = holdings
+        batch.append(item)
+        if len(batch) >= chunk_size:
+            yield from flush(batch)
+            batch = []
+    if batch:
+        yield from flush(batch)
+
+
+def main(argv=None) -> int:
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description='组合簿批量再平衡')
+    parser.add_argument('input', help='输入的 NDJSON 组合簿')
+    parser.add_argument('-o', '--output', help='输出文件路径（默认输出到标准输出）')
+    parser.add_argument('--min-trade', type=float, default=0.0, help='所有类别统一的最小交易金额')
+    parser.add_argument('--chunk-size', type=int, default=10000, help='每次向量化求解的组合数')
+    args = parser.parse_args(argv)
+
+    config = InvestmentConfig()
+    min_trade = {key: args.min_trade for key in config.categories.holding_keys} if args.min_trade > 0 else None
+    with open(args.input, 'r', encoding='utf-8') as f:
+        output = open(args.output, 'wb') if args.output else sys.stdout.buffer
+        try:
+            for result_line in rebalance_stream(f, config, min_trade, args.chunk_size):
+                output.write(result_line)
+        finally:
+            if args.output:
+                output.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
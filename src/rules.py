@@ -0,0 +1,91 @@
+"""
+加仓与止盈规则表模块
+
+该模块把 InvestmentConfig 中的加仓规则和止盈规则预编译为不可变的规则表，
+在计算器构建时生成一次，之后每次查询都使用二分查找，
+避免在每个持仓上重复排序阈值。
+"""
+
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import FrozenSet, Optional, Tuple
+
+import numpy as np
+
+from src.config import InvestmentConfig
+
+
+@dataclass(frozen=True)
+class RuleTable:
+    """预编译的加仓/止盈规则表
+
+    加仓阈值按从小到大（跌幅从大到小）排序保存，与原逻辑一致：
+    收益率命中多个阈值时，只应用跌幅最严重的那一档。
+    """
+
+    # 加仓阈值（升序）及对应的加仓比例
+    thresholds: Tuple[float, ...]
+    add_ratios: Tuple[float, ...]
+
+    # 止盈阈值和止盈比例
+    take_profit_threshold: float
+    take_profit_ratio: float
+
+    # 参与规则的基金名称（来自类别注册表，默认中短债基金不参与）
+    applicable_funds: FrozenSet[str]
+
+    @classmethod
+    def from_config(cls, config: InvestmentConfig) -> "RuleTable":
+        """根据配置编译规则表
+
+        Args:
+            config: 投资配置对象
+
+        Returns:
+            不可变的规则表
+        """
+        thresholds = tuple(sorted(config.add_position_rules.keys()))
+        return cls(
+            thresholds=thresholds,
+            add_ratios=tuple(config.add_position_rules[t] for t in thresholds),
+            take_profit_threshold=config.take_profit_threshold,
+            take_profit_ratio=config.take_profit_ratio,
+            applicable_funds=config.categories.applicable_funds,
+        )
+
+    def match_add_position(self, return_rate: float) -> Optional[int]:
+        """查找收益率命中的加仓规则
+
+        命中条件为 return_rate <= threshold，返回满足条件的最小阈值的下标。
+
+        Args:
+            return_rate: 收益率（小数形式）
+
+        Returns:
+            命中规则在 thresholds 中的下标，未命中返回 None
+        """
+        index = bisect_left(self.thresholds, return_rate)
+        if index < len(self.thresholds):
+            return index
+        return None
+
+    def is_take_profit(self, return_rate: float) -> bool:
+        """判断收益率是否达到止盈阈值"""
+        return return_rate >= self.take_profit_threshold
+
+    def classify(self, return_rates) -> Tuple[np.ndarray, np.ndarray]:
+        """批量分类收益率
+
+        Args:
+            return_rates: 收益率数组（小数形式）
+
+        Returns:
+            (add_index, take_profit)：
+            - add_index: 每个收益率命中的加仓规则下标，未命中为 -1
+            - take_profit: 每个收益率是否达到止盈阈值的布尔数组
+        """
+        rates = np.asarray(return_rates, dtype=np.float64)
+        add_index = np.searchsorted(np.asarray(self.thresholds, dtype=np.float64), rates, side='left')
+        add_index = np.where(add_index < len(self.thresholds), add_index, -1)
+        take_profit = rates >= self.take_profit_threshold
+        return add_index, take_profit
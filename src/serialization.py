@@ -0,0 +1,159 @@
+"""
+API 响应序列化模块
+
+该模块提供 API 响应的 JSON 序列化：安装了 orjson 时使用 orjson，
+否则回退到标准库 json。每个请求可以通过查询参数选择：
+
+- encoder=orjson|json：序列化器（默认 auto，即有 orjson 时使用 orjson）
+- compact=1：紧凑模式，去掉持仓分析中由偏差派生的展示字段
+  （status、action、need_adjustment），客户端可根据 deviation 和
+  adjust_amount 自行推导
+
+GET /api/config 的响应体按配置版本预先序列化（ConfigResponseCache），
+并带有 ETag / Last-Modified，配置未变化时返回 304。
+"""
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from typing import Any, Dict
+
+from flask import Response, request
+
+from src.config import InvestmentConfig
+from src.config_store import ConfigSnapshot
+from src.metrics import metrics
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 取决于运行环境
+    orjson = None
+
+# 服务端默认序列化器：auto / orjson / json
+DEFAULT_ENCODER = os.environ.get('JSON_ENCODER', 'auto').lower()
+
+# 紧凑模式下从分析结果中去掉的冗余展示字段
+DERIVED_FIELDS = ('status', 'action', 'need_adjustment')
+
+
+def dumps(obj: Any, encoder: str = 'auto') -> bytes:
+    """序列化为 UTF-8 编码的 JSON
+
+    Args:
+        obj: 待序列化的对象
+        encoder: auto / orjson / json；orjson 不可用时一律使用标准库
+
+    Returns:
+        JSON 字节串
+    """
+    if orjson is not None and encoder != 'json':
+        # 加仓规则等字典使用浮点数作为键，需要 OPT_NON_STR_KEYS
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def resolve_encoder(encoder: str) -> str:
+    """实际使用的序列化器：orjson 或 json"""
+    return 'orjson' if orjson is not None and encoder != 'json' else 'json'
+
+
+def requested_encoder() -> str:
+    """当前请求选择的序列化器"""
+    return request.args.get('encoder', DEFAULT_ENCODER).lower()
+
+
+def compact_requested() -> bool:
+    """当前请求是否选择了紧凑模式"""
+    return request.args.get('compact', '').lower() in ('1', 'true', 'yes')
+
+
+def json_response(payload: Any, status: int = 200) -> Response:
+    """按当前请求选择的序列化器生成 JSON 响应
+
+    可以替代 jsonify 使用，同样支持 `return json_response({...}), 400`。
+    """
+    with metrics.stage('serialize'):
+        body = dumps(payload, requested_encoder())
+    return Response(body, status=status, mimetype='application/json')
+
+
+def compact_analysis(result: Dict) -> Dict:
+    """生成持仓分析结果的紧凑版本
+
+    返回新的字典，不修改原结果（原结果可能来自结果缓存）。
+    """
+    compact = dict(result)
+    for section in ('framework_analysis', 'fund_portfolio_analysis'):
+        if section in result:
+            compact[section] = {
+                key: {k: v for k, v in entry.items() if k not in DERIVED_FIELDS}
+                for key, entry in result[section].items()
+            }
+    return compact
+
+
+def config_payload(config: InvestmentConfig) -> Dict[str, Any]:
+    """GET /api/config 响应中的配置数据
+
+    framework / fund_portfolio 为 {类别键: 比例}；categories 给出两个层级的
+    完整类别定义（名称、比例、定投日、是否适用加仓/止盈规则），顺序与分配结果一致。
+    """
+    categories = config.categories
+    return {
+        'framework': {c.key: c.ratio for c in categories.framework},
+        'fund_portfolio': {c.key: c.ratio for c in categories.funds},
+        'categories': {
+            'framework': [c.to_dict() for c in categories.framework],
+            'fund_portfolio': [c.to_dict() for c in categories.funds]
+        },
+        'add_position_rules': dict(config.add_position_rules),
+        'take_profit': {
+            'threshold': config.take_profit_threshold,
+            'ratio': config.take_profit_ratio
+        },
+        'rebalance_tolerance': config.rebalance_tolerance
+    }
+
+
+@dataclass(frozen=True)
+class ConfigBody:
+    """预先序列化的 GET /api/config 响应"""
+
+    body: bytes
+    etag: str  # 不含引号
+    last_modified: float
+
+
+class ConfigResponseCache:
+    """GET /api/config 响应体缓存，每个配置版本、每种序列化器只序列化一次
+
+    ETag 由配置版本号、序列化器和响应体摘要组成，多个工作进程对同一版本给出
+    相同的 ETag；Last-Modified 为后端随版本保存的发布时间，各进程同样一致。
+    配置快照发布新版本后，下一次请求重新序列化，旧版本的响应体随之丢弃。
+    """
+
+    def __init__(self):
+        # (配置版本号, {序列化器: ConfigBody})，整体替换，读取方无需加锁
+        self._entry = (None, {})
+
+    def get(self, snapshot: ConfigSnapshot, encoder: str = 'auto') -> ConfigBody:
+        """取得快照对应的响应，首次请求该版本时序列化
+
+        Args:
+            snapshot: 当前配置快照
+            encoder: auto / orjson / json
+        """
+        encoder = resolve_encoder(encoder)
+        version, bodies = self._entry
+        if version != snapshot.version:
+            bodies = {}
+            self._entry = (snapshot.version, bodies)
+        cached = bodies.get(encoder)
+        if cached is None:
+            with metrics.stage('serialize'):
+                body = dumps({'success': True, 'data': config_payload(snapshot.config)}, encoder)
+            digest = hashlib.sha1(body).hexdigest()[:12]
+            cached = ConfigBody(body, f'config-{snapshot.version}-{encoder}-{digest}', snapshot.published_at)
+            bodies[encoder] = cached
+        return cached
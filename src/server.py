@@ -0,0 +1,194 @@
+"""
+生产环境启动模块
+
+该模块使用 gunicorn 以多进程、多线程方式运行 Flask 应用，取代 Flask
+自带的单进程调试服务器。所有参数都可以通过命令行或环境变量设置。
+
+平滑重载：向主进程发送 SIGHUP（kill -HUP <pid>，设置 WEB_PIDFILE 后
+可用 kill -HUP $(cat $WEB_PIDFILE)），gunicorn 会启动新的
+工作进程并在旧进程处理完在途请求后将其退出。配置保存在共享配置后端中，
+新工作进程启动时直接加载最新版本，重载前后的配置保持一致。
+
+用法：
+    python run.py                       # 生产模式（默认）
+    python run.py --workers 8 --threads 4
+    python run.py --dev                 # 本地调试服务器
+"""
+
+import argparse
+import glob
+import logging
+import multiprocessing
+import os
+from dataclasses import dataclass
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@dataclass
+class ServerOptions:
+    """服务器运行参数"""
+
+    host: str = '0.0.0.0'
+    port: int = 5000
+    workers: int = 0            # 工作进程数，0 表示按 CPU 核数自动计算
+    threads: int = 4            # 每个工作进程的线程数
+    keepalive: int = 5          # Keep-Alive 连接保持时间（秒）
+    backlog: int = 2048         # 监听队列长度
+    timeout: int = 30           # 工作进程无响应超时（秒）
+    graceful_timeout: int = 30  # 平滑重载/退出时等待在途请求的时间（秒）
+    max_requests: int = 0       # 工作进程处理多少请求后自动重启，0 表示不重启
+    max_requests_jitter: int = 0
+
+    def resolved_workers(self) -> int:
+        """返回实际的工作进程数"""
+        if self.workers > 0:
+            return self.workers
+        return multiprocessing.cpu_count() * 2 + 1
+
+
+def parse_options(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """解析命令行参数，未指定的参数取环境变量或默认值"""
+    defaults = ServerOptions()
+    env = os.environ
+
+    parser = argparse.ArgumentParser(description='闲钱永不眠管理计算器服务')
+    parser.add_argument('--dev', action='store_true', help='使用 Flask 调试服务器（仅限本地开发）')
+    parser.add_argument('--host', default=env.get('HOST', defaults.host))
+    parser.add_argument('--port', type=int, default=int(env.get('PORT', defaults.port)))
+    parser.add_argument('--workers', type=int, default=int(env.get('WEB_WORKERS', defaults.workers)),
+                        help='工作进程数，0 表示 CPU 核数 × 2 + 1')
+    parser.add_argument('--threads', type=int, default=int(env.get('WEB_THREADS', defaults.threads)),
+                        help='每个工作进程的线程数')
+    parser.add_argument('--keepalive', type=int, default=int(env.get('WEB_KEEPALIVE', defaults.keepalive)),
+                        help='Keep-Alive 连接保持时间（秒）')
+    parser.add_argument('--backlog', type=int, default=int(env.get('WEB_BACKLOG', defaults.backlog)))
+    parser.add_argument('--timeout', type=int, default=int(env.get('WEB_TIMEOUT', defaults.timeout)))
+    parser.add_argument('--graceful-timeout', type=int,
+                        default=int(env.get('WEB_GRACEFUL_TIMEOUT', defaults.graceful_timeout)))
+    parser.add_argument('--max-requests', type=int,
+                        default=int(env.get('WEB_MAX_REQUESTS', defaults.max_requests)))
+    parser.add_argument('--max-requests-jitter', type=int,
+                        default=int(env.get('WEB_MAX_REQUESTS_JITTER', defaults.max_requests_jitter)))
+    return parser.parse_args(argv)
+
+
+def options_from_args(args: argparse.Namespace) -> ServerOptions:
+    """将命令行参数转换为 ServerOptions"""
+    return ServerOptions(
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        threads=args.threads,
+        keepalive=args.keepalive,
+        backlog=args.backlog,
+        timeout=args.timeout,
+        graceful_timeout=args.graceful_timeout,
+        max_requests=args.max_requests,
+        max_requests_jitter=args.max_requests_jitter
+    )
+
+
+def gunicorn_settings(options: ServerOptions) -> dict:
+    """生成 gunicorn 配置项"""
+    return {
+        'bind': f'{options.host}:{options.port}',
+        'workers': options.resolved_workers(),
+        'threads': options.threads,
+        # 多线程时使用 gthread 工作模式，Keep-Alive 连接不会独占工作进程
+        'worker_class': 'gthread' if options.threads > 1 else 'sync',
+        'keepalive': options.keepalive,
+        'backlog': options.backlog,
+        'timeout': options.timeout,
+        'graceful_timeout': options.graceful_timeout,
+        'max_requests': options.max_requests,
+        'max_requests_jitter': options.max_requests_jitter,
+        # 不预加载应用：SIGHUP 重载时每个新工作进程重新导入代码并从配置后端加载最新配置
+        'preload_app': False,
+        'pidfile': os.environ.get('WEB_PIDFILE'),
+        'accesslog': os.environ.get('WEB_ACCESS_LOG'),
+        'errorlog': '-',
+    }
+
+
+def prepare_metrics_dir(options: ServerOptions) -> None:
+    """准备多进程共享的指标目录
+
+    多进程且未设置 METRICS_SHARED_DIR 时使用 data/metrics（工作进程继承环境变量），
+    并清空上次运行留下的各进程指标文件。
+    """
+    shared_dir = os.environ.get('METRICS_SHARED_DIR')
+    if not shared_dir:
+        if options.resolved_workers() <= 1:
+            return
+        shared_dir = os.environ['METRICS_SHARED_DIR'] = os.path.join(BASE_DIR, 'data', 'metrics')
+    os.makedirs(shared_dir, exist_ok=True)
+    for path in glob.glob(os.path.join(shared_dir, 'metrics-*.json*')):
+        os.remove(path)
+
+
+def run_production(options: ServerOptions) -> None:
+    """使用 gunicorn 运行应用
+
+    Raises:
+        RuntimeError: 未安装 gunicorn（例如在 Windows 上）
+    """
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError as e:
+        raise RuntimeError('生产模式需要安装 gunicorn：pip install gunicorn') from e
+
+    if options.resolved_workers() > 1 and os.environ.get('CONFIG_BACKEND', 'sqlite') == 'memory':
+        logger.warning('CONFIG_BACKEND=memory 时配置更新只对接收请求的工作进程生效')
+    prepare_metrics_dir(options)
+
+    class StandaloneApplication(BaseApplication):
+        """以编程方式配置的 gunicorn 应用"""
+
+        def __init__(self, settings: dict):
+            self.settings = settings
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.settings.items():
+                if value is not None and key in self.cfg.settings:
+                    self.cfg.set(key, value)
+
+        def load(self):
+            from src.app import app
+            return app
+
+    StandaloneApplication(gunicorn_settings(options)).run()
+
+
+def run_development(options: ServerOptions) -> None:
+    """使用 Flask 调试服务器运行应用（单进程，仅限本地开发）"""
+    from src.app import app
+    app.run(debug=True, host=options.host, port=options.port)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """命令行入口"""
+    args = parse_options(argv)
+    options = options_from_args(args)
+
+    print("=" * 60)
+    print("闲钱永不眠管理计算器正在启动...")
+    print("=" * 60)
+    print(f"\n访问地址: http://localhost:{options.port}")
+    print(f"API 文档: http://localhost:{options.port}/api/config")
+    if args.dev:
+        print("\n运行模式: 开发（Flask 调试服务器）")
+    else:
+        print(f"\n运行模式: 生产（gunicorn，{options.resolved_workers()} 个进程 × {options.threads} 个线程）")
+        print("平滑重载: kill -HUP <主进程 PID>")
+    print("\n按 Ctrl+C 停止服务器\n")
+    print("=" * 60)
+
+    if args.dev:
+        run_development(options)
+    else:
+        run_production(options)
@@ -0,0 +1,126 @@
+"""
+静态资源模块
+
+该模块为前端静态资源提供带内容哈希的 URL：index.html 中引用的
+/static/css/style.css、/static/js/app.js 改写为 /assets/css/style.<哈希>.css
+这样的地址。文件内容不变时 URL 不变，浏览器和 CDN 可以长期缓存
+（Cache-Control: immutable）；内容变化后 URL 随之变化，不会读到旧文件。
+
+index.html 本身不能长期缓存，响应带有基于内容的 ETag，由客户端每次协商。
+文件的哈希按修改时间和大小缓存，只在文件变化后重新计算。
+"""
+
+import hashlib
+import os
+import re
+from typing import Dict, Optional, Tuple
+
+# 带哈希的资源地址前缀
+ASSET_PREFIX = '/assets/'
+
+# 带哈希资源的缓存时间（一年）
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+# index.html 中需要改写的静态资源引用
+_STATIC_REF = re.compile(r'(href|src)="/static/([^"?#]+)"')
+
+
+def _hashed_name(path: str, digest: str) -> str:
+    """css/style.css -> css/style.<digest>.css"""
+    root, ext = os.path.splitext(path)
+    return f'{root}.{digest}{ext}'
+
+
+class StaticAssets:
+    """静态资源的内容哈希表和改写后的 index.html"""
+
+    def __init__(self, static_dir: str, index: str = 'index.html', digest_size: int = 12):
+        """
+        Args:
+            static_dir: 静态文件目录
+            index: 入口页面（相对 static_dir）
+            digest_size: URL 中内容哈希的长度（十六进制字符数）
+        """
+        self.static_dir = static_dir
+        self.index = index
+        self.digest_size = digest_size
+        # 相对路径 -> ((mtime_ns, size), 内容哈希)
+        self._digests: Dict[str, Tuple[Tuple[int, int], str]] = {}
+        # ((index.html 的 (mtime_ns, size), ((资源路径, 哈希), ...)), 改写后的页面, ETag)
+        self._page: Optional[Tuple[Tuple, bytes, str]] = None
+
+    def _digest(self, path: str) -> Optional[str]:
+        """文件内容哈希，文件不存在时返回 None（按修改时间和大小缓存）"""
+        normalized = os.path.normpath(path)
+        if os.path.isabs(normalized) or normalized.split(os.sep)[0] == os.pardir:
+            return None
+        try:
+            stat = os.stat(os.path.join(self.static_dir, path))
+        except OSError:
+            return None
+        key = (stat.st_mtime_ns, stat.st_size)
+        cached = self._digests.get(path)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        with open(os.path.join(self.static_dir, path), 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()[:self.digest_size]
+        self._digests[path] = (key, digest)
+        return digest
+
+    def url(self, path: str) -> str:
+        """静态资源的带哈希地址，文件不存在时返回原始的 /static/ 地址
+
+        Args:
+            path: 相对 static_dir 的路径，如 css/style.css
+        """
+        digest = self._digest(path)
+        if digest is None:
+            return '/static/' + path
+        return ASSET_PREFIX + _hashed_name(path, digest)
+
+    def resolve(self, hashed_path: str) -> Optional[str]:
+        """带哈希的相对路径 -> 文件的相对路径
+
+        哈希与文件当前内容不一致（旧版本的地址）或文件不存在时返回 None。
+        """
+        root, ext = os.path.splitext(hashed_path)
+        path, _, digest = root.rpartition('.')
+        if not path or not digest:
+            return None
+        path += ext
+        if self._digest(path) != digest:
+            return None
+        return path
+
+    def index_page(self) -> Tuple[bytes, str]:
+        """改写资源引用后的 index.html 及其 ETag（不含引号）
+
+        Raises:
+            FileNotFoundError: 入口页面不存在
+        """
+        index_path = os.path.join(self.static_dir, self.index)
+        stat = os.stat(index_path)
+        page = self._page
+        if page is not None:
+            index_key, refs = page[0]
+            if index_key == (stat.st_mtime_ns, stat.st_size) and all(
+                self._digest(path) == digest for path, digest in refs
+            ):
+                return page[1], page[2]
+
+        with open(index_path, 'r', encoding='utf-8') as f:
+            html = f.read()
+        refs = []
+
+        def rewrite(match: 're.Match') -> str:
+            path = match.group(2)
+            digest = self._digest(path)
+            if digest is None:
+                return match.group(0)
+            refs.append((path, digest))
+            return f'{match.group(1)}="{ASSET_PREFIX}{_hashed_name(path, digest)}"'
+
+        body = _STATIC_REF.sub(rewrite, html).encode('utf-8')
+        etag = 'index-' + hashlib.sha256(body).hexdigest()[:self.digest_size]
+        self._page = (((stat.st_mtime_ns, stat.st_size), tuple(refs)), body, etag)
+        return body, etag
@@ -0,0 +1,369 @@
+"""
+持仓快照存储模块
+
+该模块把组合的持仓快照和分析结果保存到本地 SQLite 数据库（WAL 模式），
+并提供按组合、按时间区间查询偏差历史的接口。
+
+表结构：
+- portfolio_snapshots：每个快照一行（持仓金额 JSON、总金额、配置版本）
+- portfolio_deviations：每个快照每个类别一行（预期占比、实际占比、偏差、调整金额）
+
+两张表都是以 (portfolio_id, recorded_at, ...) 为主键的 WITHOUT ROWID 表，
+同一组合的记录按时间在 B 树中连续存放，区间查询只做一次范围扫描。
+
+写入通过 SnapshotRecorder 异步进行：请求路径上只把快照放入有界队列，
+后台线程按批次在单个事务中写入；队列满时丢弃快照并计数，不阻塞请求。
+"""
+
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 分析结果中的层级：(结果中的键, 存储的层级名)
+ANALYSIS_LEVELS = (
+    ('framework_analysis', 'framework'),
+    ('fund_portfolio_analysis', 'fund_portfolio'),
+)
+
+# 队列中的一条快照：(portfolio_id, recorded_at, config_version, holdings, analysis)
+SnapshotRecord = Tuple[str, float, int, Mapping[str, float], Mapping[str, Any]]
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS portfolio_snapshots ('
+    ' portfolio_id TEXT NOT NULL,'
+    ' recorded_at REAL NOT NULL,'
+    ' config_version INTEGER NOT NULL,'
+    ' total_amount REAL NOT NULL,'
+    ' holdings TEXT NOT NULL,'
+    ' PRIMARY KEY (portfolio_id, recorded_at)'
+    ') WITHOUT ROWID',
+    'CREATE TABLE IF NOT EXISTS portfolio_deviations ('
+    ' portfolio_id TEXT NOT NULL,'
+    ' recorded_at REAL NOT NULL,'
+    ' level TEXT NOT NULL,'
+    ' category TEXT NOT NULL,'
+    ' name TEXT NOT NULL,'
+    ' expected_ratio REAL NOT NULL,'
+    ' actual_ratio REAL NOT NULL,'
+    ' deviation REAL NOT NULL,'
+    ' actual_amount REAL NOT NULL,'
+    ' adjust_amount REAL NOT NULL,'
+    ' PRIMARY KEY (portfolio_id, recorded_at, level, category)'
+    ') WITHOUT ROWID',
+    # 跨组合按时间清理旧数据时使用
+    'CREATE INDEX IF NOT EXISTS idx_portfolio_snapshots_recorded_at'
+    ' ON portfolio_snapshots (recorded_at)',
+)
+
+
+class SnapshotStore:
+    """SQLite 持仓快照存储
+
+    每个线程使用自己的连接；写入由 SnapshotRecorder 的后台线程串行执行。
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: SQLite 数据库文件路径，所在目录不存在时自动创建
+        """
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._local = threading.local()
+        # 建表使用临时连接：线程局部连接不能跨 fork 继承给工作进程
+        conn = sqlite3.connect(path, timeout=5.0, isolation_level=None)
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            for statement in SCHEMA:
+                conn.execute(statement)
+        finally:
+            conn.close()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA busy_timeout=5000')
+            # WAL 模式下 NORMAL 只在检查点时同步，崩溃时最多丢失最近的若干事务
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def write_batch(self, records: Iterable[SnapshotRecord]) -> int:
+        """在一个事务中写入一批快照
+
+        同一组合、同一时间戳的快照以后写入的为准。
+
+        Returns:
+            写入的快照数
+        """
+        snapshot_rows = []
+        deviation_rows = []
+        for portfolio_id, recorded_at, config_version, holdings, analysis in records:
+            snapshot_rows.append((
+                portfolio_id, recorded_at, config_version,
+                float(analysis.get('total_amount', 0.0)),
+                json.dumps(dict(holdings), separators=(',', ':'))
+            ))
+            for section, level in ANALYSIS_LEVELS:
+                for category, entry in analysis.get(section, {}).items():
+                    deviation_rows.append((
+                        portfolio_id, recorded_at, level, category, entry['name'],
+                        entry['expected_ratio'], entry['actual_ratio'], entry['deviation'],
+                        entry['actual_amount'], entry['adjust_amount']
+                    ))
+        if not snapshot_rows:
+            return 0
+
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # 覆盖同一时间戳的快照时，先删除旧的类别行（新快照的类别可能更少）
+            conn.executemany(
+                'DELETE FROM portfolio_deviations WHERE portfolio_id = ? AND recorded_at = ?',
+                [(row[0], row[1]) for row in snapshot_rows]
+            )
+            conn.executemany(
+                'INSERT OR REPLACE INTO portfolio_snapshots'
+                ' (portfolio_id, recorded_at, config_version, total_amount, holdings)'
+                ' VALUES (?, ?, ?, ?, ?)',
+                snapshot_rows
+            )
+            conn.executemany(
+                'INSERT INTO portfolio_deviations'
+                ' (portfolio_id, recorded_at, level, category, name,'
+                '  expected_ratio, actual_ratio, deviation, actual_amount, adjust_amount)'
+                ' VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                deviation_rows
+            )
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return len(snapshot_rows)
+
+    def latest(self, portfolio_id: str) -> Optional[Dict[str, Any]]:
+        """组合最近一次快照：recorded_at、config_version、total_amount、holdings，没有快照时返回 None"""
+        row = self._connection().execute(
+            'SELECT recorded_at, config_version, total_amount, holdings FROM portfolio_snapshots'
+            ' WHERE portfolio_id = ? ORDER BY recorded_at DESC LIMIT 1',
+            (portfolio_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            'recorded_at': row[0],
+            'config_version': row[1],
+            'total_amount': row[2],
+            'holdings': json.loads(row[3]),
+        }
+
+    def deviation_history(
+        self,
+        portfolio_id: str,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        level: Optional[str] = None,
+        category: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """按时间区间查询组合的偏差历史
+
+        Args:
+            portfolio_id: 组合标识
+            start: 开始时间（Unix 时间戳，含），默认不限
+            end: 结束时间（Unix 时间戳，含），默认不限
+            level: 只返回某一层级（framework / fund_portfolio）
+            category: 只返回某一类别（如 us_index_fund）
+
+        Returns:
+            列式的时间序列：
+            - timestamps: 快照时间（升序）
+            - total_amount: 每个快照的总持仓金额
+            - series: {"层级.类别": {name, expected_ratio, actual_ratio, deviation,
+              actual_amount, adjust_amount}}，各数组与 timestamps 对齐，
+              快照中没有该类别时为 null
+        """
+        bounds = (portfolio_id, -1e300 if start is None else start, 1e300 if end is None else end)
+        conn = self._connection()
+        # 两次查询在同一个读事务中执行，看到的是同一个一致的快照
+        conn.execute('BEGIN')
+        try:
+            return self._read_history(conn, bounds, level, category)
+        finally:
+            conn.execute('COMMIT')
+
+    @staticmethod
+    def _read_history(conn: sqlite3.Connection, bounds: Tuple, level: Optional[str],
+                      category: Optional[str]) -> Dict[str, Any]:
+        snapshots = conn.execute(
+            'SELECT recorded_at, total_amount FROM portfolio_snapshots'
+            ' WHERE portfolio_id = ? AND recorded_at BETWEEN ? AND ? ORDER BY recorded_at',
+            bounds
+        ).fetchall()
+        timestamps = [row[0] for row in snapshots]
+        position = {recorded_at: index for index, recorded_at in enumerate(timestamps)}
+
+        sql = ('SELECT recorded_at, level, category, name, expected_ratio, actual_ratio,'
+               ' deviation, actual_amount, adjust_amount FROM portfolio_deviations'
+               ' WHERE portfolio_id = ? AND recorded_at BETWEEN ? AND ?')
+        params: List[Any] = list(bounds)
+        if level is not None:
+            sql += ' AND level = ?'
+            params.append(level)
+        if category is not None:
+            sql += ' AND category = ?'
+            params.append(category)
+
+        fields = ('expected_ratio', 'actual_ratio', 'deviation', 'actual_amount', 'adjust_amount')
+        series: Dict[str, Dict[str, Any]] = {}
+        for row in conn.execute(sql, params):
+            index = position[row[0]]
+            key = f'{row[1]}.{row[2]}'
+            entry = series.get(key)
+            if entry is None:
+                entry = series[key] = {'name': row[3], **{field: [None] * len(timestamps) for field in fields}}
+            for offset, field in enumerate(fields, start=4):
+                entry[field][index] = row[offset]
+
+        return {
+            'portfolio_id': bounds[0],
+            'count': len(timestamps),
+            'timestamps': timestamps,
+            'total_amount': [row[1] for row in snapshots],
+            'series': series,
+        }
+
+    def close(self) -> None:
+        """关闭当前线程的连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class SnapshotRecorder:
+    """异步批量写入快照的后台写入器
+
+    record 只把快照放入有界队列；后台线程每次取出最多 batch_size 条，
+    在一个事务中写入。队列满时丢弃快照并计入 dropped。
+    """
+
+    def __init__(
+        self,
+        store: SnapshotStore,
+        max_queue: int = 10000,
+        batch_size: int = 500,
+        flush_interval: float = 0.2
+    ):
+        """
+        Args:
+            store: 快照存储
+            max_queue: 队列容量
+            batch_size: 每个事务最多写入的快照数
+            flush_interval: 队列为空时等待新快照的最长时间（秒）
+        """
+        self.store = store
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self._queue: "queue.Queue[SnapshotRecord]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        portfolio_id: str,
+        holdings: Mapping[str, float],
+        analysis: Mapping[str, Any],
+        config_version: int,
+        recorded_at: Optional[float] = None
+    ) -> bool:
+        """提交一个快照（不等待写入）
+
+        Args:
+            portfolio_id: 组合标识
+            holdings: 持仓金额
+            analysis: analyze_portfolio 格式的分析结果（不能是紧凑版本）
+            config_version: 分析使用的配置版本
+            recorded_at: 快照时间（Unix 时间戳），默认为当前时间
+
+        Returns:
+            是否已放入队列；队列已满时返回 False
+        """
+        if self._thread is None:
+            self._start()
+        item = (portfolio_id, time.time() if recorded_at is None else recorded_at,
+                config_version, holdings, analysis)
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='snapshot-recorder', daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = [item]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.written += self.store.write_batch(batch)
+            except Exception:
+                self.failed += len(batch)
+                logger.exception('写入持仓快照失败（%d 条）', len(batch))
+            for _ in batch:
+                self._queue.task_done()
+
+    def flush(self) -> None:
+        """等待队列中已提交的快照全部写入"""
+        if self._thread is not None:
+            self._queue.join()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'queued': self._queue.qsize(),
+            'written': self.written,
+            'dropped': self.dropped,
+            'failed': self.failed,
+        }
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[float]:
+    """解析查询参数中的时间：Unix 时间戳或 ISO 8601 日期/时间（无时区时按 UTC）
+
+    Raises:
+        ValueError: 格式不正确
+    """
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
@@ -0,0 +1,129 @@
+"""
+NDJSON 流式持仓分析模块
+
+该模块以换行分隔的 JSON（NDJSON）逐行读取持仓记录，逐行调用
+InvestmentCalculator.analyze_portfolio 并立即输出一行结果，
+内存占用与输入的记录条数无关。
+
+输入的每一行是一个对象：
+    {"id": "可选的组合标识", "holdings": {"bond_fund": 10000, ...}}
+
+输出的每一行与输入行一一对应：
+    {"line": 1, "id": "...", "success": true, "data": {...}}
+    {"line": 2, "success": false, "error": "..."}
+
+命令行用法：
+    python -m src.stream portfolios.ndjson -o results.ndjson
+"""
+
+import argparse
+import json
+import sys
+from typing import Iterable, Iterator, Union
+
+from src.calculator import InvestmentCalculator
+from src.config import InvestmentConfig
+from src.serialization import compact_analysis, dumps
+from src.validation import category_schemas
+
+
+def analyze_portfolio_stream(
+    calculator: InvestmentCalculator,
+    lines: Iterable[Union[str, bytes]],
+    encoder: str = 'auto',
+    compact: bool = False
+) -> Iterator[bytes]:
+    """逐行分析 NDJSON 持仓记录
+
+    每读取一行就输出一行结果，单行出错不会中断整个流。
+    空行会被跳过，但仍计入行号，便于与输入文件对照。
+
+    Args:
+        calculator: 用于整个流的计算器实例
+        lines: NDJSON 文本行的可迭代对象（str 或 bytes）
+        encoder: 序列化器（auto / orjson / json）
+        compact: 是否输出紧凑的分析结果
+
+    Yields:
+        以换行结尾的 UTF-8 JSON 结果行
+    """
+    holdings_schema = category_schemas(calculator.categories).holdings
+    for line_number, line in enumerate(lines, start=1):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        line = line.strip()
+        if not line:
+            continue
+
+        output = {'line': line_number}
+        try:
+            record = json.loads(line)
+        except ValueError:
+            output.update({'success': False, 'error': '无效的 JSON 行'})
+            yield dumps(output, encoder) + b'\n'
+            continue
+
+        if not isinstance(record, dict) or 'holdings' not in record:
+            output.update({'success': False, 'error': '缺少必填字段: holdings'})
+            yield dumps(output, encoder) + b'\n'
+            continue
+
+        if 'id' in record:
+            output['id'] = record['id']
+
+        holdings, errors = holdings_schema.validate(record['holdings'], prefix='holdings.')
+        if errors:
+            output.update({
+                'success': False,
+                'error': '；'.join(e['message'] for e in errors),
+                'errors': errors
+            })
+        else:
+            result = calculator.analyze_portfolio(holdings)
+            if compact:
+                result = compact_analysis(result)
+            output.update({'success': True, 'data': result})
+        yield dumps(output, encoder) + b'\n'
+
+
+def analyze_portfolio_file(
+    calculator: InvestmentCalculator,
+    input_path: str,
+    output
+) -> int:
+    """分析本地 NDJSON 文件并逐行写出结果
+
+    Args:
+        calculator: 计算器实例
+        input_path: 输入文件路径
+        output: 可写的二进制文件对象
+
+    Returns:
+        写出的结果行数
+    """
+    count = 0
+    with open(input_path, 'r', encoding='utf-8') as f:
+        for result_line in analyze_portfolio_stream(calculator, f):
+            output.write(result_line)
+            count += 1
+    return count
+
+
+def main(argv=None) -> int:
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description='NDJSON 流式持仓分析')
+    parser.add_argument('input', help='输入的 NDJSON 持仓文件')
+    parser.add_argument('-o', '--output', help='输出文件路径（默认输出到标准输出）')
+    args = parser.parse_args(argv)
+
+    calculator = InvestmentCalculator(InvestmentConfig())
+    if args.output:
+        with open(args.output, 'wb') as output:
+            analyze_portfolio_file(calculator, args.input, output)
+    else:
+        analyze_portfolio_file(calculator, args.input, sys.stdout.buffer)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,475 @@
+"""
+参数扫描模块
+
+该模块枚举候选 InvestmentConfig（按与 InvestmentConfig.validate 相同的
+比例总和规则过滤），在一组净值情景上评估每个候选并排序。
+
+评估方式：
+- 各基金在 replay_strategy 中互不影响，规则只依赖收益率，因此每只基金的
+  投入、取出和期末市值都与其定投金额成正比。同一组规则（加仓规则、
+  止盈阈值、止盈比例）只需以单位定投金额回放一次，所有比例组合的结果
+  都是这次回放结果的线性组合（一次矩阵乘法）
+- 银行固收和备用金按固定年化收益率复利，实体黄金跟随黄金 ETF 的净值
+
+候选按"规则组合 × 大框架比例 × 基金组合比例"的顺序编号。任务按规则组合和
+候选块划分，分发到进程池；每完成一个任务就把结果追加写入 JSONL 文件，
+中断后以相同参数重新运行会跳过已完成的候选。
+
+扫描参数文件（JSON）：
+    {
+        "weekly_amount": 10000,
+        "grid": {
+            "fund_portfolio_ratio": [0.2, 0.3, 0.4],
+            "bank_fixed_income_ratio": [0.5, 0.6, 0.7],
+            "take_profit_threshold": [0.2, 0.3],
+            "add_position_rules": [{"-0.05": 0.1, "-0.1": 0.15}, {"-0.1": 0.2}]
+        },
+        "scenarios": {"count": 2000, "years": 10, "seed": 1},
+        "rates": {"bank_fixed_income": 0.025, "reserve_fund": 0.015}
+    }
+grid 中未列出的字段取默认配置的值；scenarios 也可以是 {"file": "scenarios.npy"}，
+即形状为 (weeks, funds, scenarios) 的净值数组。
+
+扫描的资产模型（银行固收和备用金按固定收益率复利、实体黄金跟随黄金 ETF）
+建立在内置类别之上，只支持内置类别；基础配置使用自定义类别时直接报错。
+
+命令行用法：
+    python -m src.sweep sweep.json -o results.jsonl --workers 8 --top 10
+"""
+
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from src.categories import BUILTIN_FRAMEWORK, BUILTIN_FUNDS
+from src.config import InvestmentConfig
+from src.rules import RuleTable
+from src.simulation import (
+    WEEKS_PER_YEAR, MarketAssumptions, eligible_mask, generate_nav_paths, replay_strategy
+)
+
+# 内置类别的键和配置中的比例字段（大框架依次为基金组合、银行固收、实体黄金、备用金）
+FRAMEWORK_FIELDS = tuple(field for _, _, field in BUILTIN_FRAMEWORK)
+FUND_FIELDS = tuple(field for _, _, field, _, _ in BUILTIN_FUNDS)
+FUND_KEYS = tuple(key for key, *_ in BUILTIN_FUNDS)
+RULE_FIELDS = ('add_position_rules', 'take_profit_threshold', 'take_profit_ratio')
+
+DEFAULT_RATES = {'bank_fixed_income': 0.025, 'reserve_fund': 0.015}
+
+# 排序指标：(指标名, 是否越大越好)
+RANK_METRICS = {
+    'mean_return': True,
+    'p5_return': True,
+    'p50_return': True,
+    'p95_return': True,
+    'loss_probability': False,
+    'mean_profit': True,
+    'mean_final_value': True,
+}
+
+
+@dataclass
+class SweepSpec:
+    """扫描参数"""
+
+    weekly_amount: float
+    grid: Dict[str, List[Any]]
+    scenarios: Dict[str, Any]
+    rates: Dict[str, float] = field(default_factory=lambda: dict(DEFAULT_RATES))
+
+    @classmethod
+    def from_dict(cls, data: Mapping) -> 'SweepSpec':
+        """从参数文件的内容构建，未知的配置字段会抛出 ValueError"""
+        grid = dict(data.get('grid', {}))
+        unknown = [name for name in grid if name not in FRAMEWORK_FIELDS + FUND_FIELDS + RULE_FIELDS]
+        if unknown:
+            raise ValueError(f'未知的配置字段: {", ".join(unknown)}')
+        if 'add_position_rules' in grid:
+            grid['add_position_rules'] = [
+                {float(threshold): ratio for threshold, ratio in rules.items()}
+                for rules in grid['add_position_rules']
+            ]
+        rates = dict(DEFAULT_RATES)
+        rates.update(data.get('rates', {}))
+        return cls(
+            weekly_amount=float(data['weekly_amount']),
+            grid=grid,
+            scenarios=dict(data.get('scenarios', {})),
+            rates=rates,
+        )
+
+    def fingerprint(self) -> str:
+        """参数指纹，用于确认续跑时使用的是同一组参数"""
+        payload = {
+            'weekly_amount': self.weekly_amount,
+            'grid': {
+                name: [_jsonable(value) for value in values] for name, values in self.grid.items()
+            },
+            'scenarios': self.scenarios,
+            'rates': self.rates,
+        }
+        return hashlib.sha1(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def _jsonable(value: Any) -> Any:
+    # 加仓规则的阈值键与 InvestmentConfig.to_dict 一样转为字符串
+    if isinstance(value, Mapping):
+        return {repr(threshold): ratio for threshold, ratio in value.items()}
+    return value
+
+
+def _ratio_combinations(grid: Mapping, names: Sequence[str], base: InvestmentConfig) -> List[Tuple[float, ...]]:
+    """枚举一组比例字段的组合，只保留通过 InvestmentConfig.validate 的组合
+
+    大框架比例和基金组合比例各自独立校验，分组枚举后再做笛卡尔积，
+    不必构造两组比例的全部组合。
+    """
+    values = [grid.get(name, [getattr(base, name)]) for name in names]
+    return [
+        combo for combo in itertools.product(*values)
+        if replace(base, **dict(zip(names, combo))).validate()
+    ]
+
+
+@dataclass
+class CandidateSpace:
+    """候选配置空间
+
+    第 i 个候选为 rules[i // per_rule] 与 ratios[i % per_rule] 的组合，
+    ratios 为大框架比例组合与基金组合比例组合的笛卡尔积。
+    """
+
+    rules: List[Dict[str, Any]]
+    framework: List[Tuple[float, ...]]
+    funds: List[Tuple[float, ...]]
+
+    @classmethod
+    def from_spec(cls, spec: SweepSpec, base: Optional[InvestmentConfig] = None) -> 'CandidateSpace':
+        """
+        Raises:
+            ValueError: 基础配置使用了自定义类别
+        """
+        base = base or InvestmentConfig()
+        if base.framework_buckets or base.fund_buckets:
+            raise ValueError('参数扫描只支持内置投资类别')
+        rule_values = [spec.grid.get(name, [getattr(base, name)]) for name in RULE_FIELDS]
+        return cls(
+            rules=[dict(zip(RULE_FIELDS, combo)) for combo in itertools.product(*rule_values)],
+            framework=_ratio_combinations(spec.grid, FRAMEWORK_FIELDS, base),
+            funds=_ratio_combinations(spec.grid, FUND_FIELDS, base),
+        )
+
+    @property
+    def per_rule(self) -> int:
+        return len(self.framework) * len(self.funds)
+
+    def __len__(self) -> int:
+        return len(self.rules) * self.per_rule
+
+    def ratios(self, offset: int) -> Dict[str, float]:
+        framework = self.framework[offset // len(self.funds)]
+        funds = self.funds[offset % len(self.funds)]
+        return {**dict(zip(FRAMEWORK_FIELDS, framework)), **dict(zip(FUND_FIELDS, funds))}
+
+    def config(self, index: int, base: Optional[InvestmentConfig] = None) -> InvestmentConfig:
+        """第 index 个候选配置"""
+        base = base or InvestmentConfig()
+        rule_index, offset = divmod(index, self.per_rule)
+        return base.with_updates(**self.rules[rule_index], **self.ratios(offset))
+
+
+# ---------------------------------------------------------------------------
+# 情景
+# ---------------------------------------------------------------------------
+
+def build_scenarios(spec: Mapping[str, Any]) -> np.ndarray:
+    """生成或加载情景净值 (weeks, funds, scenarios)
+
+    Args:
+        spec: {"file": 路径}（以内存映射方式加载），或
+              {"count": 情景数, "years": 年数, "seed": 种子, "market": MarketAssumptions 参数}
+    """
+    if 'file' in spec:
+        nav = np.load(spec['file'], mmap_mode='r')
+        if nav.ndim != 3 or nav.shape[1] != len(FUND_KEYS):
+            raise ValueError(f'情景文件的形状必须为 (weeks, {len(FUND_KEYS)}, scenarios)')
+        return nav
+    market = MarketAssumptions(**{
+        key: tuple(map(tuple, value)) if key == 'correlation' else tuple(value)
+        for key, value in spec.get('market', {}).items()
+    })
+    weeks = int(spec.get('years', 10)) * WEEKS_PER_YEAR
+    rng = np.random.default_rng(spec.get('seed'))
+    return generate_nav_paths(weeks, int(spec.get('count', 1000)), market, rng)
+
+
+def _fixed_income_factor(annual_rate: float, weeks: int) -> float:
+    """每周投入 1 元、按固定年化收益率复利，期末的累计市值"""
+    growth = (1.0 + annual_rate) ** (1.0 / WEEKS_PER_YEAR)
+    return float(np.sum(growth ** np.arange(weeks)))
+
+
+# ---------------------------------------------------------------------------
+# 评估
+# ---------------------------------------------------------------------------
+
+# 工作进程中的情景数组（由 _init_worker 以内存映射方式加载）
+_worker_nav: Optional[np.ndarray] = None
+
+
+def _init_worker(path: str) -> None:
+    global _worker_nav
+    _worker_nav = np.load(path, mmap_mode='r')
+
+
+def evaluate_rule_group(
+    nav: np.ndarray,
+    spec: SweepSpec,
+    space: CandidateSpace,
+    start: int,
+    stop: int
+) -> List[Dict[str, Any]]:
+    """评估同一规则组合下的一段候选 [start, stop)
+
+    Returns:
+        每个候选一条结果：{"index", "config", "metrics"}
+    """
+    weeks = nav.shape[0]
+    rule_index = start // space.per_rule
+    rules = space.rules[rule_index]
+    config = InvestmentConfig().with_updates(**rules)
+
+    # 1. 以每周 1 元的定投金额回放一次，得到各基金在每个情景下的单位结果 (scenarios, funds)
+    rule_table = RuleTable.from_config(config)
+    unit = replay_strategy(
+        np.asarray(nav), np.ones((weeks, len(FUND_KEYS))), rule_table, eligible_mask(rule_table, config.categories)
+    )
+
+    # 2. 各候选每周投入各基金、各固定资产的金额
+    offsets = range(start - rule_index * space.per_rule, stop - rule_index * space.per_rule)
+    ratios = [space.ratios(offset) for offset in offsets]
+    framework = np.array([[r[name] for name in FRAMEWORK_FIELDS] for r in ratios])
+    fund_weights = np.array([[r[name] for name in FUND_FIELDS] for r in ratios])
+    fund_weights *= (spec.weekly_amount * framework[:, 0])[:, None]   # (candidates, funds)
+    bank_weekly = spec.weekly_amount * framework[:, 1]
+    gold_weekly = spec.weekly_amount * framework[:, 2]
+    reserve_weekly = spec.weekly_amount * framework[:, 3]
+
+    # 3. 线性组合：(scenarios, funds) @ (funds, candidates)
+    invested = unit.fund_invested @ fund_weights.T
+    withdrawn = unit.fund_withdrawn @ fund_weights.T
+    final_value = unit.fund_value @ fund_weights.T
+    active = (fund_weights > 0).T.astype(np.int64)
+    add_count = unit.fund_add_count @ active
+    take_profit_count = unit.fund_take_profit_count @ active
+
+    gold = np.asarray(nav[:, FUND_KEYS.index('gold_etf')], dtype=np.float64)
+    gold_factor = (gold[-1] / gold).sum(axis=0)                       # (scenarios,)
+    fixed_value = (
+        bank_weekly * _fixed_income_factor(spec.rates['bank_fixed_income'], weeks) +
+        reserve_weekly * _fixed_income_factor(spec.rates['reserve_fund'], weeks)
+    )
+    invested += (bank_weekly + gold_weekly + reserve_weekly) * weeks
+    final_value += fixed_value + np.outer(gold_factor, gold_weekly)
+
+    profit = final_value + withdrawn - invested
+    with np.errstate(divide='ignore', invalid='ignore'):
+        total_return = np.where(invested > 0, profit / invested * 100, 0.0)
+    p5, p50, p95 = np.percentile(total_return, [5, 50, 95], axis=0)
+
+    rule_changes = {name: _jsonable(value) for name, value in rules.items()}
+    results = []
+    for i, index in enumerate(range(start, stop)):
+        results.append({
+            'index': index,
+            'config': {**rule_changes, **ratios[i]},
+            'metrics': {
+                'mean_return': round(float(total_return[:, i].mean()), 4),
+                'p5_return': round(float(p5[i]), 4),
+                'p50_return': round(float(p50[i]), 4),
+                'p95_return': round(float(p95[i]), 4),
+                'loss_probability': round(float((profit[:, i] < 0).mean() * 100), 4),
+                'mean_profit': round(float(profit[:, i].mean()), 2),
+                'mean_final_value': round(float(final_value[:, i].mean()), 2),
+                'average_add_count': round(float(add_count[:, i].mean()), 2),
+                'average_take_profit_count': round(float(take_profit_count[:, i].mean()), 2),
+            },
+        })
+    return results
+
+
+def _evaluate_task(spec: SweepSpec, space: CandidateSpace, start: int, stop: int) -> List[Dict[str, Any]]:
+    return evaluate_rule_group(_worker_nav, spec, space, start, stop)
+
+
+def plan_tasks(space: CandidateSpace, chunk_size: int, done: Set[int]) -> Iterator[Tuple[int, int]]:
+    """划分任务：每个任务为同一规则组合下最多 chunk_size 个候选，已全部完成的任务跳过"""
+    for rule_index in range(len(space.rules)):
+        group_start = rule_index * space.per_rule
+        group_stop = group_start + space.per_rule
+        for start in range(group_start, group_stop, chunk_size):
+            stop = min(start + chunk_size, group_stop)
+            if any(index not in done for index in range(start, stop)):
+                yield start, stop
+
+
+# ---------------------------------------------------------------------------
+# 结果文件
+# ---------------------------------------------------------------------------
+
+def read_results(path: str, fingerprint: str) -> Tuple[List[Dict[str, Any]], bool]:
+    """读取已有的结果文件
+
+    末尾不完整的行（写入过程中被中断）会被截掉。
+
+    Returns:
+        (结果列表, 文件是否已存在)
+
+    Raises:
+        ValueError: 结果文件来自另一组扫描参数
+    """
+    if not os.path.exists(path):
+        return [], False
+    with open(path, 'rb') as f:
+        data = f.read()
+    complete = data.rfind(b'\n') + 1
+    if complete < len(data):
+        with open(path, 'r+b') as f:
+            f.truncate(complete)
+
+    lines = data[:complete].splitlines()
+    if not lines:
+        return [], False
+    meta = json.loads(lines[0])
+    if meta.get('fingerprint') != fingerprint:
+        raise ValueError(f'结果文件 {path} 来自另一组扫描参数，请更换输出文件')
+    return [json.loads(line) for line in lines[1:] if line.strip()], True
+
+
+def rank_results(results: List[Dict[str, Any]], rank_by: str = 'mean_return') -> List[Dict[str, Any]]:
+    """按指标排序，相同指标按候选编号排序"""
+    if rank_by not in RANK_METRICS:
+        raise ValueError(f'不支持的排序指标: {rank_by}')
+    sign = -1 if RANK_METRICS[rank_by] else 1
+    return sorted(results, key=lambda r: (sign * r['metrics'][rank_by], r['index']))
+
+
+def run_sweep(
+    spec: SweepSpec,
+    output_path: str,
+    workers: int = 0,
+    chunk_size: int = 1024,
+    progress=None
+) -> List[Dict[str, Any]]:
+    """运行参数扫描，结果追加写入 output_path
+
+    Args:
+        spec: 扫描参数
+        output_path: JSONL 结果文件；已存在时续跑
+        workers: 进程数，0 表示在当前进程中运行
+        chunk_size: 每个任务的最大候选数
+        progress: 可选的回调 progress(已完成数, 总数)
+
+    Returns:
+        所有候选的结果（包括之前运行中已完成的）
+    """
+    space = CandidateSpace.from_spec(spec)
+    fingerprint = spec.fingerprint()
+    results, exists = read_results(output_path, fingerprint)
+    done = {r['index'] for r in results}
+    total = len(space)
+
+    nav = build_scenarios(spec.scenarios)
+    with open(output_path, 'a', encoding='utf-8') as output:
+        if not exists:
+            meta = {
+                'fingerprint': fingerprint,
+                'candidates': total,
+                'weeks': int(nav.shape[0]),
+                'scenarios': int(nav.shape[2]),
+            }
+            output.write(json.dumps(meta, ensure_ascii=False) + '\n')
+            output.flush()
+
+        def record(rows: List[Dict[str, Any]]) -> None:
+            rows = [row for row in rows if row['index'] not in done]
+            for row in rows:
+                output.write(json.dumps(row, ensure_ascii=False) + '\n')
+                done.add(row['index'])
+            output.flush()
+            results.extend(rows)
+            if progress is not None:
+                progress(len(done), total)
+
+        tasks = list(plan_tasks(space, chunk_size, done))
+        if workers <= 0 or len(tasks) <= 1:
+            for start, stop in tasks:
+                record(evaluate_rule_group(nav, spec, space, start, stop))
+            return results
+
+        # 情景数组通过文件共享，工作进程以内存映射方式加载，不随任务传输
+        if 'file' in spec.scenarios:
+            scenario_path, temporary = spec.scenarios['file'], False
+        else:
+            handle, scenario_path = tempfile.mkstemp(suffix='.npy')
+            os.close(handle)
+            np.save(scenario_path, nav)
+            temporary = True
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(scenario_path,)) as pool:
+                # 在途任务数保持为进程数的两倍，已完成的任务立即写出
+                pending = set()
+                queue = iter(tasks)
+                for start, stop in itertools.islice(queue, workers * 2):
+                    pending.add(pool.submit(_evaluate_task, spec, space, start, stop))
+                while pending:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        record(future.result())
+                        for start, stop in itertools.islice(queue, 1):
+                            pending.add(pool.submit(_evaluate_task, spec, space, start, stop))
+        finally:
+            if temporary:
+                os.remove(scenario_path)
+    return results
+
+
+def main(argv=None) -> int:
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description='InvestmentConfig 参数扫描')
+    parser.add_argument('spec', help='扫描参数 JSON 文件')
+    parser.add_argument('-o', '--output', required=True, help='JSONL 结果文件（已存在时续跑）')
+    parser.add_argument('--workers', type=int, default=0, help='进程数，0 表示不使用进程池')
+    parser.add_argument('--chunk-size', type=int, default=1024, help='每个任务的最大候选数')
+    parser.add_argument('--rank-by', default='mean_return', choices=sorted(RANK_METRICS))
+    parser.add_argument('--top', type=int, default=10, help='输出排名前几的候选')
+    args = parser.parse_args(argv)
+
+    with open(args.spec, 'r', encoding='utf-8') as f:
+        spec = SweepSpec.from_dict(json.load(f))
+
+    def report(completed: int, total: int) -> None:
+        print(f'\r已完成 {completed}/{total}', end='', file=sys.stderr, flush=True)
+
+    started = time.perf_counter()
+    results = run_sweep(spec, args.output, args.workers, args.chunk_size, progress=report)
+    print(f'\n耗时 {time.perf_counter() - started:.2f} 秒', file=sys.stderr)
+
+    json.dump(rank_results(results, args.rank_by)[:args.top], sys.stdout, ensure_ascii=False, indent=2)
+    sys.stdout.write('\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,610 @@
+"""
+请求校验模块
+
+该模块提供声明式的请求校验：字段声明在导入时编译为校验函数，
+所有路由共享同一组校验器。校验会检查全部字段并返回结构化的错误列表，
+而不是遇到第一个错误就停止。
+
+错误列表中每一项的格式为：
+    {"field": "holdings.bond_fund", "message": "持仓金额 bond_fund 不能为负数"}
+"""
+
+import functools
+import math
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from src.calculator import INPUT_FIELDS
+from src.categories import CategoryRegistry
+from src.config import InvestmentConfig
+from src.metrics import metrics
+
+# 编译后的字段校验函数：check(data, cleaned, errors, path_prefix)
+Check = Callable[[Dict, Dict, List[Dict[str, str]], str], None]
+
+# 整体规则：rule(cleaned, errors)，在所有字段校验通过后执行
+Rule = Callable[[Dict, List[Dict[str, str]]], None]
+
+
+def _error(errors: List[Dict[str, str]], path: str, message: str) -> None:
+    errors.append({'field': path, 'message': message})
+
+
+# 数值字段的绝对值上限（1 万亿），更大的金额视为无效输入
+MAX_NUMBER = 10 ** 12
+
+
+def _number_problem(value: Any) -> Optional[str]:
+    """数值校验失败的原因，有效时返回 None"""
+    # bool 是 int 的子类，但 true/false 不是有效的金额或比例
+    if not isinstance(value, (int, float)) or isinstance(value, bool):
+        return '必须是数值类型'
+    # JSON 中的 NaN、Infinity 以及 1e400 这类溢出的字面量解析后不是有限数
+    if isinstance(value, float) and not math.isfinite(value):
+        return '必须是有限的数值'
+    if abs(value) > MAX_NUMBER:
+        return f'的绝对值不能超过 {MAX_NUMBER}'
+    return None
+
+
+class Field:
+    """字段声明基类"""
+
+    def __init__(self, name: str, required: bool = True, label: str = '字段'):
+        """
+        Args:
+            name: 字段名
+            required: 是否必填
+            label: 错误信息中字段名前的说明文字，如"字段"、"持仓金额"
+        """
+        self.name = name
+        self.required = required
+        self.label = label
+
+    def compile(self) -> Check:
+        """编译为校验函数"""
+        name, required = self.name, self.required
+        convert = self.build_converter()
+
+        def check(data, cleaned, errors, prefix):
+            path = prefix + name
+            if name not in data:
+                if required:
+                    _error(errors, path, f'缺少必填字段: {name}')
+                return
+            value = convert(data[name], path, errors)
+            if value is not None:
+                cleaned[name] = value
+
+        return check
+
+    def build_converter(self) -> Callable[[Any, str, List[Dict[str, str]]], Any]:
+        """返回 (value, path, errors) -> 转换后的值，校验失败返回 None"""
+        raise NotImplementedError
+
+
+class Number(Field):
+    """数值字段，转换为 float"""
+
+    def __init__(
+        self,
+        name: str,
+        required: bool = True,
+        label: str = '字段',
+        minimum: Optional[float] = 0.0,
+        maximum: Optional[float] = None
+    ):
+        super().__init__(name, required, label)
+        self.minimum = minimum
+        self.maximum = maximum
+
+    def build_converter(self):
+        name, label, minimum, maximum = self.name, self.label, self.minimum, self.maximum
+
+        def convert(value, path, errors):
+            problem = _number_problem(value)
+            if problem is not None:
+                _error(errors, path, f'{label} {name} {problem}')
+                return None
+            if minimum is not None and value < minimum:
+                if minimum == 0:
+                    _error(errors, path, f'{label} {name} 不能为负数')
+                else:
+                    _error(errors, path, f'{label} {name} 不能小于 {minimum}')
+                return None
+            if maximum is not None and value > maximum:
+                _error(errors, path, f'{label} {name} 不能大于 {maximum}')
+                return None
+            return float(value)
+
+        return convert
+
+
+class String(Field):
+    """字符串字段"""
+
+    def build_converter(self):
+        name, label = self.name, self.label
+
+        def convert(value, path, errors):
+            if not isinstance(value, str):
+                _error(errors, path, f'{label} {name} 必须是字符串类型')
+                return None
+            return value
+
+        return convert
+
+
+class NumberArray(Field):
+    """数值数组字段，转换为 float 列表"""
+
+    def __init__(self, name: str, required: bool = True, label: str = '字段',
+                 minimum: Optional[float] = 0.0):
+        super().__init__(name, required, label)
+        self.minimum = minimum
+
+    def build_converter(self):
+        name, label, minimum = self.name, self.label, self.minimum
+
+        def convert(value, path, errors):
+            if not isinstance(value, list):
+                _error(errors, path, f'{label} {name} 必须是数组类型')
+                return None
+            ok = True
+            for index, item in enumerate(value):
+                problem = _number_problem(item)
+                if problem is not None:
+                    _error(errors, f'{path}[{index}]', f'{label} {name} 第 {index} 项{problem}')
+                    ok = False
+                elif minimum is not None and item < minimum:
+                    _error(errors, f'{path}[{index}]', f'{label} {name} 第 {index} 项不能为负数')
+                    ok = False
+            return [float(item) for item in value] if ok else None
+
+        return convert
+
+
+class StringArray(Field):
+    """字符串数组字段"""
+
+    def build_converter(self):
+        name, label = self.name, self.label
+
+        def convert(value, path, errors):
+            if not isinstance(value, list):
+                _error(errors, path, f'{label} {name} 必须是数组类型')
+                return None
+            ok = True
+            for index, item in enumerate(value):
+                if not isinstance(item, str):
+                    _error(errors, f'{path}[{index}]', f'{label} {name} 第 {index} 项必须是字符串类型')
+                    ok = False
+            return value if ok else None
+
+        return convert
+
+
+class Nested(Field):
+    """嵌套对象字段，使用子 Schema 校验"""
+
+    def __init__(self, name: str, schema: 'Schema', required: bool = True, label: str = '字段'):
+        super().__init__(name, required, label)
+        self.schema = schema
+
+    def build_converter(self):
+        name, schema = self.name, self.schema
+
+        def convert(value, path, errors):
+            if not isinstance(value, dict):
+                _error(errors, path, f'{name} 必须是对象类型')
+                return None
+            cleaned, nested_errors = schema._validate(value, prefix=path + '.')
+            errors.extend(nested_errors)
+            return None if nested_errors else cleaned
+
+        return convert
+
+
+class NestedList(Field):
+    """对象数组字段，每一项使用子 Schema 校验"""
+
+    def __init__(self, name: str, schema: 'Schema', required: bool = True, label: str = '字段'):
+        super().__init__(name, required, label)
+        self.schema = schema
+
+    def build_converter(self):
+        name, schema = self.name, self.schema
+
+        def convert(value, path, errors):
+            if value is None:
+                return None
+            if not isinstance(value, list):
+                _error(errors, path, f'{name} 必须是数组类型')
+                return None
+            items = []
+            ok = True
+            for index, item in enumerate(value):
+                item_path = f'{path}[{index}]'
+                if not isinstance(item, dict):
+                    _error(errors, item_path, f'{name} 第 {index} 项必须是对象类型')
+                    ok = False
+                    continue
+                cleaned, item_errors = schema._validate(item, prefix=item_path + '.')
+                if item_errors:
+                    errors.extend(item_errors)
+                    ok = False
+                else:
+                    items.append(cleaned)
+            return items if ok else None
+
+        return convert
+
+
+class ListOrObject(Field):
+    """可以是对象数组，也可以是对象的字段（如逐条或按列提交的持仓）
+
+    数组使用 NestedList 的规则校验，对象使用 Nested 的规则校验；
+    值为 null 时视为未提供。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        item_schema: 'Schema',
+        object_schema: 'Schema',
+        required: bool = True,
+        label: str = '字段'
+    ):
+        super().__init__(name, required, label)
+        self.item_schema = item_schema
+        self.object_schema = object_schema
+
+    def build_converter(self):
+        name = self.name
+        convert_list = NestedList(name, self.item_schema).build_converter()
+        convert_object = Nested(name, self.object_schema).build_converter()
+
+        def convert(value, path, errors):
+            if value is None:
+                return None
+            if isinstance(value, list):
+                return convert_list(value, path, errors)
+            if isinstance(value, dict):
+                return convert_object(value, path, errors)
+            _error(errors, path, f'{name} 必须是数组或对象类型')
+            return None
+
+        return convert
+
+
+class GridAxis(Field):
+    """情景网格中一个变化字段的取值，转换为 float 列表
+
+    可以是数值数组，也可以是 {"start", "stop", "step"} 对象，
+    表示从 start 到 stop（包含 stop）按 step 递增的等差序列（保留两位小数）。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        range_schema: 'Schema',
+        max_values: int,
+        required: bool = False,
+        label: str = '字段'
+    ):
+        super().__init__(name, required, label)
+        self.range_schema = range_schema
+        self.max_values = max_values
+
+    def build_converter(self):
+        name, label, range_schema, max_values = self.name, self.label, self.range_schema, self.max_values
+        convert_list = NumberArray(name, label=label).build_converter()
+
+        def convert(value, path, errors):
+            if isinstance(value, list):
+                values = convert_list(value, path, errors)
+                if values is None:
+                    return None
+            elif isinstance(value, dict):
+                cleaned, range_errors = range_schema._validate(value, prefix=path + '.')
+                if range_errors:
+                    errors.extend(range_errors)
+                    return None
+                start, stop, step = cleaned['start'], cleaned['stop'], cleaned['step']
+                if stop < start:
+                    _error(errors, path, f'{label} {name} 的 stop 不能小于 start')
+                    return None
+                count = int((stop - start) / step + 1e-9) + 1
+                if count > max_values:
+                    _error(errors, path, f'{label} {name} 的取值个数不能超过 {max_values}')
+                    return None
+                values = [round(start + step * index, 2) for index in range(count)]
+            else:
+                _error(errors, path, f'{label} {name} 必须是数组或对象类型')
+                return None
+            if not values:
+                _error(errors, path, f'{label} {name} 至少需要一个取值')
+                return None
+            return values
+
+        return convert
+
+
+class Schema:
+    """对象校验器
+
+    字段声明在构建时编译一次；validate 只执行编译好的校验函数。
+    """
+
+    def __init__(
+        self,
+        fields: Sequence[Field],
+        rules: Sequence[Rule] = (),
+        allow_unknown: bool = True,
+        defaults: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Args:
+            fields: 字段声明
+            rules: 所有字段通过后执行的整体规则（如比例总和）
+            allow_unknown: 是否允许未声明的字段
+            defaults: 未提供的字段的默认值
+        """
+        self.fields = tuple(fields)
+        self.field_names = frozenset(f.name for f in self.fields)
+        self._checks = tuple(f.compile() for f in self.fields)
+        self._rules = tuple(rules)
+        self._allow_unknown = allow_unknown
+        self._defaults = dict(defaults or {})
+
+    @metrics.timed('validate')
+    def validate(self, data: Any, prefix: str = '') -> Tuple[Dict, List[Dict[str, str]]]:
+        """校验并转换数据
+
+        Args:
+            data: 待校验的对象
+            prefix: 错误路径前缀（嵌套校验时使用）
+
+        Returns:
+            (转换后的数据, 错误列表)，错误列表为空表示校验通过
+        """
+        return self._validate(data, prefix)
+
+    def _validate(self, data: Any, prefix: str) -> Tuple[Dict, List[Dict[str, str]]]:
+        """validate 的实现；嵌套字段直接调用，不重复计入校验阶段的耗时"""
+        errors: List[Dict[str, str]] = []
+        if not isinstance(data, dict):
+            path = prefix.rstrip('.')
+            _error(errors, path, f'{path} 必须是对象类型' if path else '请求体必须是对象类型')
+            return {}, errors
+
+        cleaned = dict(self._defaults)
+        for check in self._checks:
+            check(data, cleaned, errors, prefix)
+
+        if not self._allow_unknown:
+            for key in data:
+                if key not in self.field_names:
+                    _error(errors, prefix + str(key), f'未知字段: {key}')
+
+        if not errors:
+            for rule in self._rules:
+                rule(cleaned, errors)
+        return cleaned, errors
+
+
+def error_payload(errors: List[Dict[str, str]]) -> Dict[str, Any]:
+    """生成校验失败的响应体
+
+    error 为所有错误信息的汇总（兼容只读取 error 的前端），
+    errors 为结构化的错误列表。
+    """
+    return {
+        'success': False,
+        'error': '；'.join(e['message'] for e in errors),
+        'errors': errors
+    }
+
+
+# ---------------------------------------------------------------------------
+# 各接口共享的校验器（导入时编译一次）
+# ---------------------------------------------------------------------------
+
+
+def _require_positive_total(cleaned: Dict, errors: List[Dict[str, str]]) -> None:
+    if sum(cleaned.values()) == 0:
+        _error(errors, 'holdings', '总持仓金额不能为0，请至少输入一项持仓金额')
+
+
+# 批量计算的最大账户数
+MAX_BATCH_ROWS = 10000
+
+
+def _require_equal_lengths(cleaned: Dict, errors: List[Dict[str, str]]) -> None:
+    if len({len(cleaned[field]) for field in INPUT_FIELDS}) != 1:
+        _error(errors, '', '所有字段的数组长度必须一致')
+
+
+def _require_batch_size(cleaned: Dict, errors: List[Dict[str, str]]) -> None:
+    count = len(cleaned[INPUT_FIELDS[0]])
+    if count > MAX_BATCH_ROWS:
+        _error(errors, '', f'账户数 {count} 超过上限 {MAX_BATCH_ROWS}')
+
+
+def _require_equal_columns(cleaned: Dict, errors: List[Dict[str, str]]) -> None:
+    if len({len(column) for column in cleaned.values()}) != 1:
+        _error(errors, 'holdings', '持仓各列的数组长度必须一致')
+
+
+def _require_unit_sum(path: str, message: str) -> Rule:
+    def rule(cleaned: Dict, errors: List[Dict[str, str]]) -> None:
+        if cleaned and abs(sum(cleaned.values()) - 1.0) > 0.0001:
+            _error(errors, path, message)
+    return rule
+
+
+# 持仓记录（/api/calculate 的 holdings 数组元素）
+HOLDING_LOT_SCHEMA = Schema([
+    String('fund_name', required=False, label='持仓'),
+    Number('holding_cost', required=False, label='持仓'),
+    Number('current_nav', required=False, label='持仓'),
+    Number('holding_amount', required=False, label='持仓'),
+])
+
+# 按列提交的持仓（/api/calculate 的 holdings 对象，每个字段一个等长数组）
+HOLDING_COLUMNS_SCHEMA = Schema(
+    [
+        StringArray('fund_name', label='持仓'),
+        NumberArray('holding_cost', label='持仓'),
+        NumberArray('current_nav', label='持仓'),
+        NumberArray('holding_amount', label='持仓'),
+    ],
+    rules=[_require_equal_columns],
+    allow_unknown=False
+)
+
+# POST /api/calculate
+CALCULATE_SCHEMA = Schema(
+    [Number(field) for field in INPUT_FIELDS] +
+    [ListOrObject('holdings', HOLDING_LOT_SCHEMA, HOLDING_COLUMNS_SCHEMA, required=False)]
+)
+
+# POST /api/calculate/batch
+CALCULATE_BATCH_SCHEMA = Schema(
+    [NumberArray(field) for field in INPUT_FIELDS],
+    rules=[_require_equal_lengths, _require_batch_size]
+)
+
+# 情景网格的最大格子数
+MAX_SCENARIOS = 10000
+
+
+def _require_grid_size(cleaned: Dict, errors: List[Dict[str, str]]) -> None:
+    if not cleaned:
+        _error(errors, 'vary', '至少需要一个变化字段')
+        return
+    count = 1
+    for values in cleaned.values():
+        count *= len(values)
+    if count > MAX_SCENARIOS:
+        _error(errors, 'vary', f'情景数 {count} 超过上限 {MAX_SCENARIOS}')
+
+
+def _require_scenario_inputs(cleaned: Dict, errors: List[Dict[str, str]]) -> None:
+    for field in INPUT_FIELDS:
+        if field not in cleaned['base'] and field not in cleaned['vary']:
+            _error(errors, f'base.{field}', f'缺少必填字段: {field}')
+
+
+# 等差序列形式的网格取值
+GRID_RANGE_SCHEMA = Schema(
+    [Number('start'), Number('stop'), Number('step', minimum=0.01)],
+    allow_unknown=False
+)
+
+# POST /api/calculate/scenarios
+CALCULATE_SCENARIOS_SCHEMA = Schema(
+    [
+        Nested('base', Schema([Number(field, required=False) for field in INPUT_FIELDS]), required=False),
+        Nested('vary', Schema(
+            [GridAxis(field, GRID_RANGE_SCHEMA, MAX_SCENARIOS) for field in INPUT_FIELDS],
+            rules=[_require_grid_size],
+            allow_unknown=False
+        )),
+    ],
+    rules=[_require_scenario_inputs],
+    defaults={'base': {}}
+)
+
+
+class CategorySchemas:
+    """依赖投资类别的校验器（持仓金额的字段、比例的字段）
+
+    每组类别只编译一次，见 category_schemas。
+
+    Attributes:
+        holdings: 持仓金额对象（/api/analyze-portfolio 及流式分析的 holdings）
+        analyze_portfolio: POST /api/analyze-portfolio
+        rebalance: POST /api/rebalance
+        portfolio_deltas: PATCH /api/portfolios/<portfolio_id>
+        config_update: PUT /api/config
+    """
+
+    def __init__(self, framework_keys: Sequence[str], fund_keys: Sequence[str], holding_keys: Sequence[str]):
+        self.holdings = Schema(
+            [Number(field, required=False, label='持仓金额') for field in holding_keys],
+            rules=[_require_positive_total],
+            defaults={field: 0.0 for field in holding_keys}
+        )
+        self.analyze_portfolio = Schema([
+            Nested('holdings', self.holdings),
+            String('portfolio_id', required=False, label='组合'),
+        ])
+        self.rebalance = Schema([
+            Nested('holdings', self.holdings),
+            Nested('min_trade', Schema(
+                [Number(field, required=False, label='最小交易金额') for field in holding_keys],
+                allow_unknown=False
+            ), required=False),
+        ])
+        self.portfolio_deltas = Schema([
+            Nested('deltas', Schema(
+                [Number(field, required=False, label='持仓变动', minimum=None) for field in holding_keys],
+                allow_unknown=False
+            ))
+        ])
+        self.config_update = Schema([
+            Nested('framework', Schema(
+                [Number(field, required=False, label='比例', maximum=1.0) for field in framework_keys],
+                rules=[_require_unit_sum('framework', '投资大框架比例总和必须为 100%')],
+                allow_unknown=False
+            ), required=False),
+            Nested('fund_portfolio', Schema(
+                [Number(field, required=False, label='比例', maximum=1.0) for field in fund_keys],
+                rules=[_require_unit_sum('fund_portfolio', '基金组合比例总和必须为 100%')],
+                allow_unknown=False
+            ), required=False),
+            Number('rebalance_tolerance', required=False, label='容忍带', maximum=1.0),
+        ])
+
+
+@functools.lru_cache(maxsize=64)
+def _compile_category_schemas(
+    framework_keys: Tuple[str, ...],
+    fund_keys: Tuple[str, ...],
+    holding_keys: Tuple[str, ...]
+) -> CategorySchemas:
+    return CategorySchemas(framework_keys, fund_keys, holding_keys)
+
+
+def category_schemas(categories: CategoryRegistry) -> CategorySchemas:
+    """类别注册表对应的校验器，类别键相同的注册表共享同一组校验器"""
+    return _compile_category_schemas(categories.framework.keys, categories.funds.keys, categories.holding_keys)
+
+
+# 内置类别的校验器
+_BUILTIN_SCHEMAS = category_schemas(InvestmentConfig().categories)
+PORTFOLIO_HOLDINGS_SCHEMA = _BUILTIN_SCHEMAS.holdings
+ANALYZE_PORTFOLIO_SCHEMA = _BUILTIN_SCHEMAS.analyze_portfolio
+REBALANCE_SCHEMA = _BUILTIN_SCHEMAS.rebalance
+PORTFOLIO_DELTAS_SCHEMA = _BUILTIN_SCHEMAS.portfolio_deltas
+CONFIG_UPDATE_SCHEMA = _BUILTIN_SCHEMAS.config_update
+
+
+def config_changes(cleaned: Dict) -> Dict[str, Any]:
+    """将校验通过的 PUT /api/config 请求体转换为配置变更
+
+    Args:
+        cleaned: config_update 校验器校验后的数据
+
+    Returns:
+        可直接传给 ConfigStore.update 的变更：比例按类别键放在
+        framework_ratios / fund_ratios 中（见 InvestmentConfig.with_updates）
+    """
+    changes: Dict[str, Any] = {}
+    if cleaned.get('framework'):
+        changes['framework_ratios'] = dict(cleaned['framework'])
+    if cleaned.get('fund_portfolio'):
+        changes['fund_ratios'] = dict(cleaned['fund_portfolio'])
+    if 'rebalance_tolerance' in cleaned:
+        changes['rebalance_tolerance'] = cleaned['rebalance_tolerance']
+    return changes
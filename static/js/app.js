@@ -252,6 +252,12 @@ document.addEventListener('DOMContentLoaded', function() {
             }
         }
         
+        // 敏感性分析的取值范围按本次输入填充默认值
+        if (!document.getElementById('scenarioRowStart').value) {
+            fillScenarioRange('Row');
+            fillScenarioRange('Column');
+        }
+        
         // 滚动到结果区域
         resultSection.scrollIntoView({ behavior: 'smooth', block: 'start' });
         
@@ -611,6 +617,143 @@ function displayConfigError(message) {
     errorDiv.scrollIntoView({ behavior: 'smooth', block: 'center' });
 }
 
+// 敏感性分析：以表单输入为基准，一次请求计算两个字段所有取值组合的结果
+const SCENARIO_INPUT_IDS = {
+    target_living_expense: 'targetLivingExpense',
+    current_living_expense: 'currentLivingExpense',
+    debt: 'debt',
+    new_income: 'newIncome'
+};
+let scenarioData = null;
+
+// 按基准值填充默认取值范围（基准值的 50% ~ 150%，共 5 个取值）
+function fillScenarioRange(prefix) {
+    const field = document.getElementById(`scenario${prefix}Field`).value;
+    const base = parseFloat(document.getElementById(SCENARIO_INPUT_IDS[field]).value) || 0;
+    const start = base > 0 ? base * 0.5 : 0;
+    const stop = base > 0 ? base * 1.5 : 10000;
+    document.getElementById(`scenario${prefix}Start`).value = start.toFixed(2);
+    document.getElementById(`scenario${prefix}Stop`).value = stop.toFixed(2);
+    document.getElementById(`scenario${prefix}Step`).value = ((stop - start) / 4).toFixed(2);
+}
+
+function readScenarioRange(prefix) {
+    return {
+        start: parseFloat(document.getElementById(`scenario${prefix}Start`).value),
+        stop: parseFloat(document.getElementById(`scenario${prefix}Stop`).value),
+        step: parseFloat(document.getElementById(`scenario${prefix}Step`).value)
+    };
+}
+
+function showScenarioMessage(message) {
+    document.getElementById('scenarioTable').innerHTML = `<p class="holdings-help">${message}</p>`;
+}
+
+// 可选指标：可投资金额、每周定投总额、各类别分配金额、各定投日金额
+function fillScenarioMetrics(data) {
+    const select = document.getElementById('scenarioMetric');
+    const selected = select.value;
+    const options = [['investable_amount', '可投资金额'], ['weekly_total', '每周定投总额']];
+    Object.keys(data.framework_allocation).forEach(name => options.push([`framework:${name}`, name]));
+    Object.keys(data.fund_allocation).forEach(name => options.push([`fund:${name}`, name]));
+    data.regular_investment_plan.days.forEach(item => options.push([`day:${item.day}`, `${item.day}定投`]));
+    select.innerHTML = options.map(([value, label]) => `<option value="${value}">${label}</option>`).join('');
+    if (options.some(([value]) => value === selected)) {
+        select.value = selected;
+    }
+}
+
+function scenarioMetricGrid(data, metric) {
+    if (metric === 'investable_amount') return data.investable_amount;
+    if (metric === 'weekly_total') return data.regular_investment_plan.weekly_total;
+    const [kind, name] = [metric.slice(0, metric.indexOf(':')), metric.slice(metric.indexOf(':') + 1)];
+    if (kind === 'framework') return data.framework_allocation[name];
+    if (kind === 'fund') return data.fund_allocation[name];
+    return data.regular_investment_plan.days.find(item => item.day === name).amount;
+}
+
+// 渲染敏感性表：服务端按字段顺序排列网格维度，这里按所选的行、列取值
+function renderScenarioTable() {
+    if (!scenarioData) {
+        return;
+    }
+    const { data, rowField, columnField, base } = scenarioData;
+    const rowAxis = data.axes.findIndex(axis => axis.field === rowField);
+    const rowValues = data.axes[rowAxis].values;
+    const columnValues = data.axes[1 - rowAxis].values;
+    const cell = (grid, i, j) => (rowAxis === 0 ? grid[i][j] : grid[j][i]);
+    const grid = scenarioMetricGrid(data, document.getElementById('scenarioMetric').value);
+
+    let html = `<table class="scenario-table"><thead><tr><th>${getFieldName(rowField)} \\ ${getFieldName(columnField)}</th>`;
+    columnValues.forEach(value => {
+        html += `<th>${value.toFixed(2)}</th>`;
+    });
+    html += '</tr></thead><tbody>';
+    rowValues.forEach((rowValue, i) => {
+        html += `<tr><th>${rowValue.toFixed(2)}</th>`;
+        columnValues.forEach((columnValue, j) => {
+            const classes = [];
+            if (!cell(data.valid, i, j)) classes.push('invalid');
+            if (rowValue === base[rowField] && columnValue === base[columnField]) classes.push('base');
+            html += `<td class="${classes.join(' ')}">${cell(grid, i, j).toFixed(2)}</td>`;
+        });
+        html += '</tr>';
+    });
+    html += '</tbody></table>';
+    document.getElementById('scenarioTable').innerHTML = html;
+}
+
+async function runScenarios() {
+    const rowField = document.getElementById('scenarioRowField').value;
+    const columnField = document.getElementById('scenarioColumnField').value;
+    if (rowField === columnField) {
+        showScenarioMessage('行和列必须选择不同的字段');
+        return;
+    }
+
+    // 行、列字段按取值范围变化，其余字段取表单中的基准值
+    const base = {};
+    for (const [field, id] of Object.entries(SCENARIO_INPUT_IDS)) {
+        base[field] = parseFloat(document.getElementById(id).value) || 0;
+    }
+    const request = { base: {}, vary: {} };
+    for (const field of Object.keys(base)) {
+        if (field !== rowField && field !== columnField) {
+            request.base[field] = base[field];
+        }
+    }
+    request.vary[rowField] = readScenarioRange('Row');
+    request.vary[columnField] = readScenarioRange('Column');
+
+    try {
+        const response = await fetch('/api/calculate/scenarios', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify(request)
+        });
+
+        const result = await response.json();
+
+        if (result.success) {
+            scenarioData = { data: result.data, rowField, columnField, base };
+            fillScenarioMetrics(result.data);
+            renderScenarioTable();
+        } else {
+            showScenarioMessage(result.error || '计算失败，请重试');
+        }
+    } catch (error) {
+        showScenarioMessage('网络错误，请检查服务器是否正常运行');
+        console.error('Error:', error);
+    }
+}
+
+document.getElementById('scenarioRowField').addEventListener('change', () => fillScenarioRange('Row'));
+document.getElementById('scenarioColumnField').addEventListener('change', () => fillScenarioRange('Column'));
+document.getElementById('scenarioMetric').addEventListener('change', renderScenarioTable);
+document.getElementById('scenarioButton').addEventListener('click', runScenarios);
+
 // 加载当前配置并填充表单
 async function loadCurrentConfig() {
     try {